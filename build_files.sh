@@ -10,4 +10,10 @@ echo "Collecting static files..."
 python3 manage.py collectstatic --noinput
 
 echo "Running migrations..."
-python3 manage.py migrate --noinput 
\ No newline at end of file
+python3 manage.py migrate --noinput
+
+echo "Creating cache table (CACHE_BACKEND=db)..."
+python3 manage.py createcachetable
+
+echo "Draining the task queue (item photos, etc.)..."
+python3 manage.py executar_tarefas --ate-esvaziar
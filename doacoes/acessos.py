@@ -0,0 +1,113 @@
+"""
+Registro de acessos com escrita adiada (write-behind).
+
+``ultimo_acesso`` passa a acompanhar a atividade real (toda requisição
+autenticada, ver middleware.py) e ``last_login`` os logins, mas nenhuma das
+duas é gravada durante a requisição: os instantes ficam em um buffer em
+memória e são descarregados periodicamente, depois que a resposta já foi
+enviada (sinal ``request_finished``), com um UPDATE em lote que toca apenas
+essas duas colunas.
+
+Cada worker tem o seu buffer. O intervalo é ``ACESSOS_INTERVALO_DESCARGA``
+(segundos); se o processo for encerrado, perdem-se no máximo os acessos desse
+último intervalo, o que é aceitável para um campo informativo.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BATCH = 500
+
+
+def mais_recente(campo, quando):
+    """Nunca volta a coluna no tempo (outro worker pode ter gravado um acesso mais novo)."""
+    valor = Value(quando, output_field=DateTimeField())
+    return Greatest(Coalesce(F(campo), valor), valor)
+
+
+class BufferAcessos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendentes = {}
+        self._ultima_descarga = time.monotonic()
+
+    def registrar(self, user_id, login=False, quando=None):
+        """Anota um acesso (ou login) do usuário; não faz nenhuma consulta ao banco."""
+        if user_id is None:
+            return
+        quando = quando or timezone.now()
+        with self._lock:
+            ultimo_acesso, ultimo_login = self._pendentes.get(user_id, (None, None))
+            if ultimo_acesso is None or quando > ultimo_acesso:
+                ultimo_acesso = quando
+            if login and (ultimo_login is None or quando > ultimo_login):
+                ultimo_login = quando
+            self._pendentes[user_id] = (ultimo_acesso, ultimo_login)
+
+    def pendentes(self):
+        with self._lock:
+            return dict(self._pendentes)
+
+    def descarregar(self):
+        """Grava os acessos pendentes; retorna quantos usuários foram atualizados."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._ultima_descarga = time.monotonic()
+        if not pendentes:
+            return 0
+
+        User = get_user_model()
+        so_acesso, com_login = [], []
+        for user_id, (ultimo_acesso, ultimo_login) in pendentes.items():
+            if ultimo_login is None:
+                so_acesso.append(User(pk=user_id, ultimo_acesso=mais_recente('ultimo_acesso', ultimo_acesso)))
+            else:
+                com_login.append(User(
+                    pk=user_id,
+                    ultimo_acesso=mais_recente('ultimo_acesso', ultimo_acesso),
+                    last_login=mais_recente('last_login', ultimo_login),
+                ))
+        try:
+            if so_acesso:
+                User.objects.bulk_update(so_acesso, ['ultimo_acesso'], batch_size=TAMANHO_BATCH)
+            if com_login:
+                User.objects.bulk_update(com_login, ['ultimo_acesso', 'last_login'], batch_size=TAMANHO_BATCH)
+        except DatabaseError as e:
+            logger.error(f"Erro ao gravar os acessos pendentes: {str(e)}")
+            # Devolve ao buffer o que não foi gravado, sem sobrescrever acessos mais novos
+            for user_id, (ultimo_acesso, ultimo_login) in pendentes.items():
+                self.registrar(user_id, quando=ultimo_acesso)
+                if ultimo_login is not None:
+                    self.registrar(user_id, login=True, quando=ultimo_login)
+            return 0
+        return len(pendentes)
+
+    def descarregar_se_preciso(self):
+        intervalo = getattr(settings, 'ACESSOS_INTERVALO_DESCARGA', 30)
+        if time.monotonic() - self._ultima_descarga < intervalo or not self._pendentes:
+            return 0
+        # Nunca grava dentro da transação de outra pessoa (ATOMIC_REQUESTS, testes)
+        if connection.in_atomic_block:
+            return 0
+        return self.descarregar()
+
+
+acessos = BufferAcessos()
+
+
+def descarregar_apos_requisicao(sender, **kwargs):
+    acessos.descarregar_se_preciso()
+
+
+def registrar_login(sender, request, user, **kwargs):
+    """Substitui o update_last_login do Django, que salva o usuário durante o login."""
+    acessos.registrar(user.pk, login=True)
@@ -24,4 +24,16 @@ class DoacoesConfig(AppConfig):
 
     def ready(self):
         # Conecta o sinal post_migrate para criar o usuário admin
-        post_migrate.connect(criar_usuario_admin, sender=self) 
\ No newline at end of file
+        post_migrate.connect(criar_usuario_admin, sender=self)
+
+        # Registra os sinais que mantêm o resumo do dashboard atualizado
+        from . import signals  # noqa: F401
+
+        # last_login/ultimo_acesso são gravados em lote (ver acessos.py), não no login
+        from django.contrib.auth.models import update_last_login
+        from django.contrib.auth.signals import user_logged_in
+        from django.core.signals import request_finished
+        from .acessos import registrar_login, descarregar_apos_requisicao
+        user_logged_in.disconnect(update_last_login, dispatch_uid='update_last_login')
+        user_logged_in.connect(registrar_login, dispatch_uid='registrar_login_acessos')
+        request_finished.connect(descarregar_apos_requisicao, dispatch_uid='descarregar_acessos')
@@ -0,0 +1,59 @@
+"""
+Modo JWT sem estado (``JWT_STATELESS=True``).
+
+Nesse modo as requisições autenticadas por JWT não consultam a tabela de
+usuários: ``request.user`` é um TokenUser montado a partir das claims já
+verificadas (``user_id``, ``role``, ``email``, ``nome_completo``), e as
+permissões por função usam essas claims.
+
+Para que mudanças de função, desativação ou troca de senha valham antes de
+o token expirar, essas alterações registram no cache o instante da
+revogação (ver signals.py); tokens emitidos antes dele, ou no mesmo
+segundo (``iat`` só tem segundos), são recusados. O registro só precisa
+durar o tempo de vida do refresh token, e o cache tem de ser compartilhado
+entre os processos (settings.py recusa o modo com o cache ``locmem``).
+"""
+import time
+
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+
+def chave_revogacao(user_id):
+    return f'jwt:revogado:{user_id}'
+
+
+def revogar_tokens(user_id):
+    """Invalida todos os tokens do usuário emitidos até agora."""
+    duracao = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(chave_revogacao(user_id), int(time.time()), timeout=int(duracao.total_seconds()))
+
+
+def token_revogado(token):
+    revogado_em = cache.get(chave_revogacao(token.get(api_settings.USER_ID_CLAIM)))
+    return revogado_em is not None and token.get('iat', 0) <= revogado_em
+
+
+class JWTStatelessAuthentication(JWTAuthentication):
+    """JWTAuthentication que devolve um TokenUser em vez de carregar o usuário do banco."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('O token não contém a identificação do usuário.')
+        if token_revogado(validated_token):
+            raise InvalidToken('Token revogado. Faça login novamente.')
+        return TokenUser(validated_token)
+
+
+class TokenRefreshRevogavelSerializer(TokenRefreshSerializer):
+    """Recusa renovar refresh tokens emitidos antes de uma revogação."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if token_revogado(refresh):
+            raise InvalidToken('Token revogado. Faça login novamente.')
+        return super().validate(attrs)
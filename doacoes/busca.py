@@ -0,0 +1,248 @@
+"""
+Busca textual em doadores, recebedores e itens (``/api/search/?q=``).
+
+Um único índice (tabela ``doacoes_busca``) guarda, para cada registro, um
+título (nome) e um conteúdo (email, telefone, endereço / descrição), já
+normalizados em Python: minúsculas, sem acentos e sem pontuação, de modo que
+"João" e "joao" ou "(11) 9876-5432" e "1198765432" se encontrem nos dois
+bancos. A chave de cada linha codifica o tipo e o id (``id * 4 + código``).
+
+- SQLite: tabela virtual FTS5 (tokenizer ``unicode61``), ordenada por bm25;
+- PostgreSQL: coluna ``tsvector`` gerada com a configuração ``portuguese``
+  (radicais e stopwords do português), índice GIN, ordenada por
+  ``ts_rank_cd``;
+- outros bancos: sem índice, ``icontains`` nos campos.
+
+Os termos da busca são combinados com E e casam por prefixo ("mar" encontra
+"Maria" e "Marcos"). O título pesa mais que o conteúdo no ranking.
+
+O índice é mantido pelos sinais de save/delete (ver signals.py); caminhos que
+gravam sem sinais (bulk_create, importação) chamam ``indexar``. O comando
+``manage.py reconstruir_busca`` refaz o índice inteiro.
+"""
+import re
+import unicodedata
+
+from django.db import connections, router
+
+from .models import Doador, Recebedor, Item
+
+TABELA = 'doacoes_busca'
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+MAXIMO_TERMOS = 10
+
+# Código de cada tipo na chave do índice
+TIPOS = {
+    'doador': (1, Doador),
+    'recebedor': (2, Recebedor),
+    'item': (3, Item),
+}
+TIPO_POR_MODELO = {modelo: tipo for tipo, (_, modelo) in TIPOS.items()}
+CAMPOS = {
+    'doador': ('nome', 'email', 'telefone', 'endereco'),
+    'recebedor': ('nome', 'email', 'telefone', 'endereco'),
+    'item': ('nome', 'descricao'),
+}
+TIPO_POR_CODIGO = {codigo: tipo for tipo, (codigo, _) in TIPOS.items()}
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e só com letras/dígitos separados por espaço."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[^\W_]+', texto.lower()))
+
+
+def chave(tipo, pk):
+    return pk * 4 + TIPOS[tipo][0]
+
+
+def documento(tipo, obj):
+    """(chave, título, conteúdo) indexados para o registro."""
+    if tipo == 'item':
+        return chave(tipo, obj.pk), normalizar(obj.nome), normalizar(obj.descricao)
+    # Telefone também só com os dígitos, para a busca por "11987654321"
+    telefone = ''.join(re.findall(r'\d', obj.telefone or ''))
+    conteudo = ' '.join(normalizar(valor) for valor in (obj.email, obj.telefone, telefone, obj.endereco))
+    return chave(tipo, obj.pk), normalizar(obj.nome), conteudo
+
+
+def termos(consulta):
+    return normalizar(consulta).split()[:MAXIMO_TERMOS]
+
+
+class BuscaSQLite:
+    coluna_chave = 'rowid'
+
+    def criar(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {TABELA} USING fts5("
+            "titulo, conteudo, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def gravar(self, cursor, documentos):
+        chaves = [d[0] for d in documentos]
+        self.remover(cursor, chaves)
+        cursor.executemany(f'INSERT INTO {TABELA} (rowid, titulo, conteudo) VALUES (%s, %s, %s)', documentos)
+
+    def remover(self, cursor, chaves):
+        if chaves:
+            marcadores = ', '.join(['%s'] * len(chaves))
+            cursor.execute(f'DELETE FROM {TABELA} WHERE rowid IN ({marcadores})', chaves)
+
+    def buscar(self, cursor, palavras, codigos, limite):
+        # Termos entre aspas: só letras e dígitos chegam aqui, não há sintaxe FTS5 a escapar
+        consulta = ' '.join(f'"{palavra}"*' for palavra in palavras)
+        marcadores = ', '.join(['%s'] * len(codigos))
+        cursor.execute(
+            f'SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s AND (rowid %% 4) IN ({marcadores}) '
+            f'ORDER BY bm25({TABELA}, 10.0, 1.0) LIMIT %s',
+            [consulta, *codigos, limite]
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+class BuscaPostgres:
+    coluna_chave = 'chave'
+
+    def criar(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE {TABELA} ("
+            "chave bigint PRIMARY KEY, titulo text NOT NULL, conteudo text NOT NULL, "
+            "documento tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('portuguese', titulo), 'A') || "
+            "setweight(to_tsvector('portuguese', conteudo), 'B')) STORED)"
+        )
+        cursor.execute(f'CREATE INDEX {TABELA}_documento_idx ON {TABELA} USING GIN (documento)')
+
+    def gravar(self, cursor, documentos):
+        cursor.executemany(
+            f'INSERT INTO {TABELA} (chave, titulo, conteudo) VALUES (%s, %s, %s) '
+            'ON CONFLICT (chave) DO UPDATE SET titulo = EXCLUDED.titulo, conteudo = EXCLUDED.conteudo',
+            documentos
+        )
+
+    def remover(self, cursor, chaves):
+        if chaves:
+            cursor.execute(f'DELETE FROM {TABELA} WHERE chave = ANY(%s)', [list(chaves)])
+
+    def buscar(self, cursor, palavras, codigos, limite):
+        consulta = ' & '.join(f'{palavra}:*' for palavra in palavras)
+        cursor.execute(
+            f"SELECT chave FROM {TABELA}, to_tsquery('portuguese', %s) AS consulta "
+            "WHERE documento @@ consulta AND chave %% 4 = ANY(%s) "
+            "ORDER BY ts_rank_cd(documento, consulta) DESC, chave LIMIT %s",
+            [consulta, list(codigos), limite]
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+class BuscaSimples:
+    """Bancos sem suporte: nada a manter, busca por ``icontains``."""
+    coluna_chave = None
+
+    def criar(self, cursor):
+        pass
+
+    def gravar(self, cursor, documentos):
+        pass
+
+    def remover(self, cursor, chaves):
+        pass
+
+    def buscar(self, cursor, palavras, codigos, limite):
+        from .listagem import filtrar_busca
+        chaves = []
+        for codigo in codigos:
+            tipo = TIPO_POR_CODIGO[codigo]
+            modelo = TIPOS[tipo][1]
+            queryset = modelo.objects.all()
+            for palavra in palavras:
+                queryset = filtrar_busca(queryset, palavra, CAMPOS[tipo])
+            chaves += [chave(tipo, pk) for pk in queryset.order_by('nome', 'pk').values_list('pk', flat=True)[:limite]]
+        return chaves[:limite]
+
+
+def backend(connection):
+    if connection.vendor == 'sqlite':
+        return BuscaSQLite()
+    if connection.vendor == 'postgresql':
+        return BuscaPostgres()
+    return BuscaSimples()
+
+
+def _conexao(modelo, using=None):
+    return connections[using or router.db_for_write(modelo)]
+
+
+def indexar(objetos, using=None):
+    """Grava (ou regrava) no índice os registros de Doador, Recebedor ou Item."""
+    objetos = [obj for obj in objetos if obj.pk is not None]
+    if not objetos:
+        return
+    tipo = TIPO_POR_MODELO[type(objetos[0])]
+    conexao = _conexao(type(objetos[0]), using)
+    with conexao.cursor() as cursor:
+        backend(conexao).gravar(cursor, [documento(tipo, obj) for obj in objetos])
+
+
+def remover(modelo, pks, using=None):
+    tipo = TIPO_POR_MODELO[modelo]
+    conexao = _conexao(modelo, using)
+    with conexao.cursor() as cursor:
+        backend(conexao).remover(cursor, [chave(tipo, pk) for pk in pks])
+
+
+def reconstruir(using=None, lote=2000):
+    """Refaz o índice inteiro; retorna quantos registros foram indexados."""
+    conexao = _conexao(Doador, using)
+    motor = backend(conexao)
+    total = 0
+    with conexao.cursor() as cursor:
+        if motor.coluna_chave:
+            cursor.execute(f'DELETE FROM {TABELA}')
+        for tipo, (_, modelo) in TIPOS.items():
+            documentos = []
+            for obj in modelo.objects.using(conexao.alias).order_by('pk').iterator(chunk_size=lote):
+                documentos.append(documento(tipo, obj))
+                if len(documentos) >= lote:
+                    motor.gravar(cursor, documentos)
+                    total += len(documentos)
+                    documentos = []
+            if documentos:
+                motor.gravar(cursor, documentos)
+                total += len(documentos)
+    return total
+
+
+def buscar(consulta, tipos=None, limite=LIMITE_PADRAO, using=None):
+    """
+    Retorna ``[(tipo, objeto)]`` em ordem de relevância. ``tipos`` restringe a
+    busca a alguns de ``TIPOS``.
+    """
+    palavras = termos(consulta)
+    tipos = [tipo for tipo in (tipos or TIPOS) if tipo in TIPOS]
+    if not palavras or not tipos:
+        return []
+    conexao = _conexao(Doador, using)
+    with conexao.cursor() as cursor:
+        chaves = backend(conexao).buscar(cursor, palavras, [TIPOS[tipo][0] for tipo in tipos], limite)
+
+    # Uma consulta por tipo para carregar os registros encontrados
+    por_tipo = {}
+    for chave_indice in chaves:
+        por_tipo.setdefault(TIPO_POR_CODIGO[chave_indice % 4], []).append(chave_indice // 4)
+    objetos = {
+        tipo: TIPOS[tipo][1].objects.using(conexao.alias).in_bulk(pks)
+        for tipo, pks in por_tipo.items()
+    }
+    resultados = []
+    for chave_indice in chaves:
+        tipo = TIPO_POR_CODIGO[chave_indice % 4]
+        obj = objetos[tipo].get(chave_indice // 4)
+        if obj is not None:
+            resultados.append((tipo, obj))
+    return resultados
@@ -0,0 +1,91 @@
+"""
+Cache do contexto do dashboard.
+
+O contexto é guardado sob uma chave que inclui um número de versão; qualquer
+escrita em Doacao, Doador, Recebedor ou Item incrementa a versão (ver
+signals.py) e as chaves antigas simplesmente deixam de ser lidas.
+
+Em um cache miss só um processo recalcula: ele adquire uma trava com
+``cache.add`` e os demais, enquanto isso, servem a última versão calculada.
+Não depende de Redis, mas a versão precisa ser vista por todos os workers:
+exige CACHE_BACKEND=file ou db. Com locmem, ``DASHBOARD_CACHE_TIMEOUT`` fica em
+0 e o contexto é calculado a cada requisição (ver settings.py).
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHAVE_VERSAO = 'dashboard:versao'
+CHAVE_ULTIMO = 'dashboard:contexto:ultimo'
+# Tempo máximo da trava de recálculo, caso o processo que a detém morra
+TEMPO_TRAVA = 30
+
+
+def chave_contexto(versao):
+    return f'dashboard:contexto:{versao}'
+
+
+def versao_atual():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, 1, timeout=None)
+        versao = cache.get(CHAVE_VERSAO, 1)
+    return versao
+
+
+def invalidar_dashboard():
+    """Incrementa a versão; a próxima leitura do dashboard recalcula o contexto."""
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.add(CHAVE_VERSAO, 1, timeout=None)
+
+
+def agendar_invalidacao(using=None):
+    """
+    Invalida o dashboard quando a transação atual for confirmada (ou já, fora
+    de transação). Várias escritas na mesma transação geram uma só invalidação.
+    """
+    conexao = transaction.get_connection(using)
+    if conexao.in_atomic_block and any(
+        funcao is invalidar_dashboard for _, funcao, _ in conexao.run_on_commit
+    ):
+        return
+    transaction.on_commit(invalidar_dashboard, using=using)
+
+
+def obter_contexto(calcular):
+    """
+    Retorna o contexto do dashboard da versão atual, chamando ``calcular()``
+    só em um cache miss e em um único processo por vez.
+    """
+    if not settings.DASHBOARD_CACHE_TIMEOUT:
+        return calcular()
+
+    versao = versao_atual()
+    chave = chave_contexto(versao)
+    contexto = cache.get(chave)
+    if contexto is not None:
+        return contexto
+
+    trava = f'dashboard:recalculo:{versao}'
+    if not cache.add(trava, 1, timeout=TEMPO_TRAVA):
+        # Outro processo está recalculando: serve o último contexto calculado
+        anterior = cache.get(CHAVE_ULTIMO)
+        if anterior is not None:
+            return anterior
+        # Nada em cache ainda (primeiro acesso): calcula sem gravar
+        return calcular()
+
+    try:
+        contexto = calcular()
+        cache.set(chave, contexto, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+        cache.set(CHAVE_ULTIMO, contexto, timeout=None)
+        logger.debug(f"Contexto do dashboard recalculado (versão {versao})")
+        return contexto
+    finally:
+        cache.delete(trava)
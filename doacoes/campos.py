@@ -0,0 +1,128 @@
+"""
+Campos esparsos (``?fields=``) e expansão de relacionamentos (``?expand=``)
+nas leituras da API.
+
+- ``?fields=id,nome,email`` devolve só esses campos e carrega só as colunas
+  correspondentes (``QuerySet.only``), além do ``id`` e do campo de ordenação
+  usado pela paginação;
+- ``?expand=doador,recebedor`` troca o id da chave estrangeira pelo objeto
+  relacionado, carregado na mesma consulta com JOIN (``select_related``).
+
+Os dois parâmetros valem apenas para GET: nas escritas o serializer completo
+continua validando todos os campos.
+"""
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+
+def _lista(valor):
+    return [item.strip() for item in (valor or '').split(',') if item.strip()]
+
+
+class CamposDinamicosMixin:
+    """
+    Serializer que respeita ``context['campos']`` e ``context['expandir']``.
+
+    ``expansoes`` mapeia a chave estrangeira para o serializer do objeto
+    relacionado; ``dependencias`` lista as colunas de que um campo calculado
+    precisa (para o ``only()`` da view).
+    """
+    expansoes = {}
+    dependencias = {}
+
+    def _raiz(self):
+        pai = self.parent
+        if isinstance(pai, serializers.ListSerializer):
+            pai = pai.parent
+        return pai is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._raiz():
+            return fields
+        for nome in self.context.get('expandir') or ():
+            if nome in fields:
+                fields[nome] = self.expansoes[nome](read_only=True)
+        campos = self.context.get('campos')
+        if campos is not None:
+            for nome in list(fields):
+                if nome not in campos:
+                    del fields[nome]
+        return fields
+
+
+class CamposMixin:
+    """Lê ``?fields=``/``?expand=`` e ajusta o contexto do serializer e o queryset."""
+
+    def _ler_campos(self):
+        if hasattr(self, '_campos_pedidos'):
+            return self._campos_pedidos
+        campos, expandir = None, []
+        if self.request is not None and self.request.method in permissions.SAFE_METHODS:
+            serializer_class = self.get_serializer_class()
+            disponiveis = list(serializer_class().get_fields())
+            expansoes = getattr(serializer_class, 'expansoes', {})
+
+            pedidos = _lista(self.request.query_params.get('fields'))
+            if pedidos:
+                invalidos = [nome for nome in pedidos if nome not in disponiveis]
+                if invalidos:
+                    raise ValidationError(
+                        {'error': f"Campo inválido em fields: {', '.join(invalidos)}. Use: {', '.join(disponiveis)}"}
+                    )
+                campos = set(pedidos)
+
+            expandir = _lista(self.request.query_params.get('expand'))
+            invalidos = [nome for nome in expandir if nome not in expansoes]
+            if invalidos:
+                permitidos = ', '.join(expansoes) or 'nenhum'
+                raise ValidationError(
+                    {'error': f"Relacionamento inválido em expand: {', '.join(invalidos)}. Use: {permitidos}"}
+                )
+            # Expandir um campo que não foi pedido não teria efeito
+            expandir = [nome for nome in expandir if campos is None or nome in campos]
+        self._campos_pedidos = (campos, expandir)
+        return self._campos_pedidos
+
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        campos, expandir = self._ler_campos()
+        contexto['campos'] = campos
+        contexto['expandir'] = expandir
+        return contexto
+
+    def colunas(self, campos):
+        """Colunas do modelo necessárias para os campos pedidos, ou None se não der para saber."""
+        model = self.queryset.model
+        dependencias = getattr(self.get_serializer_class(), 'dependencias', {})
+        concretos = {campo.name for campo in model._meta.concrete_fields}
+        colunas = {model._meta.pk.name}
+        for nome in campos:
+            if nome in dependencias:
+                colunas.update(dependencias[nome])
+            elif nome in concretos:
+                colunas.add(nome)
+            else:
+                return None
+        # A paginação por cursor lê o campo de ordenação de cada registro
+        ordenacao = getattr(self, 'ordering', None) or model._meta.ordering or ['id']
+        colunas.add((ordenacao if isinstance(ordenacao, str) else ordenacao[0]).lstrip('-'))
+        return colunas
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        campos, expandir = self._ler_campos()
+        if expandir:
+            queryset = queryset.select_related(*expandir)
+        if campos is not None:
+            colunas = self.colunas(campos)
+            if colunas is not None:
+                # Os campos do objeto expandido vêm inteiros, pelo JOIN
+                queryset = queryset.only(*colunas, *[
+                    f'{nome}__{campo.name}'
+                    for nome in expandir
+                    for campo in queryset.model._meta.get_field(nome).related_model._meta.concrete_fields
+                ])
+        return queryset
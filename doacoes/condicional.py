@@ -0,0 +1,198 @@
+"""
+Requisições condicionais na API: ETag/Last-Modified nas leituras e If-Match
+nas escritas.
+
+As versões são calculadas sem serializar nada, a partir de
+``ultima_atualizacao``:
+
+- detalhe: uma consulta pelo timestamp do registro (e dos relacionamentos
+  expandidos com ``?expand=``); a resposta leva ``ETag`` e ``Last-Modified``;
+- listagem: ``COUNT`` e ``MAX`` sobre o queryset já filtrado (e o ``MAX`` de
+  cada tabela expandida); a contagem detecta exclusões, que não mudam o
+  maior timestamp. Só ``ETag``: ``Last-Modified`` não perceberia uma exclusão.
+
+O ETag também depende do formato da resposta, do host (as URLs das fotos são
+absolutas) e dos parâmetros da requisição, então é forte: mesma ETag, mesmos
+bytes. ``If-None-Match``/``If-Modified-Since`` que casam devolvem 304 sem
+corpo.
+
+A ETag do detalhe tem duas partes, ``"<registro>-<representação>"``: a
+primeira só depende do model, do pk e do ``ultima_atualizacao`` do registro;
+a segunda, do resto (formato, host, ``?fields=``, ``?expand=`` e os
+timestamps dos expandidos).
+
+Em PUT/PATCH/DELETE, ``If-Match`` (ou ``If-Unmodified-Since``) é comparado
+com a versão atual com o registro travado; se outro cliente alterou o registro
+antes, a resposta é 412 e nada é gravado. O ``If-Match`` compara só a parte
+do registro, então vale a ETag de qualquer representação lida com GET.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+CAMPO_ATUALIZACAO = 'ultima_atualizacao'
+
+
+def _sem_fraca(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _segundos(momento):
+    return int(momento.timestamp())
+
+
+def _resumo(*partes, tamanho=32):
+    return hashlib.sha256('|'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()[:tamanho]
+
+
+def _parte_registro(etag):
+    """Parte do registro de uma ETag de detalhe (ver etag_detalhe)."""
+    return etag.strip('"').split('-', 1)[0]
+
+
+class CondicionalMixin:
+    """ETag/Last-Modified em list/retrieve e If-Match em update/destroy."""
+
+    def _expandidos(self):
+        if hasattr(self, '_ler_campos'):
+            return self._ler_campos()
+        return None, []
+
+    def versao_objeto(self, travar=False):
+        """Timestamps (do registro e dos expandidos) do objeto da URL, ou None se não existir."""
+        _, expandir = self._expandidos()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        if travar:
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset.values_list(
+            CAMPO_ATUALIZACAO, *[f'{nome}__{CAMPO_ATUALIZACAO}' for nome in expandir]
+        ).first()
+
+    def versao_lista(self):
+        _, expandir = self._expandidos()
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        # Em consultas separadas: sem filtros, o COUNT(*) e o MAX pelo índice
+        # de ultima_atualizacao não leem a tabela; juntos viram uma varredura
+        versao = [queryset.count(), queryset.aggregate(ultima=Max(CAMPO_ATUALIZACAO))['ultima']]
+        for nome in expandir:
+            # O maior timestamp da tabela relacionada inteira, pelo índice: o
+            # MAX pelo JOIN com a listagem varria as duas tabelas. A ETag muda
+            # com alterações em registros que a listagem não mostra, mas nunca
+            # deixa de mudar quando um que ela mostra muda.
+            relacionado = queryset.model._meta.get_field(nome).related_model
+            versao.append(relacionado._default_manager.aggregate(ultima=Max(CAMPO_ATUALIZACAO))['ultima'])
+        return tuple(versao)
+
+    def _representacao(self):
+        request = self.request
+        campos, expandir = self._expandidos()
+        renderer = getattr(request, 'accepted_renderer', None)
+        return (
+            request.get_host(),
+            renderer.format if renderer else '',
+            ','.join(sorted(campos)) if campos is not None else '*',
+            ','.join(expandir),
+        )
+
+    def gerar_etag(self, *partes):
+        return quote_etag(_resumo(self.queryset.model._meta.label, *self._representacao(), *partes))
+
+    def etag_detalhe(self, pk, versao):
+        """ETag ``"<registro>-<representação>"`` do objeto ``pk`` com os timestamps ``versao``."""
+        registro = _resumo(self.queryset.model._meta.label, pk, versao[0], tamanho=16)
+        return quote_etag(f'{registro}-{_resumo(*self._representacao(), *versao[1:], tamanho=16)}')
+
+    def nao_modificado(self, etag, ultima=None):
+        """Resposta 304 se o cliente já tem esta versão, senão None."""
+        meta = self.request.META
+        if 'HTTP_IF_NONE_MATCH' in meta:
+            etags = parse_etags(meta['HTTP_IF_NONE_MATCH'])
+            casou = '*' in etags or _sem_fraca(etag) in {_sem_fraca(e) for e in etags}
+        else:
+            desde = parse_http_date_safe(meta.get('HTTP_IF_MODIFIED_SINCE', ''))
+            casou = desde is not None and ultima is not None and _segundos(ultima) <= desde
+        if not casou:
+            return None
+        return self.marcar(Response(status=status.HTTP_304_NOT_MODIFIED), etag, ultima)
+
+    def precondicao_falhou(self, etag, ultima):
+        """Resposta 412 se ``If-Match``/``If-Unmodified-Since`` não confere com a versão atual."""
+        meta = self.request.META
+        if 'HTTP_IF_MATCH' in meta:
+            etags = parse_etags(meta['HTTP_IF_MATCH'])
+            # Comparação forte (ETags fracas nunca servem para If-Match), só
+            # da parte do registro: o PUT/PATCH não tem ?fields= nem ?expand=
+            falhou = '*' not in etags and _parte_registro(etag) not in {
+                _parte_registro(e) for e in etags if not e.startswith('W/')
+            }
+        else:
+            ate = parse_http_date_safe(meta.get('HTTP_IF_UNMODIFIED_SINCE', ''))
+            falhou = ate is not None and _segundos(ultima) > ate
+        if not falhou:
+            return None
+        return self.marcar(Response(
+            {'error': 'O registro foi alterado depois da versão enviada. Carregue-o novamente antes de salvar.'},
+            status=status.HTTP_412_PRECONDITION_FAILED
+        ), etag, ultima)
+
+    def marcar(self, response, etag, ultima=None):
+        response['ETag'] = etag
+        if ultima is not None:
+            response['Last-Modified'] = http_date(ultima.timestamp())
+        # O cliente pode guardar a resposta, mas revalida antes de usá-la
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _versao_detalhe(self, travar=False):
+        versao = self.versao_objeto(travar=travar)
+        if versao is None:
+            return None, None
+        ultima = max(momento for momento in versao if momento is not None)
+        return self.etag_detalhe(self.kwargs[self.lookup_url_kwarg or self.lookup_field], versao), ultima
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, ultima = self._versao_detalhe()
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        resposta = self.nao_modificado(etag, ultima)
+        if resposta is not None:
+            return resposta
+        return self.marcar(super().retrieve(request, *args, **kwargs), etag, ultima)
+
+    def list(self, request, *args, **kwargs):
+        etag = self.gerar_etag(request.query_params.urlencode(), *self.versao_lista())
+        resposta = self.nao_modificado(etag)
+        if resposta is not None:
+            return resposta
+        return self.marcar(super().list(request, *args, **kwargs), etag)
+
+    def _escrita_condicional(self, escrever, request, *args, **kwargs):
+        if 'HTTP_IF_MATCH' not in request.META and 'HTTP_IF_UNMODIFIED_SINCE' not in request.META:
+            return escrever(request, *args, **kwargs)
+        with transaction.atomic():
+            # Registro travado entre a comparação e a gravação
+            etag, ultima = self._versao_detalhe(travar=True)
+            if etag is not None:
+                resposta = self.precondicao_falhou(etag, ultima)
+                if resposta is not None:
+                    return resposta
+            return escrever(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        resposta = self._escrita_condicional(super().update, request, *args, **kwargs)
+        if status.is_success(resposta.status_code):
+            etag, ultima = self._versao_detalhe()
+            if etag is not None:
+                self.marcar(resposta, etag, ultima)
+        return resposta
+
+    def destroy(self, request, *args, **kwargs):
+        return self._escrita_condicional(super().destroy, request, *args, **kwargs)
@@ -0,0 +1,227 @@
+"""
+Dados sintéticos de doadores, recebedores, itens e doações para benchmarks e
+testes de carga (``manage.py seed_data`` e ``manage.py benchmark_views``).
+
+As proporções padrão imitam o uso real da plataforma: cerca de um doador
+para cada 10 doações e um recebedor para cada 20, poucos doadores
+concentrando boa parte das doações, 60% das doações em itens (cada uma com o
+seu item, como no wizard, e todos os tipos de ``Item.TIPO_CHOICES``
+presentes) e o restante em dinheiro, com valores de alguns reais a alguns
+milhares. As doações cobrem os últimos dois anos em ordem de data, como uma
+tabela que cresce com o tempo.
+
+A geração é determinística para uma mesma ``semente``, os mesmos parâmetros
+e o mesmo dia final. Para carregar milhões de linhas em minutos, os registros
+não passam pelo ORM: os pks são reservados a partir do maior existente e as
+linhas vão em ``executemany`` de ``lote`` em ``lote``, uma transação por
+lote, sem sinais nem ``clean()``. O índice de busca é alimentado a cada lote
+e os resumos são reconstruídos ao final.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import busca
+from .models import Doador, Recebedor, Item, Doacao
+from .resumo import reconstruir_resumo, reconstruir_resumo_diario
+
+DOACOES_POR_DOADOR = 10
+DOACOES_POR_RECEBEDOR = 20
+PROPORCAO_ITENS = 0.6
+PROPORCAO_COM_RECEBEDOR = 0.7
+DIAS = 730
+# Expoente da escolha de doadores e recebedores: 1 é uniforme; com 2.5, ~20%
+# deles ficam com ~60% das doações
+CONCENTRACAO = 2.5
+LOTE = 10000
+
+NOMES = (
+    'Ana', 'Antônio', 'Beatriz', 'Bruno', 'Camila', 'Carlos', 'Daniela', 'Eduardo', 'Fernanda',
+    'Francisco', 'Gabriela', 'Gustavo', 'Helena', 'João', 'Juliana', 'José', 'Larissa', 'Lucas',
+    'Luiza', 'Marcos', 'Maria', 'Mateus', 'Patrícia', 'Paulo', 'Rafael', 'Renata', 'Sebastião',
+    'Sofia', 'Tiago', 'Vitória',
+)
+SOBRENOMES = (
+    'Almeida', 'Alves', 'Araújo', 'Barbosa', 'Carvalho', 'Costa', 'Dias', 'Ferreira', 'Gomes',
+    'Lima', 'Martins', 'Melo', 'Nascimento', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos',
+    'Silva', 'Souza',
+)
+RUAS = ('Rua das Flores', 'Avenida Brasil', 'Rua São João', 'Rua XV de Novembro', 'Avenida Paulista', 'Rua da Paz')
+# Peso relativo de cada tipo de item; tipos ausentes pesam 1
+PESOS_TIPO = {'RO': 20, 'CO': 15, 'PE': 8, 'CA': 8, 'LI': 6, 'BR': 6, 'PH': 6, 'UD': 5, 'MS': 5, 'CB': 5}
+NOMES_ITEM = {
+    'RO': ('Camiseta', 'Calça jeans', 'Casaco', 'Vestido', 'Blusa de frio'),
+    'CO': ('Cesta básica', 'Arroz 5kg', 'Feijão 1kg', 'Óleo de soja', 'Macarrão'),
+    'PE': ('Leite', 'Frutas', 'Legumes', 'Pão'),
+    'LI': ('Livro infantil', 'Romance', 'Dicionário', 'Livro didático'),
+    'BR': ('Boneca', 'Carrinho', 'Quebra-cabeça', 'Bola'),
+    'CB': ('Cobertor de casal', 'Manta', 'Edredom'),
+    'CA': ('Tênis', 'Sandália', 'Bota'),
+}
+
+# Só os campos que busca.documento() lê
+Pessoa = namedtuple('Pessoa', 'pk nome email telefone endereco')
+ItemIndexado = namedtuple('ItemIndexado', 'pk nome descricao')
+
+
+class Gravador:
+    """INSERT em lote com pks reservados, direto no cursor do banco do modelo."""
+
+    def __init__(self, model, campos):
+        self.model = model
+        self.conexao = connections[router.db_for_write(model)]
+        qn = self.conexao.ops.quote_name
+        colunas = ['id', *(model._meta.get_field(campo).column for campo in campos)]
+        self.sql = (
+            f'INSERT INTO {qn(model._meta.db_table)} ({", ".join(qn(coluna) for coluna in colunas)}) '
+            f'VALUES ({", ".join(["%s"] * len(colunas))})'
+        )
+        self.proximo = (model.objects.using(self.conexao.alias).aggregate(maior=Max('pk'))['maior'] or 0) + 1
+
+    def reservar(self):
+        pk, self.proximo = self.proximo, self.proximo + 1
+        return pk
+
+    def gravar(self, linhas):
+        with self.conexao.cursor() as cursor:
+            cursor.executemany(self.sql, linhas)
+
+    def ajustar_sequencia(self):
+        # PostgreSQL: a sequência do id não viu os pks inseridos à mão
+        with self.conexao.cursor() as cursor:
+            for sql in self.conexao.ops.sequence_reset_sql(no_style(), [self.model]):
+                cursor.execute(sql)
+
+
+def _indexar(gravador, documentos):
+    with gravador.conexao.cursor() as cursor:
+        busca.backend(gravador.conexao).gravar(cursor, documentos)
+
+
+def _nome_pessoa(aleatorio):
+    return f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}'
+
+
+def _valor(aleatorio):
+    # Log-normal: mediana de ~R$ 55, raros valores acima de R$ 5.000
+    return Decimal(min(max(math.exp(aleatorio.gauss(4, 1.2)), 1), 50000)).quantize(Decimal('0.01'))
+
+
+def _pessoas(model, tipo, quantidade, aleatorio, inicio, dias, lote):
+    gravador = Gravador(
+        model, ('nome', 'email', 'telefone', 'endereco', 'observacoes', 'data_cadastro', 'ultima_atualizacao')
+    )
+    data_banco = gravador.conexao.ops.adapt_datetimefield_value
+    pks = []
+    for comeco in range(0, quantidade, lote):
+        linhas, registros = [], []
+        for i in range(comeco, min(comeco + lote, quantidade)):
+            pk = gravador.reservar()
+            cadastro = data_banco(inicio + timedelta(seconds=aleatorio.randrange(dias * 86400)))
+            registro = Pessoa(
+                pk, _nome_pessoa(aleatorio),
+                f'{tipo}{i}@exemplo.com.br' if aleatorio.random() < 0.7 else None,
+                f'(11) 9{aleatorio.randrange(10**8):08d}' if aleatorio.random() < 0.8 else None,
+                f'{aleatorio.choice(RUAS)}, {aleatorio.randrange(1, 3000)}',
+            )
+            linhas.append((*registro, '', cadastro, cadastro))
+            registros.append(registro)
+        with transaction.atomic(using=gravador.conexao.alias):
+            gravador.gravar(linhas)
+            _indexar(gravador, [busca.documento(tipo, registro) for registro in registros])
+        pks.extend(registro.pk for registro in registros)
+    gravador.ajustar_sequencia()
+    return pks
+
+
+def gerar(
+    doacoes, semente=0, doacoes_por_doador=DOACOES_POR_DOADOR, doacoes_por_recebedor=DOACOES_POR_RECEBEDOR,
+    proporcao_itens=PROPORCAO_ITENS, proporcao_com_recebedor=PROPORCAO_COM_RECEBEDOR, dias=DIAS, ate=None,
+    concentracao=CONCENTRACAO, lote=LOTE, resumos=True, progresso=None,
+):
+    """
+    Grava ``doacoes`` doações sintéticas, com os doadores, recebedores e itens
+    correspondentes, distribuídas nos ``dias`` que terminam em ``ate`` (data,
+    inclusive; padrão: ontem), e reconstrói os resumos (a menos que ``resumos=False``).
+    Retorna as quantidades criadas por modelo. ``progresso(mensagem)`` é
+    chamado a cada lote.
+    """
+    aleatorio = random.Random(semente)
+    informar = progresso or (lambda mensagem: None)
+    ultimo_dia = ate or timezone.localdate() - timedelta(days=1)
+    fim = timezone.make_aware(datetime.combine(ultimo_dia + timedelta(days=1), datetime.min.time()))
+    inicio = fim - timedelta(days=dias)
+    tipos = [tipo for tipo, _ in Item.TIPO_CHOICES]
+    pesos = [PESOS_TIPO.get(tipo, 1) for tipo in tipos]
+    rotulos = dict(Item.TIPO_CHOICES)
+    comeco_geral = time.perf_counter()
+
+    doadores = _pessoas(Doador, 'doador', max(int(doacoes / doacoes_por_doador), 1), aleatorio, inicio, dias, lote)
+    aleatorio.shuffle(doadores)
+    informar(f'{len(doadores)} doadores')
+    recebedores = _pessoas(
+        Recebedor, 'recebedor', max(int(doacoes / doacoes_por_recebedor), 1), aleatorio, inicio, dias, lote
+    )
+    aleatorio.shuffle(recebedores)
+    informar(f'{len(recebedores)} recebedores')
+
+    gravador_itens = Gravador(
+        Item, ('nome', 'tipo', 'descricao', 'disponivel', 'foto', 'foto_variantes', 'doador', 'ultima_atualizacao')
+    )
+    gravador_doacoes = Gravador(
+        Doacao, ('doador', 'recebedor', 'item', 'valor', 'data', 'observacoes', 'ultima_atualizacao')
+    )
+    ops = gravador_doacoes.conexao.ops
+    sem_variantes = Item._meta.get_field('foto_variantes').get_db_prep_save({}, gravador_itens.conexao)
+    total_doadores, total_recebedores = len(doadores), len(recebedores)
+    passo = dias * 86400 / max(doacoes, 1)
+    itens = 0
+    textos_itens = {}
+    for comeco in range(0, doacoes, lote):
+        linhas_itens, linhas_doacoes, documentos = [], [], []
+        for i in range(comeco, min(comeco + lote, doacoes)):
+            data = ops.adapt_datetimefield_value(inicio + timedelta(seconds=(i + aleatorio.random()) * passo))
+            doador = doadores[int(total_doadores * aleatorio.random() ** concentracao)]
+            recebedor = (
+                recebedores[int(total_recebedores * aleatorio.random() ** concentracao)]
+                if aleatorio.random() < proporcao_com_recebedor else None
+            )
+            item = valor = None
+            if aleatorio.random() < proporcao_itens:
+                # Os primeiros itens passam por todos os tipos
+                tipo = tipos[itens] if itens < len(tipos) else aleatorio.choices(tipos, pesos)[0]
+                nome = aleatorio.choice(NOMES_ITEM.get(tipo, (rotulos[tipo],)))
+                item = gravador_itens.reservar()
+                descricao = f'{nome} em bom estado'
+                linhas_itens.append(
+                    (item, nome, tipo, descricao, recebedor is None, None, sem_variantes, doador, data)
+                )
+                # Poucos nomes distintos: o texto normalizado é calculado uma vez por nome
+                if nome not in textos_itens:
+                    textos_itens[nome] = busca.documento('item', ItemIndexado(item, nome, descricao))[1:]
+                documentos.append((busca.chave('item', item), *textos_itens[nome]))
+                itens += 1
+            else:
+                valor = ops.adapt_decimalfield_value(_valor(aleatorio), 10, 2)
+            linhas_doacoes.append((gravador_doacoes.reservar(), doador, recebedor, item, valor, data, '', data))
+        with transaction.atomic(using=gravador_doacoes.conexao.alias):
+            gravador_itens.gravar(linhas_itens)
+            _indexar(gravador_itens, documentos)
+            gravador_doacoes.gravar(linhas_doacoes)
+        informar(f'{comeco + len(linhas_doacoes)} de {doacoes} doações')
+    gravador_itens.ajustar_sequencia()
+    gravador_doacoes.ajustar_sequencia()
+
+    if resumos:
+        reconstruir_resumo()
+        reconstruir_resumo_diario()
+        informar(f'Resumos reconstruídos ({time.perf_counter() - comeco_geral:.1f}s no total)')
+    return {'doadores': total_doadores, 'recebedores': total_recebedores, 'itens': itens, 'doacoes': doacoes}
@@ -0,0 +1,133 @@
+"""
+Exportação em streaming (CSV e NDJSON) dos cadastros e das doações.
+
+As linhas saem de ``QuerySet.values_list().iterator()`` (cursor no servidor
+no PostgreSQL) direto para um StreamingHttpResponse, então a memória fica
+constante independentemente do número de registros e o primeiro byte é
+enviado assim que a consulta começa a retornar.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+TAMANHO_CHUNK = 2000
+
+
+def renderizar_erro(data):
+    # Os renderers de exportação só chegam a renderizar respostas de erro
+    # (filtro inválido, 401/403); o conteúdo exportado já sai em streaming.
+    if data is None:
+        return b''
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+class CSVStreamRenderer(BaseRenderer):
+    """Permite à negociação de conteúdo aceitar ``?format=csv``."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return renderizar_erro(data)
+
+
+class NDJSONStreamRenderer(BaseRenderer):
+    """Permite à negociação de conteúdo aceitar ``?format=ndjson``."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return renderizar_erro(data)
+
+
+class Eco:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv(colunas, linhas):
+    escritor = csv.writer(Eco())
+    yield escritor.writerow(colunas)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+def linhas_ndjson(colunas, linhas):
+    for linha in linhas:
+        yield json.dumps(dict(zip(colunas, linha)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def converter_limite(valor, parametro, fim=False):
+    """Interpreta ``data_inicio``/``data_fim`` (data ou data/hora ISO)."""
+    if not valor:
+        return None
+    data = parse_datetime(valor)
+    if data is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValidationError({parametro: 'Use o formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS.'})
+        data = timezone.datetime(dia.year, dia.month, dia.day)
+        if fim:
+            data += timezone.timedelta(days=1)
+    if timezone.is_naive(data):
+        data = timezone.make_aware(data)
+    return data
+
+
+class ExportMixin:
+    """
+    Ação ``GET /api/<recurso>/export/?format=csv|ndjson``.
+
+    Cada viewset declara ``export_campos`` (pares coluna/lookup, podendo
+    atravessar relacionamentos), e opcionalmente ``export_campo_data`` e
+    ``export_campo_tipo`` para os filtros ``data_inicio``, ``data_fim`` e
+    ``tipo``.
+    """
+    export_campos = ()
+    export_campo_data = None
+    export_campo_tipo = None
+    export_nome = None
+
+    def filtrar_exportacao(self, queryset, params):
+        if self.export_campo_data:
+            inicio = converter_limite(params.get('data_inicio'), 'data_inicio')
+            fim = converter_limite(params.get('data_fim'), 'data_fim', fim=True)
+            if inicio:
+                queryset = queryset.filter(**{f'{self.export_campo_data}__gte': inicio})
+            if fim:
+                queryset = queryset.filter(**{f'{self.export_campo_data}__lt': fim})
+        tipo = params.get('tipo')
+        if self.export_campo_tipo and tipo:
+            queryset = queryset.filter(**{self.export_campo_tipo: tipo.upper()})
+        return queryset
+
+    @action(
+        detail=False, methods=['get'], url_path='export',
+        renderer_classes=[CSVStreamRenderer, NDJSONStreamRenderer],
+    )
+    def export(self, request):
+        colunas = [coluna for coluna, _ in self.export_campos]
+        lookups = [lookup for _, lookup in self.export_campos]
+        queryset = self.filtrar_exportacao(self.queryset.all(), request.query_params)
+        linhas = queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=TAMANHO_CHUNK)
+
+        formato = request.accepted_renderer.format
+        nome = f"{self.export_nome}-{timezone.now():%Y%m%d-%H%M%S}.{formato}"
+        if formato == 'ndjson':
+            response = StreamingHttpResponse(
+                linhas_ndjson(colunas, linhas), content_type='application/x-ndjson; charset=utf-8'
+            )
+        else:
+            response = StreamingHttpResponse(linhas_csv(colunas, linhas), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{nome}"'
+        return response
@@ -0,0 +1,109 @@
+"""
+Suporte ao cabeçalho ``Idempotency-Key``.
+
+O cliente envia uma chave única por operação; se a requisição for repetida
+(por exemplo, depois de um timeout), a resposta original é devolvida a partir
+da tabela ChaveIdempotencia em vez de executar a operação de novo.
+
+A resposta é gravada na mesma transação que os registros criados, então só
+existe chave para operações que realmente foram efetivadas. Se duas
+requisições com a mesma chave chegam ao mesmo tempo, a restrição única faz a
+segunda falhar com IntegrityError e ser desfeita inteira; ela então devolve o
+que a primeira gravou (ver ``resposta_concorrente``).
+
+Apenas respostas de sucesso são guardadas: uma requisição recusada pode ser
+corrigida e reenviada com a mesma chave.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ChaveIdempotencia
+
+CABECALHO = 'Idempotency-Key'
+TAMANHO_MAXIMO = 255
+
+
+class ChaveInvalida(Exception):
+    pass
+
+
+class EncoderRequisicao(DjangoJSONEncoder):
+    def default(self, o):
+        # Arquivos entram no hash pelo nome e tamanho, sem ler o conteúdo
+        if isinstance(o, UploadedFile):
+            return f'{o.name}:{o.size}'
+        return super().default(o)
+
+
+def ler_chave(request):
+    """Retorna a chave enviada pelo cliente ou None; ChaveInvalida se vazia ou longa demais."""
+    chave = request.headers.get(CABECALHO)
+    if chave is None:
+        return None
+    chave = chave.strip()
+    if not chave or len(chave) > TAMANHO_MAXIMO:
+        raise ChaveInvalida(f'{CABECALHO} deve ter entre 1 e {TAMANHO_MAXIMO} caracteres.')
+    return chave
+
+
+def hash_requisicao(request):
+    dados = request.data
+    if hasattr(dados, 'lists'):
+        dados = dict(dados.lists())
+    corpo = json.dumps(dados, sort_keys=True, cls=EncoderRequisicao)
+    return hashlib.sha256(corpo.encode('utf-8')).hexdigest()
+
+
+def limite_validade():
+    return timezone.now() - timedelta(hours=settings.IDEMPOTENCIA_VALIDADE_HORAS)
+
+
+def _reproduzir(registro, hash_atual):
+    if registro.hash_requisicao != hash_atual:
+        return Response(
+            {'error': f'{CABECALHO} já foi usada com uma requisição diferente.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(registro.resposta, status=registro.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def resposta_armazenada(usuario_id, operacao, chave, hash_atual):
+    """Resposta já enviada para a chave, ou None se a operação ainda não foi executada."""
+    registro = ChaveIdempotencia.objects.filter(
+        usuario_id=usuario_id, operacao=operacao, chave=chave
+    ).first()
+    if registro is None:
+        return None
+    if registro.criada_em < limite_validade():
+        # Chave vencida: a operação pode ser executada de novo
+        registro.delete()
+        return None
+    return _reproduzir(registro, hash_atual)
+
+
+def resposta_concorrente(usuario_id, operacao, chave, hash_atual):
+    """Depois de um IntegrityError, a resposta gravada por outra requisição com a mesma chave."""
+    registro = ChaveIdempotencia.objects.filter(
+        usuario_id=usuario_id, operacao=operacao, chave=chave
+    ).first()
+    return _reproduzir(registro, hash_atual) if registro else None
+
+
+def guardar_resposta(usuario_id, operacao, chave, hash_atual, status_code, resposta):
+    """Grava a resposta; deve ser chamada dentro da transação da própria operação."""
+    ChaveIdempotencia.objects.create(
+        usuario_id=usuario_id,
+        operacao=operacao,
+        chave=chave,
+        hash_requisicao=hash_atual,
+        status_code=status_code,
+        resposta=resposta,
+    )
@@ -0,0 +1,188 @@
+"""
+Processamento das fotos dos itens.
+
+Depois que um item com foto nova é gravado (e a transação confirmada), a foto
+é processada:
+
+- a orientação EXIF é aplicada aos pixels e todos os metadados (EXIF, GPS,
+  perfis) são removidos, inclusive do arquivo original, que é trocado por
+  uma cópia limpa (nunca regravado no lugar);
+- são geradas versões reduzidas (``VARIANTES``) no formato do original e em
+  WebP, gravadas ao lado do original (``itens/foto.jpg`` ->
+  ``itens/foto_thumb.jpg``, ``itens/foto_thumb.webp``...), além de um WebP
+  do original (``itens/foto_original.webp``).
+
+Os caminhos ficam em ``Item.foto_variantes``, gravado com um UPDATE que não
+dispara sinais. Enquanto o processamento não termina, o item continua com a
+foto original e ``foto_variantes`` vazio.
+
+Por padrão (``IMAGENS_ASSINCRONO=True``) o processamento é uma tarefa da fila
+(ver tarefas.py), fora da requisição: ela só anda com um worker rodando
+``manage.py executar_tarefas`` (o Dockerfile sobe um ao lado do servidor) ou
+com ``manage.py executar_tarefas --ate-esvaziar`` agendado em um cron (o
+build_files.sh esvazia a fila a cada deploy). Com ``IMAGENS_ASSINCRONO=False``
+a foto é processada logo após o commit, no processo da requisição; uma falha
+nesse ponto é registrada no log e não altera a resposta. Fotos que ficaram
+sem variantes são processadas por ``manage.py processar_fotos``.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Item
+from .tarefas import enfileirar, tarefa
+
+logger = logging.getLogger(__name__)
+
+# Maior lado (px) de cada versão reduzida
+VARIANTES = {
+    'thumb': 200,
+    'medio': 800,
+}
+
+FORMATOS = {
+    'JPEG': ('jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'PNG': ('png', {'optimize': True}),
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+}
+
+# Fotos aparecem nas listagens: passam na frente das tarefas comuns
+PRIORIDADE = 5
+
+
+def _formato_saida(imagem):
+    # GIF, BMP, TIFF etc. viram PNG (com transparência) ou JPEG
+    if imagem.format in ('JPEG', 'PNG'):
+        return imagem.format
+    return 'PNG' if imagem.mode in ('RGBA', 'LA', 'P') else 'JPEG'
+
+
+def _preparar(imagem, formato):
+    if formato == 'JPEG':
+        return imagem.convert('RGB')
+    if imagem.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        return imagem.convert('RGBA')
+    return imagem
+
+
+def _codificar(imagem, formato):
+    _, opcoes = FORMATOS[formato]
+    buffer = io.BytesIO()
+    # Sem exif=/icc_profile=, o Pillow grava a imagem sem nenhum metadado
+    imagem.save(buffer, format=formato, **opcoes)
+    return buffer.getvalue()
+
+
+def _gravar(storage, nome, conteudo):
+    if storage.exists(nome):
+        storage.delete(nome)
+    return storage.save(nome, ContentFile(conteudo))
+
+
+def _substituir(storage, nome, conteudo):
+    """
+    Troca o conteúdo de ``nome`` sem truncá-lo: grava uma cópia temporária e
+    a move por cima do original, que segue inteiro se a gravação falhar.
+    """
+    base, extensao = os.path.splitext(nome)
+    temporario = storage.save(f'{base}_tmp{extensao}', ContentFile(conteudo))
+    try:
+        try:
+            os.replace(storage.path(temporario), storage.path(nome))
+        except NotImplementedError:
+            # Storage sem caminho local: o original só é trocado com a cópia já gravada
+            _gravar(storage, nome, conteudo)
+            storage.delete(temporario)
+    except Exception:
+        if storage.exists(temporario):
+            storage.delete(temporario)
+        raise
+
+
+def gerar_variantes(foto):
+    """
+    Limpa o arquivo da foto e grava as versões derivadas ao lado dele.
+
+    Retorna ``{variante: {formato: caminho}}``; ``'original'`` traz o WebP do
+    original.
+    """
+    storage = foto.storage
+    base, _ = os.path.splitext(foto.name)
+    with storage.open(foto.name, 'rb') as arquivo:
+        imagem = Image.open(arquivo)
+        imagem.load()
+    formato_original = imagem.format
+    formato = _formato_saida(imagem)
+    extensao = FORMATOS[formato][0]
+    imagem = ImageOps.exif_transpose(imagem)
+
+    # O original é regravado sem metadados, no mesmo nome e formato (outros
+    # formatos, como GIF animado, são mantidos como enviados)
+    if formato_original in FORMATOS:
+        _substituir(storage, foto.name, _codificar(_preparar(imagem, formato_original), formato_original))
+
+    imagem = _preparar(imagem, formato)
+    variantes = {
+        'original': {'webp': _gravar(storage, f'{base}_original.webp', _codificar(_preparar(imagem, 'WEBP'), 'WEBP'))},
+    }
+    for variante, lado in VARIANTES.items():
+        reduzida = imagem.copy()
+        reduzida.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        variantes[variante] = {
+            extensao: _gravar(storage, f'{base}_{variante}.{extensao}', _codificar(reduzida, formato)),
+            'webp': _gravar(storage, f'{base}_{variante}.webp', _codificar(_preparar(reduzida, 'WEBP'), 'WEBP')),
+        }
+    return variantes
+
+
+def remover_variantes(storage, variantes):
+    for formatos in (variantes or {}).values():
+        for caminho in formatos.values():
+            try:
+                storage.delete(caminho)
+            except OSError as e:
+                logger.warning(f"Não foi possível remover a variante {caminho}: {str(e)}")
+
+
+@tarefa
+def processar_foto(item_id):
+    """Processa a foto atual do item; retorna True se as variantes foram gravadas."""
+    item = Item.objects.filter(pk=item_id).only('foto', 'foto_variantes').first()
+    if item is None or not item.foto:
+        return False
+    nome = item.foto.name
+    try:
+        variantes = gerar_variantes(item.foto)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # Arquivo que não é imagem, truncado ou grande demais: tentar de novo não adianta
+        logger.error(f"Erro ao processar a foto do item {item_id}: {str(e)}")
+        return False
+
+    # Só grava se a foto não foi trocada enquanto o processamento rodava
+    if not Item.objects.filter(pk=item_id, foto=nome).update(
+        foto_variantes=variantes, ultima_atualizacao=timezone.now()
+    ):
+        remover_variantes(item.foto.storage, variantes)
+        return False
+    return True
+
+
+def agendar_processamento(item_id, using=None):
+    """Enfileira o processamento da foto (na mesma transação) ou o executa após o commit."""
+    if getattr(settings, 'IMAGENS_ASSINCRONO', True):
+        enfileirar(processar_foto, args=[item_id], prioridade=PRIORIDADE)
+    else:
+        # robust: em autocommit o callback roda dentro do save(); uma falha
+        # não pode transformar em erro uma gravação que já aconteceu
+        transaction.on_commit(lambda: processar_foto(item_id), using=using, robust=True)
+
+
+def agendar_remocao(storage, variantes, using=None):
+    if variantes:
+        transaction.on_commit(lambda: remover_variantes(storage, variantes), using=using)
@@ -0,0 +1,432 @@
+"""
+Importação em massa de doadores, recebedores, itens e doações a partir de CSV.
+
+O arquivo é lido em streaming e processado em lotes: cada lote é validado
+em memória (sem consultas por linha), resolve doadores/recebedores já
+cadastrados pelas chaves naturais (email + telefone, ou nome + endereço,
+as mesmas das antigas constraints unique_doador_email_telefone e
+unique_doador_nome_endereco) e é gravado com bulk_create dentro de uma
+transação própria. A memória usada é limitada pelo tamanho do lote.
+
+Como bulk_create não dispara sinais, o resumo do dashboard é reconstruído
+ao final da importação; os registros novos entram no índice de busca junto
+com cada lote.
+"""
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import busca
+from .models import Doador, Recebedor, Item, Doacao
+
+CAMPOS_PESSOA = ('nome', 'email', 'telefone', 'endereco', 'observacoes')
+VERDADEIRO = {'1', 'true', 'sim', 's', 'yes', 'y', 'verdadeiro'}
+
+
+class LinhaInvalida(Exception):
+    """Erro de validação de uma linha do arquivo; a linha vai para o arquivo de rejeitados."""
+
+
+def texto(valor):
+    if valor is None:
+        return None
+    valor = valor.strip()
+    return valor or None
+
+
+def mensagem_erro(erro):
+    if isinstance(erro, ValidationError):
+        if hasattr(erro, 'message_dict'):
+            return '; '.join(f'{campo}: {" ".join(msgs)}' for campo, msgs in erro.message_dict.items())
+        return '; '.join(erro.messages)
+    return str(erro)
+
+
+def converter_valor(valor):
+    """Aceita '1234.56' e o formato brasileiro '1.234,56'."""
+    valor = texto(valor)
+    if valor is None:
+        return None
+    if ',' in valor:
+        valor = valor.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(valor)
+    except InvalidOperation:
+        raise LinhaInvalida(f'Valor inválido: {valor}')
+
+
+def converter_data(valor, agora):
+    valor = texto(valor)
+    if valor is None:
+        return agora
+    data = parse_datetime(valor)
+    if data is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise LinhaInvalida(f'Data inválida: {valor}')
+        data = timezone.datetime(dia.year, dia.month, dia.day)
+    if timezone.is_naive(data):
+        data = timezone.make_aware(data)
+    return data
+
+
+def converter_id(valor, campo):
+    valor = texto(valor)
+    if valor is None:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise LinhaInvalida(f'{campo} inválido: {valor}')
+
+
+def chaves_naturais(dados):
+    """Chaves usadas para reconhecer um doador/recebedor já cadastrado."""
+    chaves = []
+    if dados.get('email') and dados.get('telefone'):
+        chaves.append(('contato', dados['email'], dados['telefone']))
+    if dados.get('endereco'):
+        chaves.append(('endereco', dados['nome'], dados['endereco']))
+    return chaves
+
+
+def dados_pessoa(linha, prefixo=''):
+    return {campo: texto(linha.get(f'{prefixo}{campo}')) for campo in CAMPOS_PESSOA}
+
+
+def validar(obj, exclude=()):
+    """Valida campos e regras do modelo sem tocar no banco."""
+    try:
+        obj.clean_fields(exclude=list(exclude))
+        obj.clean()
+    except ValidationError as e:
+        raise LinhaInvalida(mensagem_erro(e))
+
+
+class ResolvedorPessoas:
+    """
+    Resolve, para um lote, os doadores ou recebedores referenciados pelas
+    linhas: reaproveita os já cadastrados e agenda a criação dos demais.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.pendentes = []
+        self.por_chave = {}
+
+    def adicionar(self, dados):
+        """Registra os dados de uma pessoa e retorna o objeto (novo ou a criar) correspondente."""
+        dados = {k: v for k, v in dados.items() if k in CAMPOS_PESSOA}
+        if dados.get('observacoes') is None:
+            dados['observacoes'] = ''
+        chaves = chaves_naturais(dados)
+        for chave in chaves:
+            if chave in self.por_chave:
+                return self.por_chave[chave]
+        obj = self.model(**dados)
+        validar(obj)
+        obj._chaves = chaves
+        self.pendentes.append(obj)
+        for chave in chaves:
+            self.por_chave[chave] = obj
+        return obj
+
+    def gravar(self, batch_size):
+        """
+        Troca os pendentes já cadastrados pelos registros existentes, insere o
+        restante e retorna quantos foram inseridos.
+        """
+        if not self.pendentes:
+            return 0
+        existentes = {}
+        contatos = [(o.email, o.telefone) for o in self.pendentes if o.email and o.telefone]
+        if contatos:
+            encontrados = self.model.objects.filter(
+                email__in={e for e, _ in contatos}, telefone__in={t for _, t in contatos}
+            ).values_list('pk', 'email', 'telefone')
+            for pk, email, telefone in encontrados:
+                existentes.setdefault(('contato', email, telefone), pk)
+        enderecos = [(o.nome, o.endereco) for o in self.pendentes if o.endereco]
+        if enderecos:
+            encontrados = self.model.objects.filter(
+                nome__in={n for n, _ in enderecos}, endereco__in={e for _, e in enderecos}
+            ).values_list('pk', 'nome', 'endereco')
+            for pk, nome, endereco in encontrados:
+                existentes.setdefault(('endereco', nome, endereco), pk)
+
+        novos = []
+        for obj in self.pendentes:
+            pk = next((existentes[c] for c in obj._chaves if c in existentes), None)
+            if pk is not None:
+                obj.pk = pk
+                obj._state.adding = False
+            else:
+                novos.append(obj)
+        self.model.objects.bulk_create(novos, batch_size=batch_size)
+        busca.indexar(novos)
+        return len(novos)
+
+
+class Importador:
+    """
+    Processa um CSV de ``doadores``, ``recebedores``, ``itens`` ou ``doacoes``.
+
+    Colunas aceitas:
+
+    * doadores/recebedores: nome, email, telefone, endereco, observacoes
+    * itens: nome, tipo, descricao, disponivel e o doador por ``doador_id``
+      ou por ``doador_nome``/``doador_email``/``doador_telefone``/``doador_endereco``
+    * doacoes: valor ou item (``item_id`` ou ``item_nome``/``item_tipo``/
+      ``item_descricao``), doador e recebedor (por id ou pelos campos com
+      prefixo ``doador_``/``recebedor_``), data e observacoes
+
+    Doadores e recebedores não encontrados são criados.
+    """
+    MODELOS = ('doadores', 'recebedores', 'itens', 'doacoes')
+
+    def __init__(self, modelo, batch_size=2000, progresso=None):
+        if modelo not in self.MODELOS:
+            raise ValueError(f'Modelo inválido: {modelo}. Use um de: {", ".join(self.MODELOS)}')
+        self.modelo = modelo
+        self.batch_size = batch_size
+        self.progresso = progresso
+        self.lidas = 0
+        self.inseridas = 0
+        self.existentes = 0
+        self.rejeitadas = 0
+
+    def importar(self, arquivo, rejeitos, delimitador=','):
+        """Lê ``arquivo`` (um arquivo texto aberto) e grava as linhas inválidas em ``rejeitos``."""
+        leitor = csv.DictReader(arquivo, delimiter=delimitador)
+        escritor = None
+        inicio = time.monotonic()
+        lote = []
+        for linha in leitor:
+            self.lidas += 1
+            lote.append((leitor.line_num, linha))
+            if len(lote) >= self.batch_size:
+                escritor = self._processar_lote(lote, leitor.fieldnames, rejeitos, escritor)
+                lote = []
+                self._informar(inicio)
+        if lote:
+            escritor = self._processar_lote(lote, leitor.fieldnames, rejeitos, escritor)
+            self._informar(inicio)
+        self.duracao = time.monotonic() - inicio
+        return self
+
+    @property
+    def linhas_por_segundo(self):
+        return self.lidas / self.duracao if getattr(self, 'duracao', 0) else 0
+
+    def _informar(self, inicio):
+        if self.progresso:
+            decorrido = time.monotonic() - inicio
+            taxa = self.lidas / decorrido if decorrido else 0
+            self.progresso(self, taxa)
+
+    def _rejeitar(self, rejeitos, escritor, campos, numero, linha, erro):
+        if escritor is None:
+            escritor = csv.DictWriter(rejeitos, fieldnames=['linha', *campos, 'erro'], extrasaction='ignore')
+            escritor.writeheader()
+        escritor.writerow({'linha': numero, **linha, 'erro': erro})
+        self.rejeitadas += 1
+        return escritor
+
+    def _processar_lote(self, lote, campos, rejeitos, escritor):
+        preparar = getattr(self, f'_preparar_{self.modelo}')
+        contexto = self._novo_contexto()
+        validas = []
+        for numero, linha in lote:
+            try:
+                validas.append((numero, linha, preparar(linha, contexto)))
+            except LinhaInvalida as e:
+                escritor = self._rejeitar(rejeitos, escritor, campos, numero, linha, str(e))
+
+        # Referências por id precisam existir; uma consulta por tabela para o lote todo
+        inexistentes = self._ids_inexistentes(contexto)
+        if any(inexistentes.values()):
+            restantes = []
+            for numero, linha, dados in validas:
+                erro = self._referencia_inexistente(dados, inexistentes)
+                if erro:
+                    escritor = self._rejeitar(rejeitos, escritor, campos, numero, linha, erro)
+                else:
+                    restantes.append((numero, linha, dados))
+            validas = restantes
+
+        if not validas:
+            return escritor
+        try:
+            with transaction.atomic():
+                self._gravar(validas, contexto)
+        except Exception as e:
+            # Falha no banco (ex.: integridade) rejeita o lote inteiro
+            for numero, linha, _ in validas:
+                escritor = self._rejeitar(rejeitos, escritor, campos, numero, linha, f'Erro ao gravar lote: {e}')
+        return escritor
+
+    # --- Preparação por tipo de arquivo ------------------------------------
+
+    def _novo_contexto(self):
+        contexto = {
+            'doadores': ResolvedorPessoas(Doador),
+            'recebedores': ResolvedorPessoas(Recebedor),
+            'ids_doador': set(),
+            'ids_recebedor': set(),
+            'ids_item': set(),
+            'agora': timezone.now(),
+        }
+        if self.modelo in ('doadores', 'recebedores'):
+            contexto['pessoas'] = contexto[self.modelo]
+        return contexto
+
+    def _ids_inexistentes(self, contexto):
+        inexistentes = {}
+        for chave, model in (('doador', Doador), ('recebedor', Recebedor), ('item', Item)):
+            ids = contexto[f'ids_{chave}']
+            if ids:
+                encontrados = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+                inexistentes[chave] = ids - encontrados
+        return inexistentes
+
+    @staticmethod
+    def _referencia_inexistente(dados, inexistentes):
+        for chave in ('doador', 'recebedor'):
+            if isinstance(dados.get(chave), int) and dados[chave] in inexistentes.get(chave, ()):
+                return f'{chave.capitalize()} {dados[chave]} não encontrado'
+        doacao = dados.get('doacao')
+        if doacao is not None and doacao.item_id in inexistentes.get('item', ()):
+            return f'Item {doacao.item_id} não encontrado'
+        return None
+
+    def _pessoa_referenciada(self, linha, prefixo, contexto, obrigatorio):
+        campo_id = f'{prefixo}_id'
+        pk = converter_id(linha.get(campo_id), campo_id)
+        if pk is not None:
+            contexto[f'ids_{prefixo}'].add(pk)
+            return pk
+        dados = dados_pessoa(linha, f'{prefixo}_')
+        if dados['nome'] is None:
+            if obrigatorio:
+                raise LinhaInvalida(f'Informe {campo_id} ou {prefixo}_nome.')
+            return None
+        resolvedor = contexto['doadores' if prefixo == 'doador' else 'recebedores']
+        return resolvedor.adicionar(dados)
+
+    def _preparar_doadores(self, linha, contexto):
+        return {'pessoa': contexto['pessoas'].adicionar(dados_pessoa(linha))}
+
+    _preparar_recebedores = _preparar_doadores
+
+    def _preparar_itens(self, linha, contexto):
+        disponivel = texto(linha.get('disponivel'))
+        item = Item(
+            nome=texto(linha.get('nome')),
+            tipo=(texto(linha.get('tipo')) or '').upper(),
+            descricao=texto(linha.get('descricao')) or '',
+            disponivel=True if disponivel is None else disponivel.lower() in VERDADEIRO,
+        )
+        validar(item, exclude=['doador', 'foto'])
+        doador = self._pessoa_referenciada(linha, 'doador', contexto, obrigatorio=False)
+        return {'item': item, 'doador': doador}
+
+    def _preparar_doacoes(self, linha, contexto):
+        valor = converter_valor(linha.get('valor'))
+        item_id = converter_id(linha.get('item_id'), 'item_id')
+        item = None
+        if item_id is not None:
+            contexto['ids_item'].add(item_id)
+        elif texto(linha.get('item_nome')):
+            item = Item(
+                nome=texto(linha.get('item_nome')),
+                tipo=(texto(linha.get('item_tipo')) or '').upper(),
+                descricao=texto(linha.get('item_descricao')) or '',
+                # Como no wizard: item entregue a um recebedor deixa de estar disponível
+                disponivel=not (texto(linha.get('recebedor_id')) or texto(linha.get('recebedor_nome'))),
+            )
+            validar(item, exclude=['doador', 'foto'])
+
+        # Mesmas regras de Doacao.clean(), sem acessar o banco
+        tem_item = item is not None or item_id is not None
+        if not tem_item and not valor:
+            raise LinhaInvalida('É necessário fornecer um item ou um valor para a doação')
+        if tem_item and valor:
+            raise LinhaInvalida('Uma doação não pode ter item e valor monetário simultaneamente')
+        if valor is not None and valor <= 0:
+            raise LinhaInvalida('O valor da doação deve ser maior que zero')
+
+        doacao = Doacao(
+            valor=valor,
+            item_id=item_id,
+            data=converter_data(linha.get('data'), contexto['agora']),
+            observacoes=texto(linha.get('observacoes')) or '',
+        )
+        try:
+            doacao.clean_fields(exclude=['doador', 'recebedor', 'item'])
+        except ValidationError as e:
+            raise LinhaInvalida(mensagem_erro(e))
+
+        # Pessoas só são registradas depois que o restante da linha foi validado
+        doador = self._pessoa_referenciada(linha, 'doador', contexto, obrigatorio=True)
+        recebedor = self._pessoa_referenciada(linha, 'recebedor', contexto, obrigatorio=False)
+        return {'doacao': doacao, 'doador': doador, 'recebedor': recebedor, 'item': item}
+
+    # --- Gravação ---------------------------------------------------------
+
+    @staticmethod
+    def _pk(referencia):
+        return referencia.pk if hasattr(referencia, 'pk') else referencia
+
+    def _gravar(self, validas, contexto):
+        if self.modelo in ('doadores', 'recebedores'):
+            inseridos = contexto['pessoas'].gravar(self.batch_size)
+            self.inseridas += inseridos
+            # Linhas já cadastradas ou repetidas no próprio arquivo
+            self.existentes += len(validas) - inseridos
+            return
+
+        contexto['doadores'].gravar(self.batch_size)
+        contexto['recebedores'].gravar(self.batch_size)
+
+        if self.modelo == 'itens':
+            itens = []
+            for _, _, dados in validas:
+                dados['item'].doador_id = self._pk(dados['doador'])
+                itens.append(dados['item'])
+            Item.objects.bulk_create(itens, batch_size=self.batch_size)
+            busca.indexar(itens)
+            self.inseridas += len(itens)
+            return
+
+        itens = []
+        for _, _, dados in validas:
+            if dados['item'] is not None:
+                dados['item'].doador_id = self._pk(dados['doador'])
+                itens.append(dados['item'])
+        Item.objects.bulk_create(itens, batch_size=self.batch_size)
+        busca.indexar(itens)
+
+        doacoes = []
+        for _, _, dados in validas:
+            doacao = dados['doacao']
+            doacao.doador_id = self._pk(dados['doador'])
+            doacao.recebedor_id = self._pk(dados['recebedor'])
+            if dados['item'] is not None:
+                doacao.item_id = dados['item'].pk
+            doacoes.append(doacao)
+        # bulk_create grava o auto_now_add de data com o horário atual; as datas
+        # do arquivo entram em seguida, sem mexer no campo compartilhado do modelo
+        datas = [doacao.data for doacao in doacoes]
+        Doacao.objects.bulk_create(doacoes, batch_size=self.batch_size)
+        historicas = []
+        for doacao, data in zip(doacoes, datas):
+            if doacao.data != data:
+                doacao.data = data
+                historicas.append(doacao)
+        Doacao.objects.bulk_update(historicas, ['data'], batch_size=self.batch_size)
+        self.inseridas += len(doacoes)
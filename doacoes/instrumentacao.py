@@ -0,0 +1,108 @@
+"""
+Medição do tempo de cada requisição (ver InstrumentacaoMiddleware).
+
+Durante a requisição, um objeto ``Medicao`` guardado numa ContextVar soma:
+
+- ``banco``: consultas e tempo no banco, por um ``execute_wrapper`` instalado
+  nas conexões só enquanto a requisição dura;
+- ``template``: renderização dos templates, pelo backend ``DjangoTemplates``
+  deste módulo (configurado em ``TEMPLATES``);
+- ``serializacao``: ``to_representation`` dos serializers da API que usam
+  ``SerializacaoMedidaMixin``.
+
+Blocos aninhados da mesma categoria contam uma vez (um serializer expandido
+dentro de outro, um template renderizado por uma tag). As categorias se
+sobrepõem: uma consulta feita durante a renderização conta no banco e no
+template. Fora de uma requisição (comandos, tarefas) nada é medido e o custo
+é uma leitura da ContextVar.
+"""
+import time
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend_django
+
+CATEGORIAS = ('template', 'serializacao')
+
+_medicao = ContextVar('medicao', default=None)
+
+
+class Medicao:
+    """Tempos e contagem de consultas de uma requisição."""
+    __slots__ = ('inicio', 'consultas', 'banco', 'tempos', 'abertas')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.banco = 0.0
+        self.tempos = dict.fromkeys(CATEGORIAS, 0.0)
+        self.abertas = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper das conexões (ver connection.execute_wrapper)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.banco += time.perf_counter() - inicio
+
+    def ativar(self):
+        return _medicao.set(self)
+
+    @staticmethod
+    def desativar(token):
+        _medicao.reset(token)
+
+
+def medicao_atual():
+    return _medicao.get()
+
+
+class medir:
+    """Soma a duração do bloco à ``categoria`` da requisição atual, se houver."""
+    __slots__ = ('categoria', 'medicao', 'inicio')
+
+    def __init__(self, categoria):
+        self.categoria = categoria
+        self.medicao = None
+
+    def __enter__(self):
+        medicao = _medicao.get()
+        if medicao is not None and self.categoria not in medicao.abertas:
+            medicao.abertas.add(self.categoria)
+            self.medicao = medicao
+            self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.medicao is not None:
+            self.medicao.tempos[self.categoria] += time.perf_counter() - self.inicio
+            self.medicao.abertas.discard(self.categoria)
+            self.medicao = None
+
+
+class SerializacaoMedidaMixin:
+    """Serializer cujo ``to_representation`` entra no tempo de serialização."""
+
+    def to_representation(self, instance):
+        with medir('serializacao'):
+            return super().to_representation(instance)
+
+
+class Template(backend_django.Template):
+    def render(self, context=None, request=None):
+        with medir('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(backend_django.DjangoTemplates):
+    """O backend padrão do Django, com a renderização medida."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend_django.reraise(exc, self)
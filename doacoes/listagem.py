@@ -0,0 +1,114 @@
+"""
+Paginação, busca e ordenação das páginas HTML de listagem.
+
+Toda a filtragem e ordenação é feita no banco; a página nunca renderiza
+mais que ``TAMANHO_MAXIMO`` registros.
+"""
+from functools import reduce
+import operator
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.http import urlencode
+
+TAMANHO_PAGINA = 25
+TAMANHO_MAXIMO = 100
+OPCOES_TAMANHO = [25, 50, 100]
+
+
+def filtrar_busca(queryset, busca, campos_busca):
+    """Filtra o queryset pelos registros que contêm ``busca`` em algum dos campos."""
+    if not busca:
+        return queryset
+    condicoes = [Q(**{f'{campo}__icontains': busca}) for campo in campos_busca]
+    return queryset.filter(reduce(operator.or_, condicoes))
+
+
+def tamanho_pagina(request):
+    try:
+        tamanho = int(request.GET.get('por_pagina', TAMANHO_PAGINA))
+    except (TypeError, ValueError):
+        return TAMANHO_PAGINA
+    return min(max(tamanho, 1), TAMANHO_MAXIMO)
+
+
+def numero_pagina(request):
+    try:
+        return max(int(request.GET.get('pagina', 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+class PaginaCombinada:
+    """
+    Página comum a listagens exibidas na mesma tabela, cada uma com o seu
+    Paginator. A navegação vai até a última página da maior delas; as
+    listagens que acabaram antes ficam com a página ``None``.
+    """
+
+    def __init__(self, paginators, numero):
+        self.paginator = self
+        # Linhas da tabela: as listagens ocupam as mesmas linhas lado a lado
+        self.count = max(paginator.count for paginator in paginators)
+        self.num_pages = max(paginator.num_pages for paginator in paginators)
+        self.number = min(max(numero, 1), self.num_pages)
+        self.paginas = [
+            paginator.page(self.number) if self.number <= paginator.num_pages else None
+            for paginator in paginators
+        ]
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_next(self):
+        return self.number < self.num_pages
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+
+def paginar_listagem(request, queryset, campos_busca, ordenacoes, ordenacao_padrao):
+    """
+    Aplica busca (``?q=``), ordenação (``?ordem=campo`` ou ``?ordem=-campo``)
+    e paginação (``?pagina=`` e ``?por_pagina=``) ao queryset.
+
+    ``ordenacoes`` mapeia o nome público da coluna para o campo do modelo
+    (ou uma tupla de campos); o ``id`` é sempre acrescentado como desempate
+    para a ordem ser estável.
+    """
+    busca = request.GET.get('q', '').strip()
+    queryset = filtrar_busca(queryset, busca, campos_busca)
+
+    ordem = request.GET.get('ordem', ordenacao_padrao)
+    if ordem.lstrip('-') not in ordenacoes:
+        ordem = ordenacao_padrao
+    descendente = ordem.startswith('-')
+    campos = ordenacoes[ordem.lstrip('-')]
+    if isinstance(campos, str):
+        campos = (campos,)
+    prefixo = '-' if descendente else ''
+    queryset = queryset.order_by(*[f'{prefixo}{campo}' for campo in campos], f'{prefixo}id')
+
+    tamanho = tamanho_pagina(request)
+    paginator = Paginator(queryset, tamanho)
+    page_obj = paginator.get_page(numero_pagina(request))
+
+    parametros = {'ordem': ordem, 'por_pagina': tamanho}
+    if busca:
+        parametros['q'] = busca
+    parametros_busca = {k: v for k, v in parametros.items() if k != 'ordem'}
+
+    return {
+        'page_obj': page_obj,
+        'busca': busca,
+        'ordem': ordem,
+        'por_pagina': tamanho,
+        'opcoes_por_pagina': OPCOES_TAMANHO,
+        # Query string sem a página, usada nos links de paginação
+        'querystring': urlencode(parametros),
+        # Query string sem a ordem, usada nos cabeçalhos ordenáveis
+        'querystring_ordem': urlencode(parametros_busca),
+    }
@@ -0,0 +1,249 @@
+"""
+Operações em lote nos viewsets da API.
+
+``POST``, ``PATCH`` e ``DELETE`` em ``/api/<recurso>/bulk/`` recebem uma
+lista e executam tudo em uma única transação: primeiro cada elemento é
+validado (com os relacionamentos carregados de uma vez), depois as escritas
+são feitas com bulk_create/bulk_update/delete. Se algum elemento for
+inválido nada é gravado e a resposta lista os erros por posição.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import busca, metricas, resumo
+from .cache_dashboard import agendar_invalidacao
+from .models import Doador, Recebedor, Item, Doacao
+
+LOTE_MAXIMO = 1000
+TAMANHO_BATCH = 500
+
+
+class RelacionadoEmLote(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField que usa os objetos pré-carregados pelo lote em vez de um SELECT por elemento."""
+
+    def to_internal_value(self, data):
+        carregados = self.context.get('relacionados', {}).get(self.field_name)
+        if carregados is None:
+            return super().to_internal_value(data)
+        pk = converter_pk(self.get_queryset().model, data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = carregados.get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+def converter_pk(model, valor):
+    if isinstance(valor, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(valor)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+
+def erros_do_modelo(erro):
+    if hasattr(erro, 'error_dict'):
+        return erro.message_dict
+    return {'non_field_errors': erro.messages}
+
+
+def contabilizar(obj, sinal):
+    """Aplica ao resumo do dashboard a criação (1) ou a remoção (-1) de ``obj``."""
+    if isinstance(obj, Doacao):
+        resumo.contabilizar_doacao(resumo.estado_doacao(obj), sinal)
+    elif isinstance(obj, Item):
+        resumo.contabilizar_item(obj.tipo, sinal)
+    elif isinstance(obj, Doador):
+        resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_DOADORES, sinal)
+    elif isinstance(obj, Recebedor):
+        resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_RECEBEDORES, sinal)
+
+
+class BulkMixin:
+    """
+    Ação ``/api/<recurso>/bulk/``:
+
+    * ``POST`` com uma lista de objetos cria todos eles;
+    * ``PATCH`` com uma lista de objetos com ``id`` atualiza só os campos enviados;
+    * ``DELETE`` com uma lista de ids exclui os registros.
+    """
+    lote_maximo = LOTE_MAXIMO
+
+    def get_serializer_lote(self, *args, **kwargs):
+        base = self.get_serializer_class()
+        classe = type(f'{base.__name__}EmLote', (base,), {'serializer_related_field': RelacionadoEmLote})
+        kwargs.setdefault('context', self.get_serializer_context())
+        return classe(*args, **kwargs)
+
+    def carregar_relacionados(self, elementos):
+        """Busca com um SELECT por relacionamento todos os objetos referenciados no lote."""
+        relacionados = {}
+        for nome, campo in self.get_serializer_lote().fields.items():
+            if not isinstance(campo, serializers.PrimaryKeyRelatedField) or campo.read_only:
+                continue
+            model = campo.get_queryset().model
+            pks = {
+                converter_pk(model, elemento[nome])
+                for elemento in elementos if elemento.get(nome) is not None
+            }
+            pks.discard(None)
+            relacionados[nome] = campo.get_queryset().in_bulk(pks) if pks else {}
+        return relacionados
+
+    def ler_lote(self, request, exige_objetos=True):
+        """Valida o formato do corpo; retorna (elementos, resposta de erro)."""
+        elementos = request.data
+        if not isinstance(elementos, list) or not elementos:
+            return None, Response(
+                {'error': 'Envie uma lista não vazia.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(elementos) > self.lote_maximo:
+            return None, Response(
+                {'error': f'O lote pode ter no máximo {self.lote_maximo} elementos.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if exige_objetos and not all(isinstance(e, dict) for e in elementos):
+            return None, Response(
+                {'error': 'Cada elemento do lote deve ser um objeto.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return elementos, None
+
+    def resposta_erros(self, erros):
+        return Response({'errors': erros}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        elementos, erro = self.ler_lote(request)
+        if erro:
+            return erro
+        contexto = {**self.get_serializer_context(), 'relacionados': self.carregar_relacionados(elementos)}
+        model = self.queryset.model
+
+        objetos, erros = [], []
+        for indice, elemento in enumerate(elementos):
+            serializer = self.get_serializer_lote(data=elemento, context=contexto)
+            if not serializer.is_valid():
+                erros.append({'index': indice, 'errors': serializer.errors})
+                continue
+            obj = model(**serializer.validated_data)
+            try:
+                obj.clean()
+            except DjangoValidationError as e:
+                erros.append({'index': indice, 'errors': erros_do_modelo(e)})
+                continue
+            objetos.append(obj)
+        if erros:
+            return self.resposta_erros(erros)
+
+        with transaction.atomic(), resumo.deltas_agrupados():
+            model.objects.bulk_create(objetos, batch_size=TAMANHO_BATCH)
+            for obj in objetos:
+                contabilizar(obj, 1)
+            if model in busca.TIPO_POR_MODELO:
+                busca.indexar(objetos)
+            if model is Doacao:
+                transaction.on_commit(lambda: metricas.contar_doacoes(objetos))
+            agendar_invalidacao()
+        return Response(self.get_serializer(objetos, many=True).data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        elementos, erro = self.ler_lote(request)
+        if erro:
+            return erro
+        model = self.queryset.model
+        pks = [converter_pk(model, elemento.get('id')) for elemento in elementos]
+        contexto = {**self.get_serializer_context(), 'relacionados': self.carregar_relacionados(elementos)}
+
+        with transaction.atomic():
+            instancias = self.get_queryset().select_for_update(of=('self',)).in_bulk(
+                [pk for pk in pks if pk is not None]
+            )
+            objetos, anteriores, campos, erros, vistos = [], [], set(), [], set()
+            for indice, (pk, elemento) in enumerate(zip(pks, elementos)):
+                obj = instancias.get(pk)
+                if obj is None:
+                    erros.append({'index': indice, 'errors': {'id': ['Registro não encontrado.']}})
+                    continue
+                if pk in vistos:
+                    erros.append({'index': indice, 'errors': {'id': ['Registro repetido no lote.']}})
+                    continue
+                vistos.add(pk)
+                serializer = self.get_serializer_lote(obj, data=elemento, partial=True, context=contexto)
+                if not serializer.is_valid():
+                    erros.append({'index': indice, 'errors': serializer.errors})
+                    continue
+                anterior = model(**{f.attname: getattr(obj, f.attname) for f in model._meta.concrete_fields})
+                for campo, valor in serializer.validated_data.items():
+                    setattr(obj, campo, valor)
+                    campos.add(campo)
+                try:
+                    obj.clean()
+                except DjangoValidationError as e:
+                    erros.append({'index': indice, 'errors': erros_do_modelo(e)})
+                    continue
+                objetos.append(obj)
+                anteriores.append(anterior)
+            if erros:
+                transaction.set_rollback(True)
+                return self.resposta_erros(erros)
+
+            for campo in model._meta.concrete_fields:
+                if getattr(campo, 'auto_now', False):
+                    for obj in objetos:
+                        campo.pre_save(obj, add=False)
+                    campos.add(campo.name)
+
+            with resumo.deltas_agrupados():
+                if campos:
+                    model.objects.bulk_update(objetos, sorted(campos), batch_size=TAMANHO_BATCH)
+                for anterior, obj in zip(anteriores, objetos):
+                    contabilizar(anterior, -1)
+                    contabilizar(obj, 1)
+                if model is Item:
+                    resumo.mover_tipo_itens({
+                        obj.pk: (anterior.tipo, obj.tipo)
+                        for anterior, obj in zip(anteriores, objetos) if anterior.tipo != obj.tipo
+                    })
+            if model in busca.TIPO_POR_MODELO and campos & set(busca.CAMPOS[busca.TIPO_POR_MODELO[model]]):
+                busca.indexar(objetos)
+            agendar_invalidacao()
+        return Response(self.get_serializer(objetos, many=True).data)
+
+    def bulk_destroy(self, request):
+        elementos, erro = self.ler_lote(request, exige_objetos=False)
+        if erro:
+            return erro
+        model = self.queryset.model
+        # Aceita tanto [1, 2] quanto [{"id": 1}, {"id": 2}]
+        pks = [
+            converter_pk(model, elemento.get('id') if isinstance(elemento, dict) else elemento)
+            for elemento in elementos
+        ]
+
+        with transaction.atomic():
+            existentes = set(
+                self.queryset.filter(pk__in=[pk for pk in pks if pk is not None])
+                .select_for_update().values_list('pk', flat=True)
+            )
+            erros = [
+                {'index': indice, 'errors': {'id': ['Registro não encontrado.']}}
+                for indice, pk in enumerate(pks) if pk not in existentes
+            ]
+            if erros:
+                return self.resposta_erros(erros)
+            # Os sinais de exclusão continuam valendo; os deltas do resumo são gravados de uma vez
+            with resumo.deltas_agrupados():
+                _, por_modelo = self.queryset.filter(pk__in=existentes).delete()
+        return Response({'deleted': por_modelo.get(model._meta.label, 0)})
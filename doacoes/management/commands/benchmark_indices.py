@@ -0,0 +1,126 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from doacoes.models import Doador, Recebedor, Item, Doacao
+
+TAMANHO_PAGINA = 25
+
+# Índices da migração 0010_index_plan, removidos temporariamente com --comparar
+INDICES_PLANO = {
+    'doacao_dinheiro_data_idx', 'doador_cadastro_id_idx', 'recebedor_cadastro_id_idx',
+    'item_tipo_nome_idx', 'item_disponivel_nome_idx',
+}
+# Índices das migrações 0008 e 0009 (ordenação por nome/data e buscas por prefixo)
+INDICES_ANTERIORES = {
+    'doador_nome_id_idx', 'recebedor_nome_id_idx', 'item_nome_id_idx', 'doacao_data_id_idx',
+}
+
+
+def consultas():
+    """As consultas das páginas e endpoints de listagem, como views.py e viewsets.py as montam."""
+    dinheiro = Doacao.objects.filter(valor__isnull=False)
+    return {
+        'doacao_list (data)': lambda: list(
+            Doacao.objects.select_related('doador', 'recebedor', 'item').order_by('-data', '-id')[:TAMANHO_PAGINA]
+        ),
+        'dashboard (recentes)': lambda: list(
+            Doacao.objects.select_related('doador', 'recebedor', 'item').order_by('-data')[:5]
+        ),
+        'item_list (dinheiro)': lambda: list(
+            dinheiro.select_related('doador', 'recebedor').order_by('-data', '-id')[:TAMANHO_PAGINA]
+        ),
+        'item_list (dinheiro, contagem)': lambda: dinheiro.count(),
+        'item_list (tipo)': lambda: list(
+            Item.objects.select_related('doador').order_by('tipo', 'nome', 'id')[:TAMANHO_PAGINA]
+        ),
+        'item_list (disponivel)': lambda: list(
+            Item.objects.select_related('doador').order_by('disponivel', 'nome', 'id')[:TAMANHO_PAGINA]
+        ),
+        'itens por tipo': lambda: list(Item.objects.values('tipo').order_by('tipo').distinct()),
+        'doador_list (nome)': lambda: list(Doador.objects.order_by('nome', 'id')[:TAMANHO_PAGINA]),
+        'doador_list (data_cadastro)': lambda: list(
+            Doador.objects.order_by('-data_cadastro', '-id')[:TAMANHO_PAGINA]
+        ),
+        'recebedor_list (nome)': lambda: list(Recebedor.objects.order_by('nome', 'id')[:TAMANHO_PAGINA]),
+        'api doacoes (keyset)': lambda: list(
+            Doacao.objects.select_related('doador', 'recebedor', 'item').order_by('-data', '-id')[:50]
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência das consultas das listagens no banco atual; com --comparar, '
+        'repete as medições sem os índices do plano (a remoção é desfeita ao final)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções por consulta (usa a mediana)')
+        parser.add_argument(
+            '--comparar', action='store_true',
+            help='Mede também sem os índices das migrações 0008 a 0010, dentro de uma transação desfeita ao final'
+        )
+        parser.add_argument('--explain', action='store_true', help='Mostra o plano de execução de cada consulta')
+
+    def medir(self, repeticoes):
+        resultados = {}
+        for nome, consulta in consultas().items():
+            consulta()  # aquece o cache de páginas do banco
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                consulta()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nome] = statistics.median(tempos)
+        return resultados
+
+    def mostrar_planos(self):
+        planos = {
+            'doacao_list (data)': Doacao.objects.order_by('-data', '-id')[:TAMANHO_PAGINA],
+            'item_list (dinheiro)': Doacao.objects.filter(valor__isnull=False).order_by('-data', '-id')[:TAMANHO_PAGINA],
+            'item_list (tipo)': Item.objects.order_by('tipo', 'nome', 'id')[:TAMANHO_PAGINA],
+            'item_list (disponivel)': Item.objects.order_by('disponivel', 'nome', 'id')[:TAMANHO_PAGINA],
+            'doador_list (data_cadastro)': Doador.objects.order_by('-data_cadastro', '-id')[:TAMANHO_PAGINA],
+        }
+        for nome, queryset in planos.items():
+            self.stdout.write(f'\n{nome}:\n{queryset.explain()}')
+
+    def remover_indices(self):
+        # DROP INDEX direto: o schema_editor do SQLite não roda dentro de transação
+        with connection.cursor() as cursor:
+            for nome in sorted(INDICES_PLANO | INDICES_ANTERIORES):
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(nome)}')
+
+    def handle(self, *args, **options):
+        repeticoes = max(options['repeticoes'], 1)
+        self.stdout.write(
+            f'Banco: {connection.vendor} — {Doacao.objects.count()} doações, {Item.objects.count()} itens, '
+            f'{Doador.objects.count()} doadores, {Recebedor.objects.count()} recebedores'
+        )
+        if options['explain']:
+            self.mostrar_planos()
+
+        com_indices = self.medir(repeticoes)
+        sem_indices = None
+        if options['comparar']:
+            with transaction.atomic():
+                self.remover_indices()
+                sem_indices = self.medir(repeticoes)
+                transaction.set_rollback(True)
+
+        largura = max(len(nome) for nome in com_indices)
+        if sem_indices is None:
+            self.stdout.write(f'\n{"consulta":<{largura}}  {"ms":>10}')
+            for nome, tempo in com_indices.items():
+                self.stdout.write(f'{nome:<{largura}}  {tempo:>10.2f}')
+        else:
+            self.stdout.write(f'\n{"consulta":<{largura}}  {"sem índices":>12}  {"com índices":>12}  {"ganho":>8}')
+            for nome, tempo in com_indices.items():
+                antes = sem_indices[nome]
+                self.stdout.write(
+                    f'{nome:<{largura}}  {antes:>10.2f}ms  {tempo:>10.2f}ms  {antes / max(tempo, 1e-6):>7.1f}x'
+                )
+        self.stdout.write(self.style.SUCCESS('\nBenchmark concluído.'))
@@ -0,0 +1,74 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo por requisição de cada modo de sessão (db, cached_db, cookie): '
+        'tempo e consultas das middlewares de sessão e autenticação'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=500, help='Requisições simuladas por modo')
+
+    def medir(self, engine, user, repeticoes, modificar):
+        with override_settings(SESSION_ENGINE=engine):
+            sessao = import_module(engine).SessionStore()
+            sessao[SESSION_KEY] = str(user.pk)
+            sessao[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+            sessao[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            sessao.save()
+            cookie = sessao.session_key
+
+            def view(request):
+                request.user.is_authenticated
+                if modificar:
+                    request.session['contador'] = request.session.get('contador', 0) + 1
+                return HttpResponse('ok')
+
+            cadeia = SessionMiddleware(AuthenticationMiddleware(view))
+            fabrica = RequestFactory()
+            tempos, consultas = [], []
+            for _ in range(repeticoes):
+                request = fabrica.get('/')
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    response = cadeia(request)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(len(capturadas))
+                if settings.SESSION_COOKIE_NAME in response.cookies:
+                    cookie = response.cookies[settings.SESSION_COOKIE_NAME].value
+            return statistics.median(tempos), statistics.mean(consultas)
+
+    def handle(self, *args, **options):
+        repeticoes = max(options['repeticoes'], 1)
+        User = get_user_model()
+        self.stdout.write(f'Banco: {connection.vendor} — cache: {settings.CACHES["default"]["BACKEND"]}')
+        self.stdout.write(
+            f'\n{"modo":<10}  {"leitura (ms)":>12}  {"consultas":>9}  {"escrita (ms)":>12}  {"consultas":>9}'
+        )
+        # Usuário e sessões de teste são descartados ao final
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email='benchmark-sessoes@example.com', password='benchmark', nome_completo='Benchmark'
+            )
+            for modo, engine in settings.SESSION_ENGINES.items():
+                leitura = self.medir(engine, user, repeticoes, modificar=False)
+                escrita = self.medir(engine, user, repeticoes, modificar=True)
+                self.stdout.write(
+                    f'{modo:<10}  {leitura[0]:>12.3f}  {leitura[1]:>9.1f}  {escrita[0]:>12.3f}  {escrita[1]:>9.1f}'
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('\nBenchmark concluído. (inclui a consulta do usuário, igual em todos os modos)'))
@@ -0,0 +1,281 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from doacoes import dados_sinteticos
+from doacoes.cache_dashboard import invalidar_dashboard
+from doacoes.models import Doador, Doacao
+
+TAMANHOS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+TAMANHOS_PADRAO = '1k,100k'
+# Abaixo destas diferenças a variação é ruído, qualquer que seja a proporção
+FOLGA_MS = 1.0
+FOLGA_KB = 64
+
+
+def ler_tamanho(texto):
+    texto = texto.strip()
+    if texto in TAMANHOS:
+        return texto, TAMANHOS[texto]
+    try:
+        quantidade = int(texto)
+    except ValueError:
+        raise CommandError(f"Tamanho inválido: {texto}. Use {', '.join(TAMANHOS)} ou um número de doações")
+    if quantidade < 1:
+        raise CommandError('O tamanho deve ser maior que zero.')
+    return texto, quantidade
+
+
+def cenarios(ids):
+    """
+    ``{nome: (método, url, corpo, preparo)}`` das páginas e endpoints medidos;
+    ``preparo`` roda antes de cada requisição, fora da medição.
+    """
+    doacoes, doacao = reverse('doacao_list'), ids['doacao']
+    api_doacoes = reverse('doacao-list')
+    return {
+        'dashboard': ('get', reverse('dashboard'), None, None),
+        'dashboard (sem cache)': ('get', reverse('dashboard'), None, invalidar_dashboard),
+        'doador_list': ('get', reverse('doador_list'), None, None),
+        'recebedor_list': ('get', reverse('recebedor_list'), None, None),
+        'item_list': ('get', reverse('item_list'), None, None),
+        'doacao_list': ('get', doacoes, None, None),
+        'doacao_list (busca)': ('get', f'{doacoes}?q=silva', None, None),
+        'doacao_list (última página)': ('get', f'{doacoes}?pagina=999999', None, None),
+        'doacao_detail': ('get', reverse('doacao_detail', args=[doacao]), None, None),
+        'doacao_wizard_api (dinheiro)': ('post', reverse('doacao_wizard_api'), {
+            'doador_tipo': 'existente', 'doador_id': ids['doador'],
+            'recebedor_tipo': 'nenhum', 'tipo_doacao': 'dinheiro', 'valor': '150,00',
+        }, None),
+        'doacao_wizard_api (item)': ('post', reverse('doacao_wizard_api'), {
+            'doador_tipo': 'novo', 'doador_nome': 'Doador Benchmark', 'doador_email': 'benchmark@example.com',
+            'recebedor_tipo': 'nenhum', 'tipo_doacao': 'item',
+            'item_nome': 'Camiseta', 'item_tipo': 'RO', 'item_descricao': 'Tamanho M',
+        }, None),
+        'api doadores': ('get', reverse('doador-list'), None, None),
+        'api recebedores': ('get', reverse('recebedor-list'), None, None),
+        'api itens': ('get', reverse('item-list'), None, None),
+        'api doacoes': ('get', api_doacoes, None, None),
+        'api doacoes (expand)': ('get', f'{api_doacoes}?expand=doador,recebedor,item', None, None),
+        'api doacao (detalhe)': ('get', reverse('doacao-detail', args=[doacao]), None, None),
+        'api busca': ('get', f"{reverse('busca_api')}?q=maria", None, None),
+        'api serie (por tipo)': ('get', f"{reverse('relatorio_serie_api')}?por=tipo&periodo=semana", None, None),
+    }
+
+
+def requisitar(client, metodo, url, corpo):
+    if metodo == 'get':
+        return client.get(url)
+    # Escritas são desfeitas: todas as repetições partem do mesmo banco
+    with transaction.atomic():
+        response = client.post(url, json.dumps(corpo), content_type='application/json')
+        transaction.set_rollback(True)
+    return response
+
+
+def medir_cenario(client, metodo, url, corpo, preparo, repeticoes):
+    """Tempo (mediana, p95 e mínimo), consultas e pico de memória de uma página."""
+    def executar():
+        if preparo:
+            preparo()
+        response = requisitar(client, metodo, url, corpo)
+        if response.status_code >= 400:
+            raise CommandError(f'{metodo.upper()} {url} respondeu {response.status_code}')
+        return response
+
+    executar()  # aquece caches e o cache de páginas do banco
+    tempos = []
+    for _ in range(repeticoes):
+        if preparo:
+            preparo()
+        inicio = time.perf_counter()
+        requisitar(client, metodo, url, corpo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    # Consultas e memória em execuções à parte, para não pesarem no tempo.
+    # (CaptureQueriesContext não serve: request_started limpa queries_log)
+    consultas = []
+    with connection.execute_wrapper(lambda execute, sql, *args: consultas.append(sql) or execute(sql, *args)):
+        executar()
+    tracemalloc.start()
+    try:
+        executar()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tempos.sort()
+    return {
+        'tempo_ms': {
+            'mediana': round(statistics.median(tempos), 3),
+            'p95': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+            'minimo': round(tempos[0], 3),
+        },
+        'consultas': len(consultas),
+        'memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def comparar(base, atual, tolerancia):
+    """
+    Compara os resultados ``atual`` com ``base`` (mesmo formato do arquivo de
+    saída). Retorna ``[(tamanho, cenário, métrica, antes, depois)]`` das
+    regressões: mais consultas, ou tempo (mediana e mínimo) e memória acima
+    de ``tolerancia`` (fração) e da folga absoluta.
+    """
+    regressoes = []
+    for tamanho, medidas in atual['resultados'].items():
+        anteriores = base.get('resultados', {}).get(tamanho, {})
+        for nome, medida in medidas.items():
+            anterior = anteriores.get(nome)
+            if anterior is None:
+                continue
+            antes, depois = anterior['tempo_ms'], medida['tempo_ms']
+            # Mediana e mínimo piores: um pico de carga na máquina não basta
+            if all(
+                depois[chave] > antes[chave] * (1 + tolerancia) and depois[chave] - antes[chave] > FOLGA_MS
+                for chave in ('mediana', 'minimo')
+            ):
+                regressoes.append((tamanho, nome, 'tempo_ms', antes['mediana'], depois['mediana']))
+            if medida['consultas'] > anterior['consultas']:
+                regressoes.append((tamanho, nome, 'consultas', anterior['consultas'], medida['consultas']))
+            antes, depois = anterior['memoria_kb'], medida['memoria_kb']
+            if depois > antes * (1 + tolerancia) and depois - antes > FOLGA_KB:
+                regressoes.append((tamanho, nome, 'memoria_kb', antes, depois))
+    return regressoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede tempo, consultas e pico de memória das páginas e endpoints da API com dados '
+        'sintéticos de vários tamanhos, em bancos de teste separados; grava os resultados em '
+        'JSON e, com --comparar, aponta regressões em relação a um arquivo anterior'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos', default=TAMANHOS_PADRAO,
+            help=f"Quantidades de doações, separadas por vírgula: {', '.join(TAMANHOS)} ou números "
+                 f"(padrão: {TAMANHOS_PADRAO})"
+        )
+        parser.add_argument('--repeticoes', type=int, default=10, help='Requisições medidas por cenário')
+        parser.add_argument('--semente', type=int, default=0, help='Semente dos dados sintéticos')
+        parser.add_argument('--saida', default='benchmark_views.json', help='Arquivo JSON com os resultados')
+        parser.add_argument('--comparar', default=None, help='Resultados anteriores (JSON) usados como referência')
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.25,
+            help='Aumento de tempo/memória tolerado antes de apontar regressão (fração; padrão 0.25)'
+        )
+        parser.add_argument(
+            '--manter', action='store_true',
+            help='Mantém os bancos de teste com os dados gerados e os reutiliza na próxima execução (mesma semente)'
+        )
+        parser.add_argument(
+            '--pasta', default=str(Path(settings.BASE_DIR) / '.benchmark'),
+            help='Pasta dos bancos de teste, quando o banco é SQLite'
+        )
+
+    def nome_banco(self, rotulo, pasta):
+        if connection.vendor == 'sqlite':
+            Path(pasta).mkdir(parents=True, exist_ok=True)
+            return str(Path(pasta) / f'benchmark_{rotulo}.sqlite3')
+        return f"test_{connection.settings_dict['NAME']}_benchmark_{rotulo.lower()}"
+
+    def preparar_banco(self, rotulo, quantidade, options):
+        """Cria (ou reaproveita, com --manter) o banco de teste do tamanho e gera os dados."""
+        connection.settings_dict['TEST']['NAME'] = self.nome_banco(rotulo, options['pasta'])
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['manter'])
+        if options['manter'] and Doacao.objects.count() == quantidade:
+            self.stdout.write(f'  reaproveitando o banco com {quantidade} doações')
+            return None
+        if Doacao.objects.exists():
+            connection.creation.destroy_test_db(self.nome_original, verbosity=0)
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        inicio = time.perf_counter()
+        dados_sinteticos.gerar(quantidade, semente=options['semente'])
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'  {quantidade} doações geradas em {duracao:.1f}s')
+        return round(duracao, 1)
+
+    def medir_tamanho(self, repeticoes):
+        user = get_user_model().objects.create_user(
+            email='benchmark-views@example.com', password='benchmark', nome_completo='Benchmark', role='ADMIN'
+        )
+        # Host aceito em ALLOWED_HOSTS: o comando não instala o ambiente de testes
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        ids = {
+            'doador': Doador.objects.order_by('pk').values_list('pk', flat=True)[0],
+            'doacao': Doacao.objects.order_by('pk').values_list('pk', flat=True)[Doacao.objects.count() // 2],
+        }
+        resultados = {}
+        for nome, (metodo, url, corpo, preparo) in cenarios(ids).items():
+            resultados[nome] = medida = medir_cenario(client, metodo, url, corpo, preparo, repeticoes)
+            self.stdout.write(
+                f"  {nome:<30} {medida['tempo_ms']['mediana']:>9.2f}ms  p95 {medida['tempo_ms']['p95']:>9.2f}ms  "
+                f"{medida['consultas']:>3} consultas  {medida['memoria_kb']:>9.1f}KB"
+            )
+        user.delete()
+        return resultados
+
+    def handle(self, *args, **options):
+        repeticoes = max(options['repeticoes'], 1)
+        tamanhos = [ler_tamanho(texto) for texto in options['tamanhos'].split(',') if texto.strip()]
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as arquivo:
+                    base = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['comparar']}: {e}")
+
+        self.nome_original = connection.settings_dict['NAME']
+        teste_original = connection.settings_dict['TEST'].get('NAME')
+        atual = {
+            'gerado_em': timezone.now().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'banco': connection.vendor,
+                'semente': options['semente'],
+                'repeticoes': repeticoes,
+            },
+            'carga_s': {},
+            'resultados': {},
+        }
+        for rotulo, quantidade in tamanhos:
+            self.stdout.write(f'\n{rotulo} ({quantidade} doações):')
+            try:
+                atual['carga_s'][rotulo] = self.preparar_banco(rotulo, quantidade, options)
+                atual['resultados'][rotulo] = self.medir_tamanho(repeticoes)
+            finally:
+                connection.creation.destroy_test_db(self.nome_original, verbosity=0, keepdb=options['manter'])
+                connection.settings_dict['TEST']['NAME'] = teste_original
+
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(f"\nResultados gravados em {options['saida']}")
+
+        if base is None:
+            self.stdout.write(self.style.SUCCESS('Benchmark concluído.'))
+            return
+        regressoes = comparar(base, atual, options['tolerancia'])
+        if not regressoes:
+            self.stdout.write(self.style.SUCCESS(f"Nenhuma regressão em relação a {options['comparar']}."))
+            return
+        for tamanho, nome, metrica, antes, depois in regressoes:
+            self.stdout.write(self.style.ERROR(f'  {tamanho} {nome}: {metrica} {antes} -> {depois}'))
+        raise CommandError(f"{len(regressoes)} regressões em relação a {options['comparar']}")
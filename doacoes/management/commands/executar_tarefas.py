@@ -0,0 +1,76 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from doacoes.tarefas import executar, limpar_concluidas, recuperar_travadas, reservar
+
+# Intervalos (segundos) das rotinas de manutenção feitas pelo próprio worker
+INTERVALO_RECUPERACAO = 60
+INTERVALO_LIMPEZA = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker da fila de tarefas: reserva e executa as tarefas pendentes. '
+        'Vários processos podem rodar ao mesmo tempo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1, help='Tarefas reservadas de cada vez')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Espera (s) quando a fila está vazia')
+        parser.add_argument('--ate-esvaziar', action='store_true', help='Encerra quando não houver tarefas prontas')
+        parser.add_argument('--max-tarefas', type=int, default=0, help='Encerra depois de N tarefas (0 = sem limite)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.parar = False
+        # SIGTERM/SIGINT: termina a tarefa atual e sai, sem deixá-la travada
+        anteriores = {sinal: signal.signal(sinal, self.pedir_parada) for sinal in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.executar_ate_parar(worker, options)
+        finally:
+            for sinal, tratador in anteriores.items():
+                signal.signal(sinal, tratador)
+
+    def executar_ate_parar(self, worker, options):
+        self.stdout.write(f'Worker {worker} iniciado.')
+        executadas = falhas = 0
+        ultima_recuperacao = ultima_limpeza = float('-inf')
+        while not self.parar:
+            agora = time.monotonic()
+            if agora - ultima_recuperacao >= INTERVALO_RECUPERACAO:
+                recuperar_travadas()
+                ultima_recuperacao = agora
+            if agora - ultima_limpeza >= INTERVALO_LIMPEZA:
+                limpar_concluidas()
+                ultima_limpeza = agora
+
+            tarefas = reservar(worker, options['lote'])
+            if not tarefas:
+                if options['ate_esvaziar']:
+                    break
+                close_old_connections()
+                time.sleep(options['intervalo'])
+                continue
+
+            for tarefa in tarefas:
+                if executar(tarefa):
+                    executadas += 1
+                else:
+                    falhas += 1
+            if options['max_tarefas'] and executadas + falhas >= options['max_tarefas']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker {worker} encerrado: {executadas} tarefas concluídas, {falhas} com falha.'
+        ))
+
+    def pedir_parada(self, signum, frame):
+        self.parar = True
@@ -0,0 +1,64 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doacoes.importacao import Importador
+from doacoes.resumo import reconstruir_resumo, reconstruir_resumo_diario
+
+
+class Command(BaseCommand):
+    help = 'Importa doadores, recebedores, itens ou doações de um arquivo CSV em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=Importador.MODELOS, help='Tipo de registro contido no arquivo')
+        parser.add_argument('arquivo', type=str, help='Caminho do arquivo CSV (UTF-8, com cabeçalho)')
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas validadas e gravadas por transação')
+        parser.add_argument('--delimitador', type=str, default=',', help='Delimitador de colunas do CSV')
+        parser.add_argument(
+            '--rejeitados', type=str, default=None,
+            help='Arquivo CSV para as linhas rejeitadas (padrão: <arquivo>.rejeitados.csv)'
+        )
+        parser.add_argument(
+            '--sem-resumo', action='store_true',
+            help='Não reconstrói os resumos ao final (rode rebuild_dashboard e reconstruir_series depois)'
+        )
+
+    def handle(self, *args, **options):
+        arquivo = options['arquivo']
+        if not os.path.exists(arquivo):
+            raise CommandError(f'Arquivo não encontrado: {arquivo}')
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+        caminho_rejeitados = options['rejeitados'] or f'{arquivo}.rejeitados.csv'
+
+        def progresso(importador, taxa):
+            self.stdout.write(
+                f'{importador.lidas} linhas lidas, {importador.inseridas} inseridas, '
+                f'{importador.rejeitadas} rejeitadas ({taxa:.0f} linhas/s)'
+            )
+
+        importador = Importador(options['modelo'], batch_size=options['lote'], progresso=progresso)
+        with open(arquivo, newline='', encoding='utf-8-sig') as entrada, \
+                open(caminho_rejeitados, 'w', newline='', encoding='utf-8') as rejeitados:
+            importador.importar(entrada, rejeitados, delimitador=options['delimitador'])
+
+        if not importador.rejeitadas:
+            os.remove(caminho_rejeitados)
+
+        if importador.inseridas and not options['sem_resumo']:
+            reconstruir_resumo()
+            if options['modelo'] == 'doacoes':
+                reconstruir_resumo_diario()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Importação concluída em {importador.duracao:.1f}s '
+                f'({importador.linhas_por_segundo:.0f} linhas/s)\n'
+                f'Lidas: {importador.lidas}\n'
+                f'Inseridas: {importador.inseridas}\n'
+                f'Já cadastradas: {importador.existentes}\n'
+                f'Rejeitadas: {importador.rejeitadas}'
+            )
+        )
+        if importador.rejeitadas:
+            self.stdout.write(self.style.WARNING(f'Linhas rejeitadas gravadas em {caminho_rejeitados}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from doacoes.idempotencia import limite_validade
+from doacoes.models import ChaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = 'Exclui, em lotes, as Idempotency-Key mais antigas que IDEMPOTENCIA_VALIDADE_HORAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Chaves excluídas por comando DELETE')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+
+        limite = limite_validade()
+        excluidas = 0
+        while True:
+            ids = list(
+                ChaveIdempotencia.objects.filter(criada_em__lt=limite)
+                .values_list('pk', flat=True)[:options['lote']]
+            )
+            if not ids:
+                break
+            excluidas += ChaveIdempotencia.objects.filter(pk__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Limpeza concluída: {excluidas} chaves vencidas excluídas.'))
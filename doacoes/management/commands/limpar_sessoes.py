@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Exclui as sessões expiradas da tabela django_session em lotes pequenos, '
+        'sem travar a tabela inteira em uma única transação longa'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Sessões excluídas por comando DELETE')
+        parser.add_argument(
+            '--pausa', type=float, default=0,
+            help='Segundos de espera entre os lotes, para não disputar o banco com as requisições'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+        if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.signed_cookies':
+            self.stdout.write('Sessões em cookie assinado não usam a tabela django_session; nada a limpar.')
+            return
+
+        agora = timezone.now()
+        excluidas = 0
+        while True:
+            # A consulta usa o índice de expire_date; cada DELETE é uma transação curta
+            chaves = list(
+                Session.objects.filter(expire_date__lt=agora)
+                .values_list('session_key', flat=True)[:options['lote']]
+            )
+            if not chaves:
+                break
+            excluidas += Session.objects.filter(session_key__in=chaves).delete()[0]
+            self.stdout.write(f'{excluidas} sessões expiradas excluídas...')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'Limpeza concluída: {excluidas} sessões expiradas excluídas.'))
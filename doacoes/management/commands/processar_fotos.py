@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from doacoes.imagens import processar_foto
+from doacoes.models import Item
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as miniaturas e versões WebP (e remove os metadados) das fotos dos itens '
+        'que ainda não foram processadas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Reprocessa também as fotos que já têm variantes')
+
+    def handle(self, *args, **options):
+        itens = Item.objects.exclude(foto='').exclude(foto__isnull=True)
+        if not options['todas']:
+            itens = itens.filter(foto_variantes={})
+        ids = list(itens.order_by('pk').values_list('pk', flat=True))
+
+        processadas = 0
+        for item_id in ids:
+            try:
+                processadas += processar_foto(item_id)
+            except OSError as e:
+                self.stdout.write(self.style.ERROR(f'Erro ao ler a foto do item {item_id}: {str(e)}'))
+        falhas = len(ids) - processadas
+        self.stdout.write(self.style.SUCCESS(f'{processadas} fotos processadas.'))
+        if falhas:
+            self.stdout.write(self.style.WARNING(f'{falhas} fotos não puderam ser processadas (ver o log).'))
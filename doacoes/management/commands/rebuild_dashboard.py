@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from doacoes.resumo import reconstruir_resumo
+from doacoes.tarefas import enfileirar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela de resumo do dashboard a partir das doações, doadores, recebedores e itens'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--em-segundo-plano', action='store_true',
+            help='Apenas enfileira o recálculo para o worker (manage.py executar_tarefas)'
+        )
+
+    def handle(self, *args, **options):
+        if options['em_segundo_plano']:
+            tarefa = enfileirar(reconstruir_resumo)
+            self.stdout.write(self.style.SUCCESS(f'Recálculo do resumo enfileirado (tarefa {tarefa.pk}).'))
+            return
+        try:
+            linhas = reconstruir_resumo()
+            self.stdout.write(
+                self.style.SUCCESS(f'Resumo do dashboard reconstruído com sucesso! ({linhas} contadores)')
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Erro ao reconstruir o resumo: {str(e)}')
+            )
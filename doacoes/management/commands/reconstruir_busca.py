@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from doacoes.busca import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Refaz o índice de busca textual (doadores, recebedores e itens)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Registros gravados por vez')
+
+    def handle(self, *args, **options):
+        total = reconstruir(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca reconstruído: {total} registros.'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from doacoes.relatorios import ParametroInvalido, ler_data
+from doacoes.resumo import reconstruir_resumo_diario
+from doacoes.tarefas import enfileirar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o resumo diário das doações usado pelas séries dos relatórios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--de', type=str, default=None, help='Primeiro dia a recalcular (AAAA-MM-DD)')
+        parser.add_argument('--ate', type=str, default=None, help='Último dia a recalcular (AAAA-MM-DD)')
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas gravadas por INSERT')
+        parser.add_argument(
+            '--em-segundo-plano', action='store_true',
+            help='Apenas enfileira o recálculo para o worker (manage.py executar_tarefas)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            de = ler_data(options['de'], '--de')
+            ate = ler_data(options['ate'], '--ate')
+        except ParametroInvalido as e:
+            raise CommandError(str(e))
+        if de and ate and de > ate:
+            raise CommandError('A data inicial deve ser anterior à final.')
+
+        kwargs = {
+            'de': de.isoformat() if de else None,
+            'ate': ate.isoformat() if ate else None,
+            'lote': options['lote'],
+        }
+        if options['em_segundo_plano']:
+            tarefa = enfileirar(reconstruir_resumo_diario, kwargs=kwargs)
+            self.stdout.write(self.style.SUCCESS(f'Recálculo das séries enfileirado (tarefa {tarefa.pk}).'))
+            return
+        linhas = reconstruir_resumo_diario(**kwargs)
+        self.stdout.write(self.style.SUCCESS(f'Resumo diário reconstruído ({linhas} linhas).'))
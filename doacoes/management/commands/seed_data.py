@@ -0,0 +1,93 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doacoes import dados_sinteticos
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera doadores, recebedores, itens e doações sintéticos em lotes, de forma determinística '
+        'para a mesma semente (para benchmarks e testes de carga; não use em produção)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('doacoes', type=int, help='Quantidade de doações a gerar')
+        parser.add_argument('--semente', type=int, default=0, help='Semente do gerador aleatório')
+        parser.add_argument(
+            '--doacoes-por-doador', type=float, default=dados_sinteticos.DOACOES_POR_DOADOR,
+            help='Doações por doador, em média (define quantos doadores são criados)'
+        )
+        parser.add_argument(
+            '--doacoes-por-recebedor', type=float, default=dados_sinteticos.DOACOES_POR_RECEBEDOR,
+            help='Doações por recebedor, em média (define quantos recebedores são criados)'
+        )
+        parser.add_argument(
+            '--proporcao-itens', type=float, default=dados_sinteticos.PROPORCAO_ITENS,
+            help='Fração das doações feitas em itens; as demais são em dinheiro'
+        )
+        parser.add_argument(
+            '--proporcao-com-recebedor', type=float, default=dados_sinteticos.PROPORCAO_COM_RECEBEDOR,
+            help='Fração das doações já entregues a um recebedor'
+        )
+        parser.add_argument(
+            '--dias', type=int, default=dados_sinteticos.DIAS, help='Dias cobertos pelas doações, até --ate'
+        )
+        parser.add_argument(
+            '--ate', type=str, default=None, help='Último dia das doações (AAAA-MM-DD; padrão: ontem)'
+        )
+        parser.add_argument(
+            '--concentracao', type=float, default=dados_sinteticos.CONCENTRACAO,
+            help='Concentração das doações em poucos doadores/recebedores (1 = uniforme)'
+        )
+        parser.add_argument('--lote', type=int, default=dados_sinteticos.LOTE, help='Linhas gravadas por transação')
+        parser.add_argument(
+            '--sem-resumo', action='store_true',
+            help='Não reconstrói os resumos ao final (rode rebuild_dashboard e reconstruir_series depois)'
+        )
+
+    def handle(self, *args, **options):
+        if options['doacoes'] < 1:
+            raise CommandError('A quantidade de doações deve ser maior que zero.')
+        if options['lote'] < 1 or options['dias'] < 1:
+            raise CommandError('O lote e o número de dias devem ser maiores que zero.')
+        if options['doacoes_por_doador'] <= 0 or options['doacoes_por_recebedor'] <= 0:
+            raise CommandError('As doações por doador e por recebedor devem ser maiores que zero.')
+        for opcao in ('proporcao_itens', 'proporcao_com_recebedor'):
+            if not 0 <= options[opcao] <= 1:
+                raise CommandError(f"--{opcao.replace('_', '-')} deve estar entre 0 e 1.")
+        if options['concentracao'] < 1:
+            raise CommandError('A concentração deve ser maior ou igual a 1.')
+        ate = None
+        if options['ate']:
+            try:
+                ate = date.fromisoformat(options['ate'])
+            except ValueError:
+                raise CommandError('Data inválida em --ate (use AAAA-MM-DD)')
+
+        inicio = time.perf_counter()
+        criados = dados_sinteticos.gerar(
+            options['doacoes'],
+            semente=options['semente'],
+            doacoes_por_doador=options['doacoes_por_doador'],
+            doacoes_por_recebedor=options['doacoes_por_recebedor'],
+            proporcao_itens=options['proporcao_itens'],
+            proporcao_com_recebedor=options['proporcao_com_recebedor'],
+            dias=options['dias'],
+            ate=ate,
+            concentracao=options['concentracao'],
+            lote=options['lote'],
+            resumos=not options['sem_resumo'],
+            progresso=lambda mensagem: self.stdout.write(mensagem) if options['verbosity'] > 1 else None,
+        )
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Dados gerados em {duracao:.1f}s ({criados["doacoes"] / duracao:.0f} doações/s)\n'
+                f'Doadores: {criados["doadores"]}\n'
+                f'Recebedores: {criados["recebedores"]}\n'
+                f'Itens: {criados["itens"]}\n'
+                f'Doações: {criados["doacoes"]}'
+            )
+        )
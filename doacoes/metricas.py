@@ -0,0 +1,367 @@
+"""
+Métricas da aplicação (latência e volume por rota, doações criadas, tarefas
+executadas) no formato texto do Prometheus, em ``/metrics``.
+
+Contadores e histogramas são declarados uma vez, no fim deste módulo, e
+atualizados com ``METRICA.rotular(...).incrementar()`` ou ``.observar()``.
+Cada processo soma os seus valores num mapa de memória próprio: com
+``METRICAS_DIR`` definido, um arquivo ``metricas_<pid>.db`` nessa pasta, que
+``/metrics`` lê e soma para todos os processos (os workers do gunicorn e os
+de ``executar_tarefas``); sem ele, um mapa anônimo só do processo atual
+(desenvolvimento e testes).
+
+Layout do arquivo: 8 bytes com o total de bytes usados e, em seguida, as
+entradas ``[tamanho da chave: uint32][chave JSON][double]``, com o valor
+alinhado em 8 bytes. Só o processo dono escreve no seu arquivo (um Lock
+entre as suas threads, mantido pelo tempo de uma ou duas somas) e o total
+usado só é atualizado depois que a entrada está completa, então quem lê de
+outro processo nunca vê uma entrada pela metade.
+
+Os arquivos de processos que terminaram continuam sendo somados, para os
+contadores não voltarem atrás quando um worker é reciclado; esvazie
+``METRICAS_DIR`` antes de iniciar o servidor.
+"""
+import hmac
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+TAMANHO_INICIAL = 64 * 1024
+LIMITES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METODOS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+ROTA_NAO_ENCONTRADA = 'nao_encontrada'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_USADO = struct.Struct('<Q')
+_CHAVE = struct.Struct('<I')
+_VALOR = struct.Struct('d')  # na ordem nativa, como a memoryview
+
+
+def _entradas(dados):
+    """Chaves e valores gravados em ``dados`` (um mmap ou o conteúdo lido de um arquivo)."""
+    if len(dados) < _USADO.size:
+        return
+    usado = _USADO.unpack_from(dados, 0)[0]
+    posicao = _USADO.size
+    while posicao < usado:
+        tamanho = _CHAVE.unpack_from(dados, posicao)[0]
+        inicio = posicao + _CHAVE.size
+        chave = bytes(dados[inicio:inicio + tamanho]).decode()
+        posicao = _alinhar(inicio + tamanho)
+        yield chave, posicao, _VALOR.unpack_from(dados, posicao)[0]
+        posicao += _VALOR.size
+
+
+def _alinhar(posicao):
+    return posicao + -posicao % _VALOR.size
+
+
+class MapaValores:
+    """Valores por chave num mapa de memória, anônimo ou em ``caminho``."""
+
+    def __init__(self, caminho=None):
+        self.posicoes = {}
+        self.descritor = None
+        if caminho is None:
+            self.mapa = mmap.mmap(-1, TAMANHO_INICIAL)
+        else:
+            self.descritor = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            tamanho = os.fstat(self.descritor).st_size
+            if tamanho < TAMANHO_INICIAL:
+                os.ftruncate(self.descritor, TAMANHO_INICIAL)
+                tamanho = TAMANHO_INICIAL
+            self.mapa = mmap.mmap(self.descritor, tamanho)
+        self.valores = memoryview(self.mapa).cast('d')
+        self.usado = _USADO.unpack_from(self.mapa, 0)[0]
+        if self.usado:
+            # Arquivo de um processo anterior com o mesmo pid: continua de onde parou
+            for chave, posicao, _ in _entradas(self.mapa):
+                self.posicoes[chave] = posicao // _VALOR.size
+        else:
+            self.usado = _USADO.size
+            _USADO.pack_into(self.mapa, 0, self.usado)
+
+    def indice(self, chave):
+        """Índice do valor de ``chave`` em ``self.valores``, criando a entrada se preciso."""
+        indice = self.posicoes.get(chave)
+        if indice is None:
+            codificada = chave.encode()
+            posicao = _alinhar(self.usado + _CHAVE.size + len(codificada))
+            fim = posicao + _VALOR.size
+            if fim > len(self.mapa):
+                self._crescer(fim)
+            _CHAVE.pack_into(self.mapa, self.usado, len(codificada))
+            inicio = self.usado + _CHAVE.size
+            self.mapa[inicio:inicio + len(codificada)] = codificada
+            indice = posicao // _VALOR.size
+            self.valores[indice] = 0.0
+            self.usado = fim
+            _USADO.pack_into(self.mapa, 0, fim)
+            self.posicoes[chave] = indice
+        return indice
+
+    def somar(self, chave, valor):
+        # indice() antes de self.valores: criar a entrada pode trocar o mapa
+        indice = self.indice(chave)
+        self.valores[indice] += valor
+
+    def _crescer(self, minimo):
+        tamanho = len(self.mapa)
+        while tamanho < minimo:
+            tamanho *= 2
+        if self.descritor is None:
+            novo = mmap.mmap(-1, tamanho)
+            novo[:self.usado] = self.mapa[:self.usado]
+        else:
+            os.ftruncate(self.descritor, tamanho)
+            novo = mmap.mmap(self.descritor, tamanho)
+        self.fechar_mapa()
+        self.mapa = novo
+        self.valores = memoryview(novo).cast('d')
+
+    def fechar_mapa(self):
+        self.valores.release()
+        self.mapa.close()
+
+    def fechar(self):
+        self.fechar_mapa()
+        if self.descritor is not None:
+            os.close(self.descritor)
+
+
+_trava = threading.Lock()
+_mapa = None
+
+
+def _mapa_atual():
+    """Mapa do processo atual; chamar com ``_trava``."""
+    global _mapa
+    if _mapa is None:
+        caminho = None
+        if settings.METRICAS_DIR:
+            os.makedirs(settings.METRICAS_DIR, exist_ok=True)
+            caminho = os.path.join(settings.METRICAS_DIR, f'metricas_{os.getpid()}.db')
+        _mapa = MapaValores(caminho)
+    return _mapa
+
+
+def _apos_fork():
+    # O filho (um worker do gunicorn com --preload) grava no seu próprio arquivo
+    global _trava, _mapa
+    _trava = threading.Lock()
+    _mapa = None
+
+
+os.register_at_fork(after_in_child=_apos_fork)
+
+
+@receiver(setting_changed)
+def _pasta_alterada(setting, **kwargs):
+    global _mapa
+    if setting == 'METRICAS_DIR':
+        with _trava:
+            if _mapa is not None:
+                _mapa.fechar()
+            _mapa = None
+
+
+_metricas = {}
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        if nome in _metricas:
+            raise ValueError(f'Métrica já declarada: {nome}')
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        _metricas[nome] = self
+
+    def rotular(self, *valores):
+        serie = self._series.get(valores)
+        if serie is None:
+            if len(valores) != len(self.rotulos):
+                raise ValueError(f'{self.nome} espera os rótulos {self.rotulos}')
+            serie = self._series.setdefault(valores, self._criar_serie(tuple(str(valor) for valor in valores)))
+        return serie
+
+    def _chave(self, valores, parte):
+        return json.dumps([self.nome, valores, parte], ensure_ascii=False)
+
+
+class Contador(Metrica):
+    """Valor que só cresce (``rate()`` dá o ritmo por segundo)."""
+    tipo = 'counter'
+
+    def _criar_serie(self, valores):
+        return SerieContador(self._chave(valores, ''))
+
+    def incrementar(self, valor=1):
+        self.rotular().incrementar(valor)
+
+    def amostras(self, valores, partes):
+        yield self.nome, valores, partes.get('', 0.0)
+
+
+class SerieContador:
+    __slots__ = ('chave',)
+
+    def __init__(self, chave):
+        self.chave = chave
+
+    def incrementar(self, valor=1):
+        with _trava:
+            _mapa_atual().somar(self.chave, valor)
+
+
+class Histograma(Metrica):
+    """Distribuição em faixas fixas (``histogram_quantile()`` dá p50/p95/p99)."""
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(float(limite) for limite in limites))
+        self.faixas = [repr(limite) for limite in self.limites] + ['+Inf']
+
+    def _criar_serie(self, valores):
+        return SerieHistograma(
+            self.limites, [self._chave(valores, faixa) for faixa in self.faixas], self._chave(valores, 'soma')
+        )
+
+    def observar(self, valor):
+        self.rotular().observar(valor)
+
+    def amostras(self, valores, partes):
+        # Cada faixa guarda só as suas observações; o formato pede os acumulados
+        acumulado = 0.0
+        for faixa in self.faixas:
+            acumulado += partes.get(faixa, 0.0)
+            yield f'{self.nome}_bucket', valores + (('le', faixa),), acumulado
+        yield f'{self.nome}_sum', valores, partes.get('soma', 0.0)
+        yield f'{self.nome}_count', valores, acumulado
+
+
+class SerieHistograma:
+    __slots__ = ('limites', 'faixas', 'soma')
+
+    def __init__(self, limites, faixas, soma):
+        self.limites = limites
+        self.faixas = faixas
+        self.soma = soma
+
+    def observar(self, valor):
+        faixa = self.faixas[bisect_left(self.limites, valor)]
+        with _trava:
+            mapa = _mapa_atual()
+            mapa.somar(faixa, 1)
+            mapa.somar(self.soma, valor)
+
+
+# Chaves já decodificadas por coletar(): as mesmas a cada leitura
+_chaves_lidas = {}
+
+
+def coletar():
+    """Valores somados de todos os processos: ``{nome: {valores dos rótulos: {parte: valor}}}``."""
+    totais = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+
+    def somar(dados):
+        for chave, _, valor in _entradas(dados):
+            lida = _chaves_lidas.get(chave)
+            if lida is None:
+                nome, valores, parte = json.loads(chave)
+                lida = _chaves_lidas[chave] = (nome, tuple(valores), parte)
+            nome, valores, parte = lida
+            totais[nome][valores][parte] += valor
+
+    if settings.METRICAS_DIR:
+        with _trava:
+            # Garante o arquivo deste processo, mesmo antes da primeira métrica
+            _mapa_atual()
+        for caminho in sorted(Path(settings.METRICAS_DIR).glob('metricas_*.db')):
+            somar(caminho.read_bytes())
+    else:
+        with _trava:
+            somar(_mapa_atual().mapa)
+    return totais
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _numero(valor):
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+
+def exposicao():
+    """Todas as métricas no formato texto do Prometheus."""
+    totais = coletar()
+    linhas = []
+    for nome, metrica in sorted(_metricas.items()):
+        linhas.append(f'# HELP {nome} {metrica.ajuda}')
+        linhas.append(f'# TYPE {nome} {metrica.tipo}')
+        for valores, partes in sorted(totais.get(nome, {}).items()):
+            for amostra, rotulos, valor in metrica.amostras(tuple(zip(metrica.rotulos, valores)), partes):
+                texto = ','.join(f'{rotulo}="{_escapar(valor_rotulo)}"' for rotulo, valor_rotulo in rotulos)
+                linhas.append(f'{amostra}{{{texto}}} {_numero(valor)}' if texto else f'{amostra} {_numero(valor)}')
+    return '\n'.join(linhas) + '\n'
+
+
+def autorizado(request):
+    """Quem pode ler ``/metrics``: o coletor com ``METRICAS_TOKEN`` ou um administrador logado."""
+    token = settings.METRICAS_TOKEN
+    cabecalho = request.headers.get('Authorization', '')
+    if token and cabecalho.startswith('Bearer '):
+        return hmac.compare_digest(cabecalho[len('Bearer '):].encode(), token.encode())
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and user.role == 'ADMIN')
+
+
+def registrar_requisicao(request, status, duracao):
+    resolver_match = getattr(request, 'resolver_match', None)
+    # Rotas e métodos fora da lista viram um só valor, para não multiplicar as séries
+    rota = resolver_match.view_name if resolver_match else ROTA_NAO_ENCONTRADA
+    metodo = request.method if request.method in METODOS else 'OUTRO'
+    REQUISICOES.rotular(rota, metodo, status).incrementar()
+    DURACAO_REQUISICOES.rotular(rota, metodo).observar(duracao)
+
+
+def contar_doacoes(doacoes):
+    """Conta doações criadas (chamar depois do commit)."""
+    for doacao in doacoes:
+        if doacao.item_id is not None:
+            DOACOES_CRIADAS.rotular('item').incrementar()
+        else:
+            DOACOES_CRIADAS.rotular('dinheiro').incrementar()
+            if doacao.valor:
+                VALOR_DOADO.incrementar(float(doacao.valor))
+
+
+REQUISICOES = Contador(
+    'doacoes_http_requisicoes_total', 'Requisições HTTP atendidas, por rota, método e status.',
+    ('rota', 'metodo', 'status')
+)
+DURACAO_REQUISICOES = Histograma(
+    'doacoes_http_requisicao_duracao_segundos', 'Duração das requisições HTTP, por rota e método.',
+    ('rota', 'metodo')
+)
+DOACOES_CRIADAS = Contador('doacoes_criadas_total', 'Doações criadas, por tipo (dinheiro ou item).', ('tipo',))
+VALOR_DOADO = Contador('doacoes_valor_doado_reais_total', 'Soma das doações em dinheiro criadas, em reais.')
+TAREFAS_EXECUTADAS = Contador(
+    'doacoes_tarefas_executadas_total',
+    'Tarefas em segundo plano executadas, por tarefa e resultado (concluida, nova_tentativa ou falhou).',
+    ('tarefa', 'resultado')
+)
@@ -0,0 +1,164 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject, empty
+
+from . import metricas, perfil
+from .acessos import acessos
+from .instrumentacao import CATEGORIAS, Medicao
+
+logger = logging.getLogger('doacoes.requisicoes')
+logger_perfis = logging.getLogger('doacoes.perfil')
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição (tempo total, consultas e tempo no banco, templates e
+    serializers; ver instrumentacao.py) e devolve as medidas no cabeçalho
+    ``Server-Timing`` e numa linha de log em JSON no logger
+    ``doacoes.requisicoes``: INFO para todas e WARNING para as que passam de
+    ``REQUISICAO_LENTA_MS``.
+
+    Deve ser a primeira da lista, para o total incluir as demais. Respostas
+    em streaming (exportações) só têm medido o que acontece antes do primeiro
+    byte.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTACAO_ATIVA:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lenta = settings.REQUISICAO_LENTA_MS / 1000
+        self.server_timing = settings.SERVER_TIMING
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = medicao.ativar()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                response = self.get_response(request)
+        finally:
+            Medicao.desativar(token)
+        total = time.perf_counter() - medicao.inicio
+
+        if self.server_timing:
+            metricas = [
+                f'total;dur={total * 1000:.1f}',
+                f'banco;dur={medicao.banco * 1000:.1f};desc="{medicao.consultas} consultas"',
+            ]
+            metricas += [
+                f'{categoria};dur={duracao * 1000:.1f}' for categoria, duracao in medicao.tempos.items() if duracao
+            ]
+            response['Server-Timing'] = ', '.join(metricas)
+
+        lenta = total >= self.lenta
+        nivel = logging.WARNING if lenta else logging.INFO
+        if logger.isEnabledFor(nivel):
+            resolver_match = getattr(request, 'resolver_match', None)
+            dados = {
+                'metodo': request.method,
+                'caminho': request.path,
+                'rota': resolver_match.view_name if resolver_match else None,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'consultas': medicao.consultas,
+                'banco_ms': round(medicao.banco * 1000, 1),
+                **{f'{categoria}_ms': round(medicao.tempos[categoria] * 1000, 1) for categoria in CATEGORIAS},
+                'lenta': lenta,
+            }
+            logger.log(nivel, json.dumps(dados, ensure_ascii=False), extra={'requisicao': dados})
+        return response
+
+
+class MetricasMiddleware:
+    """
+    Conta cada requisição e observa a sua duração nas métricas por rota
+    (nome da URL), método e status, expostas em ``/metrics`` (ver metricas.py).
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_ATIVAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        metricas.registrar_requisicao(request, response.status_code, time.perf_counter() - inicio)
+        return response
+
+
+class PerfilMiddleware:
+    """
+    Com ``?_profile=cpu`` ou ``?_profile=sql``, um administrador obtém o
+    perfil da requisição (ver perfil.py): a resposta é a de sempre, com o
+    cabeçalho ``X-Perfil`` apontando para os arquivos gravados. Para os demais
+    usuários o parâmetro é ignorado e, sem ele, o custo é procurar o texto
+    ``_profile`` na query string. Fica depois da autenticação por sessão;
+    requisições com JWT não têm o usuário nesse ponto e não são perfiladas.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFIS_ATIVOS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # A query string só é interpretada se o parâmetro aparecer nela
+        if '_profile' not in request.META.get('QUERY_STRING', ''):
+            return self.get_response(request)
+        modo = request.GET.get('_profile')
+        if modo is None:
+            return self.get_response(request)
+        user = getattr(request, 'user', None)
+        if not (user is not None and user.is_authenticated and user.role == 'ADMIN'):
+            return self.get_response(request)
+        if modo not in perfil.MODOS:
+            return JsonResponse(
+                {'error': f"Modo de perfil inválido: {modo}. Use: {', '.join(perfil.MODOS)}"}, status=400
+            )
+
+        medicao = perfil.Perfil(modo)
+        try:
+            response = medicao.executar(self.get_response, request)
+        except perfil.PerfilEmAndamento as e:
+            return JsonResponse({'error': str(e)}, status=409)
+        try:
+            nome = medicao.gravar(request, response)
+        except OSError as e:
+            # A requisição já rodou (e gravou o que tinha de gravar): perder o
+            # perfil não pode virar um 500
+            logger_perfis.exception('Não foi possível gravar o perfil em %s', settings.PERFIS_DIR)
+            response['X-Perfil-Erro'] = str(e)
+            return response
+        response['X-Perfil'] = reverse('perfil', args=[nome])
+        return response
+
+
+class RegistroAcessoMiddleware:
+    """
+    Anota o acesso de cada requisição autenticada (sessão ou JWT) no buffer
+    de acessos; a gravação no banco é feita depois, em lote (ver acessos.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        # Não força o carregamento do usuário em requisições que não o usaram
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return response
+        if user is not None and user.is_authenticated:
+            acessos.registrar(user.pk)
+        return response
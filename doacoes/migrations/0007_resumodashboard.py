@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0006_alter_doacao_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(choices=[('TOTAL', 'Total geral'), ('MES', 'Doações por mês'), ('TIPO', 'Itens por tipo'), ('DOADOR', 'Doações por doador'), ('RECEBEDOR', 'Recebimentos por recebedor')], max_length=10, verbose_name='categoria')),
+                ('chave', models.CharField(max_length=64, verbose_name='chave')),
+                ('quantidade', models.BigIntegerField(default=0, verbose_name='quantidade')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='valor')),
+            ],
+            options={
+                'verbose_name': 'resumo do dashboard',
+                'verbose_name_plural': 'resumos do dashboard',
+                'indexes': [models.Index(fields=['categoria', '-quantidade'], name='resumo_categoria_qtd_idx')],
+                'constraints': [models.UniqueConstraint(fields=('categoria', 'chave'), name='unique_resumo_categoria_chave')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('doacoes', '0007_resumodashboard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(fields=['-data', '-id'], name='doacao_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['nome', 'id'], name='doador_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['nome', 'id'], name='item_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(fields=['nome', 'id'], name='recebedor_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['nome_completo', 'id'], name='user_nome_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:39
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(django.db.models.functions.text.Lower('nome'), name='doador_nome_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='doador_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['telefone'], name='doador_telefone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(django.db.models.functions.text.Lower('nome'), name='recebedor_nome_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='recebedor_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(fields=['telefone'], name='recebedor_telefone_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0009_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(condition=models.Q(('valor__isnull', False)), fields=['-data', '-id'], name='doacao_dinheiro_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['data_cadastro', 'id'], name='doador_cadastro_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['tipo', 'nome', 'id'], name='item_tipo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['disponivel', 'nome', 'id'], name='item_disponivel_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(fields=['data_cadastro', 'id'], name='recebedor_cadastro_id_idx'),
+        ),
+    ]
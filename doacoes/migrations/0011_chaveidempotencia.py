@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0010_index_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operacao', models.CharField(max_length=50, verbose_name='operação')),
+                ('chave', models.CharField(max_length=255, verbose_name='chave')),
+                ('hash_requisicao', models.CharField(max_length=64, verbose_name='hash da requisição')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='status HTTP')),
+                ('resposta', models.JSONField(verbose_name='resposta')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='criada em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chaves_idempotencia', to=settings.AUTH_USER_MODEL, verbose_name='usuário')),
+            ],
+            options={
+                'verbose_name': 'chave de idempotência',
+                'verbose_name_plural': 'chaves de idempotência',
+                'indexes': [models.Index(fields=['criada_em'], name='idempotencia_criada_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'operacao', 'chave'), name='unique_idempotencia_chave')],
+            },
+        ),
+    ]
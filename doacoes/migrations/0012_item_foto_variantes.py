@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0011_chaveidempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='foto_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='variantes da foto'),
+        ),
+    ]
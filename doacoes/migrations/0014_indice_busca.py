@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def criar_indice(apps, schema_editor):
+    from doacoes import busca
+
+    motor = busca.backend(schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        motor.criar(cursor)
+        # Indexa os registros já cadastrados (os modelos históricos têm os mesmos campos)
+        for tipo, (_, modelo) in busca.TIPOS.items():
+            historico = apps.get_model('doacoes', modelo.__name__)
+            documentos = [busca.documento(tipo, obj) for obj in historico.objects.order_by('pk').iterator()]
+            for inicio in range(0, len(documentos), 2000):
+                motor.gravar(cursor, documentos[inicio:inicio + 2000])
+
+
+def remover_indice(apps, schema_editor):
+    from doacoes import busca
+
+    if busca.backend(schema_editor.connection).coluna_chave:
+        schema_editor.execute(f'DROP TABLE {busca.TABELA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0013_tarefa'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
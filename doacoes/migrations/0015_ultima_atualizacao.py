@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def preencher_doacoes(apps, schema_editor):
+    # Doações existentes: a última alteração conhecida é a própria data
+    Doacao = apps.get_model('doacoes', 'Doacao')
+    Doacao.objects.using(schema_editor.connection.alias).update(ultima_atualizacao=models.F('data'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0014_indice_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doacao',
+            name='ultima_atualizacao',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='última atualização'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='ultima_atualizacao',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='última atualização'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(preencher_doacoes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['ultima_atualizacao'], name='doador_atualizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(fields=['ultima_atualizacao'], name='recebedor_atualizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['ultima_atualizacao'], name='item_atualizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doacao',
+            index=models.Index(fields=['ultima_atualizacao'], name='doacao_atualizacao_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0015_ultima_atualizacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('TOTAL', 'Total'), ('TIPO', 'Tipo do item'), ('DOADOR', 'Doador'), ('RECEBEDOR', 'Recebedor')], max_length=10, verbose_name='dimensão')),
+                ('chave', models.CharField(blank=True, max_length=64, verbose_name='chave')),
+                ('dia', models.DateField(verbose_name='dia')),
+                ('quantidade', models.BigIntegerField(default=0, verbose_name='quantidade')),
+                ('valor_centavos', models.BigIntegerField(default=0, verbose_name='valor em centavos')),
+            ],
+            options={
+                'verbose_name': 'resumo diário',
+                'verbose_name_plural': 'resumos diários',
+                'indexes': [models.Index(fields=['dimensao', 'dia', 'chave'], name='resumo_diario_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimensao', 'chave', 'dia'), name='unique_resumo_diario')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0016_resumodiario'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='doador',
+            name='doador_telefone_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recebedor',
+            name='recebedor_telefone_idx',
+        ),
+        migrations.AddField(
+            model_name='doador',
+            name='telefone_digitos',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(models.F('telefone'), models.Value(' ')), models.Value('(')), models.Value(')')), models.Value('-')), models.Value('.')), models.Value('+')), models.Value('/')), output_field=models.CharField(max_length=20, null=True)),
+        ),
+        migrations.AddField(
+            model_name='recebedor',
+            name='telefone_digitos',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(models.F('telefone'), models.Value(' ')), models.Value('(')), models.Value(')')), models.Value('-')), models.Value('.')), models.Value('+')), models.Value('/')), output_field=models.CharField(max_length=20, null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['telefone_digitos', 'id'], name='doador_telefone_digitos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recebedor',
+            index=models.Index(fields=['telefone_digitos', 'id'], name='recebedor_telefone_digitos_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def preencher_resumo(apps, schema_editor):
+    ResumoDashboard = apps.get_model('doacoes', 'ResumoDashboard')
+    if ResumoDashboard.objects.exists():
+        # Já preenchido (os deploys anteriores reconstruíam a tabela a cada build)
+        return
+    if not any(apps.get_model('doacoes', nome).objects.exists() for nome in ('Doador', 'Recebedor', 'Item')):
+        return
+    # Uma única vez, a partir das tabelas de origem; daqui em diante os sinais
+    # mantêm os contadores (como em 0014, usa o código atual do módulo)
+    from doacoes.resumo import reconstruir_resumo
+    reconstruir_resumo()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0017_telefone_digitos'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
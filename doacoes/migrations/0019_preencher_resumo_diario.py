@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def preencher_resumo_diario(apps, schema_editor):
+    ResumoDiario = apps.get_model('doacoes', 'ResumoDiario')
+    if ResumoDiario.objects.exists():
+        # Já preenchido (os deploys anteriores reconstruíam a tabela a cada build)
+        return
+    if not apps.get_model('doacoes', 'Doacao').objects.exists():
+        return
+    # Uma única vez, a partir das doações; daqui em diante os sinais mantêm as
+    # séries (como em 0014, usa o código atual do módulo)
+    from doacoes.resumo import reconstruir_resumo_diario
+    reconstruir_resumo_diario()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doacoes', '0018_preencher_resumo_dashboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_resumo_diario, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower, Replace
+from django.utils import timezone
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -47,14 +49,32 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('usuário')
         verbose_name_plural = _('usuários')
+        indexes = [
+            models.Index(fields=['nome_completo', 'id'], name='user_nome_id_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+# Separadores ignorados na busca por telefone: "(11) 91234-5678" vira "11912345678"
+SEPARADORES_TELEFONE = ' ()-.+/'
+
+
+def digitos_telefone(campo='telefone'):
+    """Expressão com o telefone sem os separadores, gravada em ``telefone_digitos``."""
+    expressao = models.F(campo)
+    for separador in SEPARADORES_TELEFONE:
+        expressao = Replace(expressao, models.Value(separador))
+    return expressao
+
 class Doador(models.Model):
     nome = models.CharField(_('nome'), max_length=255)
     email = models.EmailField(_('email'), blank=True, null=True)
     telefone = models.CharField(_('telefone'), max_length=20, blank=True, null=True)
+    # Calculado pelo banco; é o que o lookup compara com os dígitos digitados
+    telefone_digitos = models.GeneratedField(
+        expression=digitos_telefone(), output_field=models.CharField(max_length=20, null=True), db_persist=True
+    )
     endereco = models.CharField(_('endereço'), max_length=255, blank=True, null=True)
     observacoes = models.TextField(_('observações'), blank=True)
     data_cadastro = models.DateTimeField(_('data de cadastro'), auto_now_add=True)
@@ -64,6 +84,14 @@ class Doador(models.Model):
         verbose_name = _('doador')
         verbose_name_plural = _('doadores')
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome', 'id'], name='doador_nome_id_idx'),
+            models.Index(Lower('nome'), name='doador_nome_lower_idx'),
+            models.Index(Lower('email'), name='doador_email_lower_idx'),
+            models.Index(fields=['telefone_digitos', 'id'], name='doador_telefone_digitos_idx'),
+            models.Index(fields=['data_cadastro', 'id'], name='doador_cadastro_id_idx'),
+            models.Index(fields=['ultima_atualizacao'], name='doador_atualizacao_idx'),
+        ]
 
     def clean(self):
         if not self.nome:
@@ -84,6 +112,10 @@ class Recebedor(models.Model):
     nome = models.CharField(_('nome'), max_length=255)
     email = models.EmailField(_('email'), blank=True, null=True)
     telefone = models.CharField(_('telefone'), max_length=20, blank=True, null=True)
+    # Calculado pelo banco; é o que o lookup compara com os dígitos digitados
+    telefone_digitos = models.GeneratedField(
+        expression=digitos_telefone(), output_field=models.CharField(max_length=20, null=True), db_persist=True
+    )
     endereco = models.CharField(_('endereço'), max_length=255, blank=True, null=True)
     observacoes = models.TextField(_('observações'), blank=True)
     data_cadastro = models.DateTimeField(_('data de cadastro'), auto_now_add=True)
@@ -93,6 +125,14 @@ class Recebedor(models.Model):
         verbose_name = _('recebedor')
         verbose_name_plural = _('recebedores')
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome', 'id'], name='recebedor_nome_id_idx'),
+            models.Index(Lower('nome'), name='recebedor_nome_lower_idx'),
+            models.Index(Lower('email'), name='recebedor_email_lower_idx'),
+            models.Index(fields=['telefone_digitos', 'id'], name='recebedor_telefone_digitos_idx'),
+            models.Index(fields=['data_cadastro', 'id'], name='recebedor_cadastro_id_idx'),
+            models.Index(fields=['ultima_atualizacao'], name='recebedor_atualizacao_idx'),
+        ]
 
     def clean(self):
         if not self.nome:
@@ -139,12 +179,23 @@ class Item(models.Model):
     descricao = models.TextField(_('descrição'), blank=True)
     disponivel = models.BooleanField(_('disponível'), default=True)
     foto = models.FileField(_('foto'), upload_to='itens/', null=True, blank=True)
+    # Miniaturas e WebP gerados a partir da foto (ver imagens.py)
+    foto_variantes = models.JSONField(_('variantes da foto'), default=dict, blank=True, editable=False)
     doador = models.ForeignKey(Doador, on_delete=models.SET_NULL, null=True, blank=True, related_name='itens', verbose_name=_('doador'))
+    ultima_atualizacao = models.DateTimeField(_('última atualização'), auto_now=True)
 
     class Meta:
         verbose_name = _('item')
         verbose_name_plural = _('itens')
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome', 'id'], name='item_nome_id_idx'),
+            # Listagem ordenada por tipo/disponibilidade e agregação por tipo
+            models.Index(fields=['tipo', 'nome', 'id'], name='item_tipo_nome_idx'),
+            models.Index(fields=['disponivel', 'nome', 'id'], name='item_disponivel_nome_idx'),
+            # Versão das listagens da API (ETag), ver condicional.py
+            models.Index(fields=['ultima_atualizacao'], name='item_atualizacao_idx'),
+        ]
 
     def clean(self):
         if not self.nome:
@@ -158,6 +209,17 @@ class Item(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+    @property
+    def urls_variantes(self):
+        """``{variante: {formato: url}}`` das versões geradas da foto."""
+        if not self.foto or not self.foto_variantes:
+            return {}
+        storage = self.foto.storage
+        return {
+            variante: {formato: storage.url(caminho) for formato, caminho in formatos.items()}
+            for variante, formatos in self.foto_variantes.items()
+        }
+
     def __str__(self):
         return f"{self.nome} - {self.get_tipo_display()}"
 
@@ -168,11 +230,20 @@ class Doacao(models.Model):
     valor = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     data = models.DateTimeField(_('data da doação'), auto_now_add=True)
     observacoes = models.TextField(_('observações'), blank=True)
+    ultima_atualizacao = models.DateTimeField(_('última atualização'), auto_now=True)
 
     class Meta:
         verbose_name = _('doação')
         verbose_name_plural = _('doações')
         ordering = ['-data']
+        indexes = [
+            models.Index(fields=['-data', '-id'], name='doacao_data_id_idx'),
+            # Doações em dinheiro (página de itens e totais): índice parcial, só com as linhas com valor
+            models.Index(
+                fields=['-data', '-id'], condition=models.Q(valor__isnull=False), name='doacao_dinheiro_data_idx'
+            ),
+            models.Index(fields=['ultima_atualizacao'], name='doacao_atualizacao_idx'),
+        ]
 
     def clean(self):
         if not self.doador:
@@ -196,3 +267,127 @@ class Doacao(models.Model):
             return f"Doação de {self.item} por {self.doador}"
         else:
             return f"Doação de R$ {self.valor} por {self.doador}"
+
+class ResumoDashboard(models.Model):
+    """Contadores agregados do dashboard, mantidos incrementalmente (ver resumo.py)."""
+    CATEGORIA_CHOICES = [
+        ('TOTAL', 'Total geral'),
+        ('MES', 'Doações por mês'),
+        ('TIPO', 'Itens por tipo'),
+        ('DOADOR', 'Doações por doador'),
+        ('RECEBEDOR', 'Recebimentos por recebedor'),
+    ]
+
+    categoria = models.CharField(_('categoria'), max_length=10, choices=CATEGORIA_CHOICES)
+    chave = models.CharField(_('chave'), max_length=64)
+    quantidade = models.BigIntegerField(_('quantidade'), default=0)
+    valor = models.DecimalField(_('valor'), max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _('resumo do dashboard')
+        verbose_name_plural = _('resumos do dashboard')
+        constraints = [
+            models.UniqueConstraint(fields=['categoria', 'chave'], name='unique_resumo_categoria_chave'),
+        ]
+        indexes = [
+            models.Index(fields=['categoria', '-quantidade'], name='resumo_categoria_qtd_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.categoria}:{self.chave} = {self.quantidade}"
+
+class ResumoDiario(models.Model):
+    """Doações por dia, no total e por tipo de item, doador e recebedor (ver resumo.py e relatorios.py)."""
+    DIMENSAO_CHOICES = [
+        ('TOTAL', 'Total'),
+        ('TIPO', 'Tipo do item'),
+        ('DOADOR', 'Doador'),
+        ('RECEBEDOR', 'Recebedor'),
+    ]
+
+    dimensao = models.CharField(_('dimensão'), max_length=10, choices=DIMENSAO_CHOICES)
+    # Tipo do item, id do doador/recebedor; vazio no total e nas doações em dinheiro por tipo
+    chave = models.CharField(_('chave'), max_length=64, blank=True)
+    dia = models.DateField(_('dia'))
+    quantidade = models.BigIntegerField(_('quantidade'), default=0)
+    # Em centavos: a soma é exata em qualquer banco (o SQLite soma NUMERIC em ponto flutuante)
+    valor_centavos = models.BigIntegerField(_('valor em centavos'), default=0)
+
+    class Meta:
+        verbose_name = _('resumo diário')
+        verbose_name_plural = _('resumos diários')
+        constraints = [
+            models.UniqueConstraint(fields=['dimensao', 'chave', 'dia'], name='unique_resumo_diario'),
+        ]
+        indexes = [
+            models.Index(fields=['dimensao', 'dia', 'chave'], name='resumo_diario_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimensao}:{self.chave} {self.dia} = {self.quantidade}"
+
+class ChaveIdempotencia(models.Model):
+    """Resposta já enviada para uma Idempotency-Key (ver idempotencia.py)."""
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chaves_idempotencia', verbose_name=_('usuário'))
+    operacao = models.CharField(_('operação'), max_length=50)
+    chave = models.CharField(_('chave'), max_length=255)
+    hash_requisicao = models.CharField(_('hash da requisição'), max_length=64)
+    status_code = models.PositiveSmallIntegerField(_('status HTTP'))
+    resposta = models.JSONField(_('resposta'))
+    criada_em = models.DateTimeField(_('criada em'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('chave de idempotência')
+        verbose_name_plural = _('chaves de idempotência')
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'operacao', 'chave'], name='unique_idempotencia_chave'),
+        ]
+        indexes = [
+            models.Index(fields=['criada_em'], name='idempotencia_criada_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operacao}:{self.chave}"
+
+class Tarefa(models.Model):
+    """Tarefa da fila em segundo plano (ver tarefas.py)."""
+    PENDENTE = 'PENDENTE'
+    EXECUTANDO = 'EXECUTANDO'
+    CONCLUIDA = 'CONCLUIDA'
+    FALHOU = 'FALHOU'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDA, 'Concluída'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    nome = models.CharField(_('nome'), max_length=200)
+    args = models.JSONField(_('argumentos'), default=list, blank=True)
+    kwargs = models.JSONField(_('argumentos nomeados'), default=dict, blank=True)
+    prioridade = models.SmallIntegerField(_('prioridade'), default=0)
+    status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(_('tentativas'), default=0)
+    max_tentativas = models.PositiveSmallIntegerField(_('máximo de tentativas'), default=5)
+    executar_apos = models.DateTimeField(_('executar após'), default=timezone.now)
+    criada_em = models.DateTimeField(_('criada em'), default=timezone.now)
+    iniciada_em = models.DateTimeField(_('iniciada em'), null=True, blank=True)
+    concluida_em = models.DateTimeField(_('concluída em'), null=True, blank=True)
+    worker = models.CharField(_('worker'), max_length=100, blank=True)
+    ultimo_erro = models.TextField(_('último erro'), blank=True)
+
+    class Meta:
+        verbose_name = _('tarefa')
+        verbose_name_plural = _('tarefas')
+        ordering = ['-criada_em']
+        indexes = [
+            # Próximas tarefas a executar: só as pendentes, maior prioridade primeiro
+            models.Index(
+                fields=['-prioridade', 'executar_apos', 'id'],
+                condition=models.Q(status='PENDENTE'), name='tarefa_fila_idx'
+            ),
+            models.Index(fields=['status', 'concluida_em'], name='tarefa_status_concluida_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} ({self.status})"
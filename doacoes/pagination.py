@@ -0,0 +1,162 @@
+"""
+Paginação por cursor (keyset) para os endpoints da API.
+
+O cursor guarda o valor do campo de ordenação do último registro da página
+mais o ``id`` como critério de desempate, e a próxima página é obtida com
+um filtro ``(campo, id) > (valor, id)`` apoiado nos índices compostos dos
+modelos. Assim uma página profunda custa o mesmo que a primeira, o que não
+acontece com OFFSET.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_ordering(self, queryset, view):
+        """
+        Campo de ordenação principal: ``view.ordering`` ou o primeiro campo de
+        ``Meta.ordering`` do modelo; o ``id`` é sempre usado como desempate.
+        """
+        ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering or ['id']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        return ordering[0]
+
+    def get_page_size(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+            if tamanho > 0:
+                return min(tamanho, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            dados = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            return dados['v'], int(dados['id']), bool(dados.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, valor, pk, reverso):
+        # isoformat() preserva os microssegundos, que o DjangoJSONEncoder truncaria
+        if hasattr(valor, 'isoformat'):
+            valor = valor.isoformat()
+        dados = json.dumps({'v': valor, 'id': pk, 'r': reverso}, default=str)
+        cursor = base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = self.get_ordering(queryset, view)
+        descendente = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        field = queryset.model._meta.get_field(self.field_name)
+
+        posicao = self.decode_cursor(request)
+        reverso = posicao[2] if posicao else False
+
+        # Em páginas "anteriores" percorremos o índice no sentido contrário
+        # e invertemos o resultado no final.
+        para_tras = descendente != reverso
+        if para_tras:
+            queryset = queryset.order_by(f'-{self.field_name}', '-id')
+        else:
+            queryset = queryset.order_by(self.field_name, 'id')
+
+        if posicao is not None:
+            try:
+                valor = field.to_python(posicao[0])
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if para_tras else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field_name}__{lookup}': valor})
+                | Q(**{self.field_name: valor, f'id__{lookup}': posicao[1]})
+            )
+
+        resultados = list(queryset[:self.page_size + 1])
+        tem_mais = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if reverso:
+            resultados.reverse()
+            self.has_next = posicao is not None
+            self.has_previous = tem_mais
+        else:
+            self.has_next = tem_mais
+            self.has_previous = posicao is not None
+
+        self.page = resultados
+        return resultados
+
+    def _valor(self, obj):
+        return getattr(obj, self.field_name)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        ultimo = self.page[-1]
+        return self.encode_cursor(self._valor(ultimo), ultimo.pk, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        primeiro = self.page[0]
+        return self.encode_cursor(self._valor(primeiro), primeiro.pk, True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor opaco retornado em "next" ou "previous".',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Quantidade de registros por página (máximo {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
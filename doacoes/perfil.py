@@ -0,0 +1,257 @@
+"""
+Perfil de uma única requisição, pedido por um administrador com
+``?_profile=cpu`` ou ``?_profile=sql`` (ver PerfilMiddleware).
+
+- ``sql``: a lista das consultas da requisição, cada uma com a duração e a
+  linha do código do projeto que a disparou, mais as consultas repetidas
+  (o sinal típico de N+1);
+- ``cpu``: o mesmo, mais o cProfile da requisição em ``perfil.pstats`` (para
+  ``python -m pstats`` ou snakeviz), um relatório em texto com as funções de
+  maior tempo acumulado e as pilhas em ``perfil.folded``, no formato
+  "colapsado" do flamegraph.pl e do speedscope.
+
+As pilhas não saem do cProfile, que só guarda quem chamou quem (e, com a
+cadeia de middlewares passando sempre pela mesma função do Django, não dá
+para reconstruí-las): uma thread amostra a pilha da requisição a cada
+``INTERVALO_AMOSTRAS`` e cada pilha soma o tempo de relógio entre amostras,
+em microssegundos, o que inclui a espera pelo banco. Os tempos das duas
+ficam inflados pelo próprio cProfile; para tempos fiéis das consultas, use
+o modo ``sql``.
+
+Os arquivos ficam em ``PERFIS_DIR/<nome>/`` (os ``PERFIS_MAXIMO`` mais
+recentes) e são servidos só para administradores em ``/perfis/<nome>/``.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+MODOS = ('cpu', 'sql')
+ARQUIVOS = ('consultas.json', 'perfil.pstats', 'perfil.txt', 'perfil.folded')
+# Funções listadas em perfil.txt e consultas repetidas no resumo
+LIMITE_RELATORIO = 60
+LIMITE_REPETIDAS = 20
+INTERVALO_AMOSTRAS = 0.001
+
+# Só um perfil de CPU por vez no processo
+_cpu_em_uso = threading.Lock()
+
+# Módulos que embrulham as consultas e a requisição: não são a origem de nada
+_PASTA = os.path.dirname(os.path.abspath(__file__))
+_INTERNOS = frozenset(os.path.join(_PASTA, nome) for nome in ('perfil.py', 'middleware.py', 'instrumentacao.py'))
+
+
+class PerfilEmAndamento(Exception):
+    pass
+
+
+def _origem(frame):
+    """Primeira linha do código do projeto (fora das bibliotecas) na pilha de ``frame``."""
+    projeto = str(settings.BASE_DIR)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if arquivo.startswith(projeto) and 'site-packages' not in arquivo and arquivo not in _INTERNOS:
+            return f'{os.path.relpath(arquivo, projeto)}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return None
+
+
+class ConsultasRegistradas:
+    """``execute_wrapper`` que guarda cada consulta com a sua duração e origem."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.consultas.append({
+                'sql': sql,
+                'params': repr(params) if not many else f'{len(params)} conjuntos de parâmetros',
+                'ms': round(duracao * 1000, 3),
+                'banco': context['connection'].alias,
+                'origem': _origem(sys._getframe(1)),
+            })
+
+    def repetidas(self):
+        contagem = Counter(consulta['sql'] for consulta in self.consultas)
+        tempos = defaultdict(float)
+        for consulta in self.consultas:
+            tempos[consulta['sql']] += consulta['ms']
+        return [
+            {'sql': sql, 'vezes': vezes, 'ms': round(tempos[sql], 3)}
+            for sql, vezes in contagem.most_common(LIMITE_REPETIDAS) if vezes > 1
+        ]
+
+
+class Amostrador(threading.Thread):
+    """Soma o tempo de relógio de cada pilha da thread ``alvo`` abaixo do quadro ``raiz``."""
+
+    def __init__(self, alvo, raiz):
+        super().__init__(name='perfil-amostrador', daemon=True)
+        self.alvo = alvo
+        self.raiz = raiz
+        self.pilhas = Counter()
+        self.parado = threading.Event()
+
+    def run(self):
+        anterior = time.perf_counter()
+        while not self.parado.wait(INTERVALO_AMOSTRAS):
+            agora = time.perf_counter()
+            frame = sys._current_frames().get(self.alvo)
+            pilha = []
+            while frame is not None and frame.f_code is not self.raiz:
+                pilha.append(frame.f_code)
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[tuple(reversed(pilha))] += agora - anterior
+            anterior = agora
+
+    def parar(self):
+        self.parado.set()
+        self.join()
+
+    def colapsadas(self):
+        """Linhas ``"a;b;c microssegundos"``."""
+        nomes = {}
+        linhas = []
+        for pilha, segundos in self.pilhas.items():
+            for codigo in pilha:
+                if codigo not in nomes:
+                    nomes[codigo] = _nome_quadro(codigo)
+            linhas.append(f"{';'.join(nomes[codigo] for codigo in pilha)} {round(segundos * 1e6)}")
+        return linhas
+
+
+def _nome_quadro(codigo):
+    arquivo = codigo.co_filename
+    marcador = f'site-packages{os.sep}'
+    if marcador in arquivo:
+        arquivo = arquivo.split(marcador, 1)[1]
+    elif arquivo.startswith(str(settings.BASE_DIR)):
+        arquivo = os.path.relpath(arquivo, settings.BASE_DIR)
+    # ';' separa os quadros no formato colapsado
+    return f'{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})'.replace(';', ',')
+
+
+class Perfil:
+    """Perfil de uma requisição: ``perfil.executar(get_response, request)`` e depois ``perfil.gravar(...)``."""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.consultas = ConsultasRegistradas()
+        self.profiler = None
+        self.amostrador = None
+        self.duracao = None
+
+    def executar(self, funcao, *args):
+        """Chama ``funcao(*args)`` medindo as consultas e, no modo cpu, o tempo de cada função."""
+        with self._medir():
+            return funcao(*args)
+
+    def _medir(self):
+        pilha = ExitStack()
+        try:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(self.consultas))
+            if self.modo == 'cpu':
+                if not _cpu_em_uso.acquire(blocking=False):
+                    raise PerfilEmAndamento('Já há um perfil de CPU em andamento neste processo')
+                pilha.callback(_cpu_em_uso.release)
+                self.amostrador = Amostrador(threading.get_ident(), Perfil.executar.__code__)
+                self.amostrador.start()
+                pilha.callback(self.amostrador.parar)
+                # Sem isso, com a requisição ocupando a CPU, o amostrador só
+                # recebe o GIL a cada 5 ms
+                pilha.callback(sys.setswitchinterval, sys.getswitchinterval())
+                sys.setswitchinterval(INTERVALO_AMOSTRAS)
+                self.profiler = cProfile.Profile()
+                try:
+                    self.profiler.enable()
+                except ValueError:
+                    # Outro profiler (ex.: cobertura) já está ativo
+                    raise PerfilEmAndamento('Já há um profiler ativo neste processo')
+                pilha.callback(self.profiler.disable)
+        except BaseException:
+            pilha.close()
+            raise
+        pilha.callback(self._parar, time.perf_counter())
+        return pilha
+
+    def _parar(self, inicio):
+        self.duracao = time.perf_counter() - inicio
+
+    def gravar(self, request, response):
+        """Grava os arquivos do perfil e retorna o nome da pasta."""
+        resolver_match = getattr(request, 'resolver_match', None)
+        rota = resolver_match.view_name if resolver_match else 'nao_encontrada'
+        nome = f'{timezone.now():%Y%m%d-%H%M%S}-{re.sub(r"[^A-Za-z0-9_]+", "_", rota)}-{uuid.uuid4().hex[:8]}'
+        pasta = os.path.join(settings.PERFIS_DIR, nome)
+        os.makedirs(pasta)
+        try:
+            self._gravar_arquivos(pasta, request, response, rota)
+        except OSError:
+            shutil.rmtree(pasta, ignore_errors=True)
+            raise
+        _descartar_antigos(nome)
+        return nome
+
+    def _gravar_arquivos(self, pasta, request, response, rota):
+        consultas = self.consultas.consultas
+        resumo = {
+            'modo': self.modo,
+            'metodo': request.method,
+            'caminho': request.get_full_path(),
+            'rota': rota,
+            'status': response.status_code,
+            'usuario': request.user.email,
+            'total_ms': round(self.duracao * 1000, 3),
+            'banco_ms': round(sum(consulta['ms'] for consulta in consultas), 3),
+            'total_consultas': len(consultas),
+            'repetidas': self.consultas.repetidas(),
+            'consultas': consultas,
+        }
+        with open(os.path.join(pasta, 'consultas.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+
+        if self.profiler is not None:
+            estatisticas = pstats.Stats(self.profiler)
+            estatisticas.dump_stats(os.path.join(pasta, 'perfil.pstats'))
+            texto = io.StringIO()
+            estatisticas.stream = texto
+            estatisticas.sort_stats('cumulative').print_stats(LIMITE_RELATORIO)
+            with open(os.path.join(pasta, 'perfil.txt'), 'w', encoding='utf-8') as arquivo:
+                arquivo.write(texto.getvalue())
+            with open(os.path.join(pasta, 'perfil.folded'), 'w', encoding='utf-8') as arquivo:
+                arquivo.writelines(f'{linha}\n' for linha in self.amostrador.colapsadas())
+
+
+def _descartar_antigos(atual):
+    pastas = [
+        entrada for entrada in os.scandir(settings.PERFIS_DIR) if entrada.is_dir() and entrada.name != atual
+    ]
+    pastas.sort(key=lambda entrada: (entrada.stat().st_mtime_ns, entrada.name))
+    for antiga in pastas[:max(len(pastas) - settings.PERFIS_MAXIMO + 1, 0)]:
+        shutil.rmtree(antiga.path, ignore_errors=True)
+
+
+def arquivos(nome):
+    """Arquivos gravados para o perfil ``nome`` (vazio se não existir)."""
+    pasta = os.path.join(settings.PERFIS_DIR, nome)
+    return [arquivo for arquivo in ARQUIVOS if os.path.isfile(os.path.join(pasta, arquivo))]
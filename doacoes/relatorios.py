@@ -0,0 +1,188 @@
+"""
+Séries temporais de doações (``/api/relatorios/serie/``).
+
+As séries são lidas do ResumoDiario, mantido incrementalmente (ver resumo.py),
+e não da tabela de doações: um gráfico de 5 anos por mês soma no máximo
+~1.800 linhas diárias por série no banco e devolve 60 pontos. Os valores em
+dinheiro são somados em centavos e devolvidos como texto com duas casas
+("1234.50"), como nos DecimalField da API: o JSONEncoder do DRF converteria
+Decimal em float.
+
+Semanas começam na segunda-feira; os dias seguem o fuso de ``TIME_ZONE``.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import resumo
+from .models import Doador, Recebedor, Item, ResumoDashboard, ResumoDiario
+
+PERIODOS = ('dia', 'semana', 'mes')
+PERIODO_PADRAO = 'mes'
+# Pontos devolvidos quando ?de= não é informado
+PONTOS_PADRAO = {'dia': 30, 'semana': 12, 'mes': 12}
+MAXIMO_PONTOS = 2000
+DIMENSOES = {
+    'tipo': resumo.TIPO,
+    'doador': resumo.DOADOR,
+    'recebedor': resumo.RECEBEDOR,
+}
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 50
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def inicio_do_periodo(dia, periodo):
+    if periodo == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if periodo == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def proximo_periodo(inicio, periodo):
+    if periodo == 'semana':
+        return inicio + timedelta(days=7)
+    if periodo == 'mes':
+        return (inicio + timedelta(days=32)).replace(day=1)
+    return inicio + timedelta(days=1)
+
+
+def periodos(de, ate, periodo):
+    """Início de cada período de ``de`` a ``ate``."""
+    inicios = []
+    inicio = inicio_do_periodo(de, periodo)
+    while inicio <= ate:
+        inicios.append(inicio)
+        inicio = proximo_periodo(inicio, periodo)
+    return inicios
+
+
+def intervalo(periodo, de=None, ate=None):
+    """Datas (de, ate) da série, com ``de`` alinhado ao início do período."""
+    ate = ate or timezone.localdate()
+    if de is None:
+        de = ate
+        for _ in range(PONTOS_PADRAO[periodo] - 1):
+            de = inicio_do_periodo(de, periodo) - timedelta(days=1)
+    de = inicio_do_periodo(de, periodo)
+    if de > ate:
+        raise ParametroInvalido('A data inicial deve ser anterior à final')
+    if len(periodos(de, ate, periodo)) > MAXIMO_PONTOS:
+        raise ParametroInvalido(f'Intervalo longo demais: no máximo {MAXIMO_PONTOS} pontos por série')
+    return de, ate
+
+
+def _chave(dimensao, chave):
+    """Normaliza uma chave recebida em ?chaves=: código do tipo ou id."""
+    chave = chave.strip()
+    if dimensao == resumo.TIPO:
+        if chave.upper() not in dict(Item.TIPO_CHOICES) and chave.lower() != 'dinheiro':
+            raise ParametroInvalido(f'Tipo inválido em ?chaves=: {chave}')
+        return resumo.SEM_ITEM if chave.lower() == 'dinheiro' else chave.upper()
+    if not chave.isdigit():
+        raise ParametroInvalido(f'Id inválido em ?chaves=: {chave}')
+    return str(int(chave))
+
+
+def _reais(valor_centavos):
+    return str(Decimal(valor_centavos or 0).scaleb(-2))
+
+
+def _nomes(dimensao, chaves):
+    if dimensao == resumo.TIPO:
+        tipos = dict(Item.TIPO_CHOICES)
+        return {chave: tipos.get(chave, chave) if chave else 'Dinheiro' for chave in chaves}
+    model = Doador if dimensao == resumo.DOADOR else Recebedor
+    objetos = model.objects.in_bulk([int(chave) for chave in chaves])
+    return {chave: objetos[int(chave)].nome if int(chave) in objetos else chave for chave in chaves}
+
+
+def _mais_doacoes(dimensao, linhas, limite):
+    """Chaves das ``limite`` séries com mais doações."""
+    if dimensao == resumo.TIPO:
+        # No máximo ~20 tipos por dia: a soma no intervalo é barata
+        return list(
+            linhas.values('chave').annotate(total=Sum('quantidade')).filter(total__gt=0)
+            .order_by('-total', 'chave').values_list('chave', flat=True)[:limite]
+        )
+    # Doadores e recebedores têm uma linha por dia com doação, quase tantas
+    # quanto as doações: usa o total geral já mantido para o dashboard
+    return list(
+        ResumoDashboard.objects.filter(categoria=dimensao, quantidade__gt=0)
+        .order_by('-quantidade', 'chave').values_list('chave', flat=True)[:limite]
+    )
+
+
+def serie(periodo=PERIODO_PADRAO, por=None, de=None, ate=None, limite=LIMITE_PADRAO, chaves=None):
+    """
+    Quantidade de doações e valor em dinheiro por período.
+
+    Sem ``por``, uma única série com o total; com ``por`` (uma das chaves de
+    ``DIMENSOES``), uma série por tipo/doador/recebedor: as de ``chaves``
+    (códigos de tipo ou ids) ou as ``limite`` com mais doações — no
+    intervalo, para os tipos, e no total, para doadores e recebedores.
+    Períodos sem doações aparecem zerados.
+    """
+    if periodo not in PERIODOS:
+        raise ParametroInvalido(f"Período inválido: {periodo}. Use: {', '.join(PERIODOS)}")
+    if por is not None and por not in DIMENSOES:
+        raise ParametroInvalido(f"Divisão inválida: {por}. Use: {', '.join(DIMENSOES)}")
+    de, ate = intervalo(periodo, de, ate)
+    dimensao = DIMENSOES[por] if por else resumo.TOTAL
+
+    linhas = ResumoDiario.objects.filter(dimensao=dimensao, dia__gte=de, dia__lte=ate)
+    if por:
+        if chaves:
+            chaves = list(dict.fromkeys(_chave(dimensao, chave) for chave in chaves))[:LIMITE_MAXIMO]
+        else:
+            chaves = _mais_doacoes(dimensao, linhas, limite)
+        linhas = linhas.filter(chave__in=chaves)
+        nomes = _nomes(dimensao, chaves)
+    else:
+        chaves, nomes = [''], {'': 'Total'}
+
+    if periodo == 'dia':
+        linhas = linhas.annotate(inicio=F('dia'))
+    else:
+        linhas = linhas.annotate(inicio=(TruncWeek if periodo == 'semana' else TruncMonth)('dia'))
+    agregados = {
+        (linha['chave'], linha['inicio']): (linha['quantidade'], linha['valor'])
+        for linha in linhas.values('chave', 'inicio').annotate(
+            quantidade=Sum('quantidade'), valor=Sum('valor_centavos')
+        ).order_by()
+    }
+
+    inicios = periodos(de, ate, periodo)
+    series = []
+    for chave in chaves:
+        pontos = []
+        quantidade_total = valor_total = 0
+        for inicio in inicios:
+            quantidade, valor = agregados.get((chave, inicio), (0, 0))
+            quantidade_total += quantidade
+            valor_total += valor
+            pontos.append({'inicio': inicio, 'quantidade': quantidade, 'valor': _reais(valor)})
+        series.append({
+            'chave': int(chave) if dimensao in (resumo.DOADOR, resumo.RECEBEDOR) else chave or None,
+            'nome': nomes[chave],
+            'quantidade': quantidade_total,
+            'valor': _reais(valor_total),
+            'pontos': pontos,
+        })
+    return {'periodo': periodo, 'por': por, 'de': de, 'ate': ate, 'series': series}
+
+
+def ler_data(valor, nome):
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ParametroInvalido(f'Data inválida em {nome} (use AAAA-MM-DD)')
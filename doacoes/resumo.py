@@ -0,0 +1,501 @@
+"""
+Manutenção incremental das tabelas ResumoDashboard e ResumoDiario.
+
+Cada criação, alteração ou exclusão de Doacao, Doador, Recebedor e Item
+aplica deltas nos contadores afetados (ver signals.py), de forma que o
+dashboard leia apenas algumas linhas já agregadas. O ResumoDiario guarda as
+doações de cada dia no total e por tipo de item, doador e recebedor, para as
+séries dos relatórios (ver relatorios.py); a migração 0019 o preenche uma
+vez e ``manage.py reconstruir_series`` o recalcula. Operações que ignoram
+sinais (QuerySet.update, bulk_create) devem aplicar os deltas por conta
+própria (ver lote.py) ou ser seguidas de ``reconstruir_resumo()`` ou do
+comando ``manage.py rebuild_dashboard``.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .cache_dashboard import agendar_invalidacao
+from .tarefas import tarefa
+from .models import ResumoDashboard, ResumoDiario, Doador, Recebedor, Item, Doacao
+
+TOTAL = 'TOTAL'
+MES = 'MES'
+TIPO = 'TIPO'
+DOADOR = 'DOADOR'
+RECEBEDOR = 'RECEBEDOR'
+
+# Chaves da categoria TOTAL
+TOTAL_DOACOES = 'doacoes'
+TOTAL_DOACOES_DINHEIRO = 'doacoes_dinheiro'
+TOTAL_DOACOES_ITEM = 'doacoes_item'
+TOTAL_DOADORES = 'doadores'
+TOTAL_RECEBEDORES = 'recebedores'
+TOTAL_ITENS = 'itens'
+
+
+# Chave do ResumoDiario por tipo para as doações em dinheiro
+SEM_ITEM = ''
+
+
+def chave_mes(data):
+    """Converte uma data na chave 'AAAA-MM' usada pelos buckets mensais."""
+    if timezone.is_aware(data):
+        data = timezone.localtime(data)
+    return data.strftime('%Y-%m')
+
+
+def dia_local(data, fuso=None):
+    if timezone.is_aware(data):
+        data = data.astimezone(fuso or timezone.get_current_timezone())
+    return data.date()
+
+
+def centavos(valor):
+    if valor is None:
+        return 0
+    return int((Decimal(valor) * 100).to_integral_value())
+
+
+_agrupamento = threading.local()
+
+
+@contextmanager
+def deltas_agrupados():
+    """
+    Acumula os deltas aplicados dentro do bloco e grava um único UPDATE por
+    contador ao final, em vez de um por registro alterado.
+
+    Usado pelas operações em lote; se o bloco levantar exceção, os deltas
+    acumulados são descartados junto com a transação.
+    """
+    if getattr(_agrupamento, 'deltas', None) is not None:
+        yield
+        return
+    _agrupamento.deltas = {}
+    _agrupamento.diarios = {}
+    _agrupamento.por_item = {}
+    _agrupamento.tipos = {}
+    _agrupamento.removidos = set()
+    _agrupamento.diarios_removidos = set()
+    try:
+        yield
+        deltas, diarios = _agrupamento.deltas, _agrupamento.diarios
+        por_item, tipos = _agrupamento.por_item, _agrupamento.tipos
+    finally:
+        _agrupamento.deltas = None
+        _agrupamento.diarios = None
+        _agrupamento.por_item = None
+        _agrupamento.tipos = None
+        _agrupamento.removidos = None
+        _agrupamento.diarios_removidos = None
+    for (categoria, chave), (quantidade, valor) in deltas.items():
+        _gravar_delta(categoria, chave, quantidade, valor)
+
+    # Tipo dos itens das doações contabilizadas sem o item carregado: uma consulta para o lote
+    faltantes = {item_id for item_id, _ in por_item} - set(tipos)
+    if faltantes:
+        tipos.update(Item.objects.filter(pk__in=faltantes).values_list('pk', 'tipo'))
+    for (item_id, dia), (quantidade, valor) in por_item.items():
+        if tipos.get(item_id):
+            acumulado = diarios.setdefault((TIPO, tipos[item_id], dia), [0, 0])
+            acumulado[0] += quantidade
+            acumulado[1] += valor
+    for (dimensao, chave, dia), (quantidade, valor) in diarios.items():
+        _gravar_delta_diario(dimensao, chave, dia, quantidade, valor)
+
+
+def aplicar_delta(categoria, chave, quantidade=0, valor=0):
+    """Soma ``quantidade`` e ``valor`` ao contador (categoria, chave), criando-o se necessário."""
+    if not quantidade and not valor:
+        return
+    valor = Decimal(valor or 0)
+    deltas = getattr(_agrupamento, 'deltas', None)
+    if deltas is not None:
+        if (categoria, chave) in _agrupamento.removidos:
+            return
+        acumulado = deltas.setdefault((categoria, chave), [0, Decimal('0')])
+        acumulado[0] += quantidade
+        acumulado[1] += valor
+        return
+    _gravar_delta(categoria, chave, quantidade, valor)
+
+
+def _somar(modelo, chaves, deltas):
+    """Soma ``deltas`` à linha de ``modelo`` identificada por ``chaves``, criando-a se necessário."""
+    if not any(deltas.values()):
+        return
+    incrementos = {campo: F(campo) + delta for campo, delta in deltas.items()}
+    if modelo.objects.filter(**chaves).update(**incrementos):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chaves, **deltas)
+    except IntegrityError:
+        # Outro processo criou a linha entre o UPDATE e o INSERT
+        modelo.objects.filter(**chaves).update(**incrementos)
+
+
+def _gravar_delta(categoria, chave, quantidade, valor):
+    _somar(ResumoDashboard, {'categoria': categoria, 'chave': chave}, {'quantidade': quantidade, 'valor': valor})
+
+
+def _gravar_delta_diario(dimensao, chave, dia, quantidade, valor_centavos):
+    _somar(
+        ResumoDiario, {'dimensao': dimensao, 'chave': chave, 'dia': dia},
+        {'quantidade': quantidade, 'valor_centavos': valor_centavos}
+    )
+
+
+def aplicar_delta_diario(dimensao, chave, dia, quantidade=0, valor_centavos=0):
+    """Soma ``quantidade`` e ``valor_centavos`` às doações do ``dia`` em (dimensao, chave)."""
+    if not quantidade and not valor_centavos:
+        return
+    diarios = getattr(_agrupamento, 'diarios', None)
+    if diarios is not None:
+        if (dimensao, chave) in _agrupamento.diarios_removidos:
+            return
+        acumulado = diarios.setdefault((dimensao, chave, dia), [0, 0])
+        acumulado[0] += quantidade
+        acumulado[1] += valor_centavos
+        return
+    _gravar_delta_diario(dimensao, chave, dia, quantidade, valor_centavos)
+
+
+def _aplicar_delta_item(item_id, dia, quantidade, valor_centavos):
+    """Delta por tipo de uma doação cujo item não está carregado; o tipo é buscado no banco."""
+    por_item = getattr(_agrupamento, 'por_item', None)
+    if por_item is not None:
+        # Resolvido ao final do bloco, com uma consulta para todos os itens
+        acumulado = por_item.setdefault((item_id, dia), [0, 0])
+        acumulado[0] += quantidade
+        acumulado[1] += valor_centavos
+        return
+    tipo = Item.objects.filter(pk=item_id).values_list('tipo', flat=True).first()
+    if tipo:
+        _gravar_delta_diario(TIPO, tipo, dia, quantidade, valor_centavos)
+
+
+def lembrar_tipo_item(item_id, tipo):
+    """Guarda o tipo de um item que vai ser excluído dentro de ``deltas_agrupados``."""
+    tipos = getattr(_agrupamento, 'tipos', None)
+    if tipos is not None:
+        tipos[item_id] = tipo
+
+
+def remover_contador(categoria, chave):
+    """Exclui um contador que deixou de fazer sentido (ex.: doador excluído)."""
+    deltas = getattr(_agrupamento, 'deltas', None)
+    if deltas is not None:
+        deltas.pop((categoria, chave), None)
+        _agrupamento.removidos.add((categoria, chave))
+    ResumoDashboard.objects.filter(categoria=categoria, chave=chave).delete()
+
+
+def remover_diarios(dimensao, chave):
+    """Exclui a série diária de um doador ou recebedor excluído."""
+    diarios = getattr(_agrupamento, 'diarios', None)
+    if diarios is not None:
+        for pendente in [pendente for pendente in diarios if pendente[:2] == (dimensao, chave)]:
+            del diarios[pendente]
+        _agrupamento.diarios_removidos.add((dimensao, chave))
+    ResumoDiario.objects.filter(dimensao=dimensao, chave=chave).delete()
+
+
+def estado_doacao(doacao):
+    """Extrai da doação apenas os campos que influenciam os contadores."""
+    tipo = None
+    if doacao.item_id is not None and Doacao.item.is_cached(doacao):
+        tipo = doacao.item.tipo
+    return {
+        'valor': doacao.valor,
+        'item_id': doacao.item_id,
+        'tipo': tipo,
+        'doador_id': doacao.doador_id,
+        'recebedor_id': doacao.recebedor_id,
+        'data': doacao.data,
+    }
+
+
+def contabilizar_doacao(estado, sinal):
+    """Aplica (sinal=1) ou remove (sinal=-1) uma doação dos contadores."""
+    valor = Decimal(estado['valor']) if estado['valor'] is not None else Decimal('0')
+    aplicar_delta(TOTAL, TOTAL_DOACOES, sinal)
+    if estado['valor'] is not None:
+        aplicar_delta(TOTAL, TOTAL_DOACOES_DINHEIRO, sinal, sinal * valor)
+    if estado['item_id'] is not None:
+        aplicar_delta(TOTAL, TOTAL_DOACOES_ITEM, sinal)
+    if estado['data'] is not None:
+        aplicar_delta(MES, chave_mes(estado['data']), sinal, sinal * valor)
+    if estado['doador_id'] is not None:
+        aplicar_delta(DOADOR, str(estado['doador_id']), sinal)
+    if estado['recebedor_id'] is not None:
+        aplicar_delta(RECEBEDOR, str(estado['recebedor_id']), sinal)
+    if estado['data'] is not None:
+        _contabilizar_diario(estado, sinal)
+
+
+def _contabilizar_diario(estado, sinal):
+    dia = dia_local(estado['data'])
+    valor = sinal * centavos(estado['valor'])
+    aplicar_delta_diario(TOTAL, '', dia, sinal, valor)
+    if estado['item_id'] is None:
+        aplicar_delta_diario(TIPO, SEM_ITEM, dia, sinal, valor)
+    elif estado.get('tipo'):
+        aplicar_delta_diario(TIPO, estado['tipo'], dia, sinal, valor)
+    else:
+        _aplicar_delta_item(estado['item_id'], dia, sinal, valor)
+    if estado['doador_id'] is not None:
+        aplicar_delta_diario(DOADOR, str(estado['doador_id']), dia, sinal, valor)
+    if estado['recebedor_id'] is not None:
+        aplicar_delta_diario(RECEBEDOR, str(estado['recebedor_id']), dia, sinal, valor)
+
+
+def mover_tipo_itens(mudancas):
+    """
+    Passa as doações dos itens que mudaram de tipo para o tipo novo no
+    ResumoDiario; ``mudancas`` é ``{item_id: (tipo_anterior, tipo_novo)}``.
+    """
+    if not mudancas:
+        return
+    doacoes = Doacao.objects.filter(item_id__in=list(mudancas)).values_list('item_id', 'data', 'valor')
+    for item_id, data, valor in doacoes.iterator():
+        anterior, novo = mudancas[item_id]
+        dia, valor = dia_local(data), centavos(valor)
+        if anterior:
+            aplicar_delta_diario(TIPO, anterior, dia, -1, -valor)
+        if novo:
+            aplicar_delta_diario(TIPO, novo, dia, 1, valor)
+
+
+def contabilizar_item(tipo, sinal):
+    """Aplica (sinal=1) ou remove (sinal=-1) um item dos contadores."""
+    aplicar_delta(TOTAL, TOTAL_ITENS, sinal)
+    if tipo:
+        aplicar_delta(TIPO, tipo, sinal)
+
+
+@tarefa
+@transaction.atomic
+def reconstruir_resumo():
+    """Recalcula todos os contadores a partir das tabelas de origem."""
+    ResumoDashboard.objects.all().delete()
+
+    dinheiro = Doacao.objects.filter(valor__isnull=False).aggregate(total=Count('id'), valor=Sum('valor'))
+    linhas = [
+        ResumoDashboard(categoria=TOTAL, chave=TOTAL_DOACOES, quantidade=Doacao.objects.count()),
+        ResumoDashboard(
+            categoria=TOTAL, chave=TOTAL_DOACOES_DINHEIRO,
+            quantidade=dinheiro['total'], valor=dinheiro['valor'] or 0,
+        ),
+        ResumoDashboard(
+            categoria=TOTAL, chave=TOTAL_DOACOES_ITEM,
+            quantidade=Doacao.objects.filter(item__isnull=False).count(),
+        ),
+        ResumoDashboard(categoria=TOTAL, chave=TOTAL_DOADORES, quantidade=Doador.objects.count()),
+        ResumoDashboard(categoria=TOTAL, chave=TOTAL_RECEBEDORES, quantidade=Recebedor.objects.count()),
+        ResumoDashboard(categoria=TOTAL, chave=TOTAL_ITENS, quantidade=Item.objects.count()),
+    ]
+
+    por_mes = (
+        Doacao.objects
+        .annotate(mes=TruncMonth('data'))
+        .values('mes')
+        .annotate(total=Count('id'), valor_total=Sum('valor'))
+        .order_by('mes')
+    )
+    linhas += [
+        ResumoDashboard(
+            categoria=MES, chave=chave_mes(d['mes']),
+            quantidade=d['total'], valor=d['valor_total'] or 0,
+        )
+        for d in por_mes if d['mes'] is not None
+    ]
+
+    por_tipo = Item.objects.values('tipo').annotate(total=Count('id')).order_by()
+    linhas += [
+        ResumoDashboard(categoria=TIPO, chave=d['tipo'], quantidade=d['total'])
+        for d in por_tipo if d['tipo']
+    ]
+
+    por_doador = Doacao.objects.values('doador_id').annotate(total=Count('id')).order_by()
+    linhas += [
+        ResumoDashboard(categoria=DOADOR, chave=str(d['doador_id']), quantidade=d['total'])
+        for d in por_doador if d['doador_id'] is not None
+    ]
+
+    por_recebedor = (
+        Doacao.objects.filter(recebedor__isnull=False)
+        .values('recebedor_id').annotate(total=Count('id')).order_by()
+    )
+    linhas += [
+        ResumoDashboard(categoria=RECEBEDOR, chave=str(d['recebedor_id']), quantidade=d['total'])
+        for d in por_recebedor
+    ]
+
+    ResumoDashboard.objects.bulk_create(linhas, batch_size=1000)
+    agendar_invalidacao()
+    return len(linhas)
+
+
+def _data(valor):
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(valor)
+
+
+@tarefa
+@transaction.atomic
+def reconstruir_resumo_diario(de=None, ate=None, lote=2000):
+    """
+    Recalcula o ResumoDiario a partir das doações: inteiro ou só os dias de
+    ``de`` a ``ate`` (inclusive; datas ou 'AAAA-MM-DD'). Retorna o número de linhas.
+
+    Uma única leitura das doações em ordem de data: os contadores de cada dia
+    são gravados quando o dia termina, então a memória usada não depende do
+    tamanho da tabela.
+    """
+    de, ate = _data(de), _data(ate)
+    linhas = ResumoDiario.objects.all()
+    doacoes = Doacao.objects.order_by('data')
+    if de:
+        linhas = linhas.filter(dia__gte=de)
+        doacoes = doacoes.filter(data__gte=timezone.make_aware(datetime.combine(de, time.min)))
+    if ate:
+        linhas = linhas.filter(dia__lte=ate)
+        doacoes = doacoes.filter(data__lt=timezone.make_aware(datetime.combine(ate + timedelta(days=1), time.min)))
+    linhas.delete()
+
+    conexao = connections[router.db_for_write(ResumoDiario)]
+    inserir = (
+        f'INSERT INTO {conexao.ops.quote_name(ResumoDiario._meta.db_table)} '
+        '(dimensao, chave, dia, quantidade, valor_centavos) VALUES (%s, %s, %s, %s, %s)'
+    )
+    pendentes = []
+    total = 0
+
+    def gravar(forcar=False):
+        nonlocal pendentes, total
+        if pendentes and (forcar or len(pendentes) >= lote):
+            with conexao.cursor() as cursor:
+                cursor.executemany(inserir, pendentes)
+            total += len(pendentes)
+            pendentes = []
+
+    # Fuso lido uma vez: get_current_timezone() por linha pesa em milhões de doações
+    dia_atual, contadores, fuso = None, {}, timezone.get_current_timezone()
+    colunas = ('data', 'valor', 'item_id', 'item__tipo', 'doador_id', 'recebedor_id')
+    for data, valor, item_id, tipo, doador_id, recebedor_id in doacoes.values_list(*colunas).iterator(chunk_size=lote):
+        dia = dia_local(data, fuso)
+        if dia != dia_atual:
+            pendentes += [
+                (dimensao, chave, conexao.ops.adapt_datefield_value(dia_atual), quantidade, valor_dia)
+                for (dimensao, chave), (quantidade, valor_dia) in contadores.items()
+            ]
+            gravar()
+            dia_atual, contadores = dia, {}
+        valor = centavos(valor)
+        chaves = [(TOTAL, '')]
+        if item_id is None:
+            chaves.append((TIPO, SEM_ITEM))
+        elif tipo:
+            chaves.append((TIPO, tipo))
+        chaves.append((DOADOR, str(doador_id)))
+        if recebedor_id is not None:
+            chaves.append((RECEBEDOR, str(recebedor_id)))
+        for chave in chaves:
+            acumulado = contadores.setdefault(chave, [0, 0])
+            acumulado[0] += 1
+            acumulado[1] += valor
+    pendentes += [
+        (dimensao, chave, conexao.ops.adapt_datefield_value(dia_atual), quantidade, valor_dia)
+        for (dimensao, chave), (quantidade, valor_dia) in contadores.items()
+    ]
+    gravar(forcar=True)
+    return total
+
+
+def _top(categoria, model, atributo, limite):
+    """Retorna os ``limite`` objetos com mais doações, anotados com ``atributo``."""
+    contadores = list(
+        ResumoDashboard.objects
+        .filter(categoria=categoria, quantidade__gt=0)
+        .order_by('-quantidade')
+        .values_list('chave', 'quantidade')[:limite]
+    )
+    objetos = model.objects.in_bulk([int(chave) for chave, _ in contadores])
+    resultado = []
+    for chave, quantidade in contadores:
+        obj = objetos.get(int(chave))
+        if obj is not None:
+            setattr(obj, atributo, quantidade)
+            resultado.append(obj)
+
+    # Completa a lista com cadastros sem doações, como na consulta original
+    if len(resultado) < limite:
+        faltantes = model.objects.exclude(pk__in=[o.pk for o in resultado])[:limite - len(resultado)]
+        for obj in faltantes:
+            setattr(obj, atributo, 0)
+            resultado.append(obj)
+    return resultado
+
+
+def obter_resumo(meses_desde):
+    """
+    Lê os contadores necessários ao dashboard.
+
+    ``meses_desde`` é o instante a partir do qual as doações entram nos
+    buckets mensais. Os meses seguintes vêm dos contadores; o mês de
+    ``meses_desde`` só conta as doações a partir desse instante, como a
+    consulta original (``data >= meses_desde`` agrupado por mês), com uma
+    leitura de no máximo um mês de doações pelo índice de data.
+    """
+    linhas = ResumoDashboard.objects.filter(categoria__in=[TOTAL, TIPO]).values_list(
+        'categoria', 'chave', 'quantidade', 'valor'
+    )
+    totais = {}
+    tipos = []
+    for categoria, chave, quantidade, valor in linhas:
+        if categoria == TOTAL:
+            totais[chave] = (quantidade, valor)
+        elif quantidade > 0:
+            tipos.append((chave, quantidade))
+    tipos.sort(key=lambda t: -t[1])
+
+    primeiro_mes = chave_mes(meses_desde)
+    meses = list(
+        ResumoDashboard.objects
+        .filter(categoria=MES, chave__gt=primeiro_mes, quantidade__gt=0)
+        .order_by('chave')
+        .values_list('chave', 'quantidade', 'valor')
+    )
+    local = timezone.localtime(meses_desde)
+    proximo_mes = timezone.make_aware(datetime(local.year + local.month // 12, local.month % 12 + 1, 1))
+    parcial = Doacao.objects.filter(data__gte=meses_desde, data__lt=proximo_mes).aggregate(
+        total=Count('id'), valor=Sum('valor')
+    )
+    if parcial['total']:
+        meses.insert(0, (primeiro_mes, parcial['total'], parcial['valor'] or Decimal('0')))
+
+    def total(chave):
+        return totais.get(chave, (0, Decimal('0')))
+
+    return {
+        'total_doacoes': total(TOTAL_DOACOES)[0],
+        'total_doadores': total(TOTAL_DOADORES)[0],
+        'total_recebedores': total(TOTAL_RECEBEDORES)[0],
+        'total_itens': total(TOTAL_ITENS)[0],
+        'total_dinheiro': total(TOTAL_DOACOES_DINHEIRO)[1],
+        'total_doacoes_dinheiro': total(TOTAL_DOACOES_DINHEIRO)[0],
+        'total_doacoes_item': total(TOTAL_DOACOES_ITEM)[0],
+        'meses': meses,
+        'itens_por_tipo': tipos,
+        'top_doadores': _top(DOADOR, Doador, 'total_doacoes', 5),
+        'top_recebedores': _top(RECEBEDOR, Recebedor, 'total_recebimentos', 5),
+    }
@@ -2,7 +2,10 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.password_validation import validate_password
-from .models import Doador, Recebedor, Item, Doacao
+from .models import Doador, Recebedor, Item, Doacao, Tarefa
+from .acessos import acessos
+from .campos import CamposDinamicosMixin
+from .instrumentacao import SerializacaoMedidaMixin
 
 User = get_user_model()
 
@@ -15,7 +18,14 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['nome_completo'] = user.nome_completo
         return token
 
-class UserSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # last_login e ultimo_acesso são gravados depois, em lote (ver acessos.py);
+        # por isso UPDATE_LAST_LOGIN fica desligado
+        acessos.registrar(self.user.pk, login=True)
+        return data
+
+class UserSerializer(SerializacaoMedidaMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True)
     password2 = serializers.CharField(write_only=True, required=False)
     old_password = serializers.CharField(write_only=True, required=False)
@@ -79,21 +89,35 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class DoadorSerializer(serializers.ModelSerializer):
+class DoadorSerializer(SerializacaoMedidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Doador
-        fields = '__all__'
+        # telefone_digitos só existe para o lookup por telefone
+        exclude = ('telefone_digitos',)
 
-class RecebedorSerializer(serializers.ModelSerializer):
+class RecebedorSerializer(SerializacaoMedidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Recebedor
-        fields = '__all__'
+        # telefone_digitos só existe para o lookup por telefone
+        exclude = ('telefone_digitos',)
+
+class ItemSerializer(SerializacaoMedidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    foto_variantes = serializers.SerializerMethodField()
+    expansoes = {'doador': DoadorSerializer}
+    dependencias = {'foto_variantes': ('foto', 'foto_variantes')}
 
-class ItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = '__all__'
 
+    def get_foto_variantes(self, obj):
+        """URLs das miniaturas/WebP da foto; vazio até o processamento terminar (ver imagens.py)."""
+        request = self.context.get('request')
+        return {
+            variante: {formato: request.build_absolute_uri(url) if request else url for formato, url in urls.items()}
+            for variante, urls in obj.urls_variantes.items()
+        }
+
     def validate_tipo(self, value):
         if value not in dict(Item.TIPO_CHOICES):
             raise serializers.ValidationError(
@@ -131,7 +155,9 @@ class ItemSerializer(serializers.ModelSerializer):
         except Exception as e:
             raise serializers.ValidationError(f"Erro ao atualizar item: {str(e)}")
 
-class DoacaoSerializer(serializers.ModelSerializer):
+class DoacaoSerializer(SerializacaoMedidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    expansoes = {'doador': DoadorSerializer, 'recebedor': RecebedorSerializer, 'item': ItemSerializer}
+
     class Meta:
         model = Doacao
         fields = '__all__'
@@ -170,3 +196,9 @@ class DoacaoSerializer(serializers.ModelSerializer):
             return super().update(instance, validated_data)
         except Exception as e:
             raise serializers.ValidationError(f"Erro ao atualizar doação: {str(e)}")
+
+class TarefaSerializer(SerializacaoMedidaMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Tarefa
+        fields = '__all__'
+        read_only_fields = [campo.name for campo in Tarefa._meta.fields]
@@ -13,7 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from dotenv import load_dotenv, dotenv_values
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -81,6 +83,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'doacoes.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
@@ -94,7 +98,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login e ultimo_acesso são gravados em lote (doacoes/acessos.py)
+    'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -113,6 +118,18 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',
 }
 
+# JWT_STATELESS=True: as requisições com JWT não consultam a tabela de usuários;
+# função e dados do usuário vêm das claims do token (ver doacoes/autenticacao.py).
+# A revogação dos tokens fica no cache, que precisa ser compartilhado entre os
+# processos: o modo exige CACHE_BACKEND=file ou db (ver Cache, abaixo).
+JWT_STATELESS = get_env_value('JWT_STATELESS', 'False') == 'True'
+
+if JWT_STATELESS:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = (
+        'doacoes.autenticacao.JWTStatelessAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    )
+
 # Configuração do CORS
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -149,6 +166,9 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_SAMESITE = 'Lax'
 
 MIDDLEWARE = [
+    # As primeiras da lista: os tempos medidos incluem as demais
+    "doacoes.middleware.InstrumentacaoMiddleware",
+    "doacoes.middleware.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Adiciona o WhiteNoise
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -156,6 +176,9 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Depois da autenticação: só administradores pedem ?_profile=
+    "doacoes.middleware.PerfilMiddleware",
+    "doacoes.middleware.RegistroAcessoMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -164,7 +187,8 @@ ROOT_URLCONF = "doacoes.urls"
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com o tempo de renderização medido (ver doacoes/instrumentacao.py)
+        'BACKEND': 'doacoes.instrumentacao.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Diretório onde ficarão os templates do projeto
         'APP_DIRS': True,  # Essencial para carregar templates dos apps instalados
         'OPTIONS': {
@@ -210,6 +234,66 @@ else:
         }
     }
 
+# ---------------------------------------------------------------------------
+# Cache
+# CACHE_BACKEND=locmem (padrão, por processo), file (compartilhado entre os
+# workers da mesma máquina, em CACHE_LOCATION) ou db (compartilhado entre
+# máquinas e instâncias serverless, na tabela CACHE_LOCATION do banco; criada
+# por manage.py createcachetable).
+# ---------------------------------------------------------------------------
+CACHE_BACKEND = get_env_value('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': get_env_value('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': get_env_value('CACHE_LOCATION', 'cache_plataforma'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'plataforma-doacoes',
+        }
+    }
+
+if JWT_STATELESS and CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # Com o cache por processo, um token revogado continuaria valendo nos outros workers
+    raise ImproperlyConfigured(
+        'JWT_STATELESS=True exige um cache compartilhado para a revogação dos tokens: '
+        'use CACHE_BACKEND=file (workers da mesma máquina) ou db (várias máquinas ou instâncias).'
+    )
+
+# Intervalo (segundos) entre as gravações em lote de last_login/ultimo_acesso
+ACESSOS_INTERVALO_DESCARGA = int(get_env_value('ACESSOS_INTERVALO_DESCARGA', 30))
+
+# Tempo máximo (segundos) que o contexto do dashboard fica em cache; escritas
+# em doações e cadastros invalidam antes disso (ver doacoes/cache_dashboard.py).
+# A invalidação só chega aos outros workers com um cache compartilhado: com
+# CACHE_BACKEND=locmem o cache do dashboard fica desligado (0) por padrão.
+CACHE_COMPARTILHADO = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+DASHBOARD_CACHE_TIMEOUT = int(get_env_value('DASHBOARD_CACHE_TIMEOUT', 300 if CACHE_COMPARTILHADO else 0))
+
+if DASHBOARD_CACHE_TIMEOUT and not CACHE_COMPARTILHADO:
+    # Cada worker teria a sua versão do contexto e serviria totais antigos
+    raise ImproperlyConfigured(
+        'DASHBOARD_CACHE_TIMEOUT > 0 exige um cache compartilhado para a invalidação: '
+        'use CACHE_BACKEND=file (workers da mesma máquina) ou db (várias máquinas ou instâncias), '
+        'ou DASHBOARD_CACHE_TIMEOUT=0.'
+    )
+
+# Por quanto tempo (horas) uma Idempotency-Key devolve a resposta original
+# em vez de executar a requisição de novo (ver doacoes/idempotencia.py)
+IDEMPOTENCIA_VALIDADE_HORAS = int(get_env_value('IDEMPOTENCIA_VALIDADE_HORAS', 24))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -261,6 +345,44 @@ WHITENOISE_ALLOW_ALL_ORIGINS = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Processamento das fotos dos itens (miniaturas, WebP, remoção de metadados):
+# pela fila de tarefas (padrão), o que exige um worker rodando
+# manage.py executar_tarefas ou um cron com executar_tarefas --ate-esvaziar,
+# ou, com False, logo após o commit, no processo da requisição (ver doacoes/imagens.py)
+IMAGENS_ASSINCRONO = get_env_value('IMAGENS_ASSINCRONO', 'True') == 'True'
+
+# Fila de tarefas em segundo plano (ver doacoes/tarefas.py e
+# manage.py executar_tarefas); tempos em segundos
+TAREFAS_MAX_TENTATIVAS = int(get_env_value('TAREFAS_MAX_TENTATIVAS', 5))
+TAREFAS_BACKOFF_BASE = int(get_env_value('TAREFAS_BACKOFF_BASE', 10))
+TAREFAS_BACKOFF_MAXIMO = int(get_env_value('TAREFAS_BACKOFF_MAXIMO', 3600))
+TAREFAS_TEMPO_LIMITE = int(get_env_value('TAREFAS_TEMPO_LIMITE', 600))
+TAREFAS_RETENCAO_DIAS = int(get_env_value('TAREFAS_RETENCAO_DIAS', 7))
+
+# Instrumentação das requisições (doacoes/middleware.py): cabeçalho
+# Server-Timing e uma linha de log em JSON no logger doacoes.requisicoes, em
+# WARNING para as requisições acima de REQUISICAO_LENTA_MS e em INFO para as
+# demais (LOG_REQUISICOES=INFO para registrar todas).
+INSTRUMENTACAO_ATIVA = get_env_value('INSTRUMENTACAO_ATIVA', 'True') == 'True'
+SERVER_TIMING = get_env_value('SERVER_TIMING', 'True') == 'True'
+REQUISICAO_LENTA_MS = int(get_env_value('REQUISICAO_LENTA_MS', 500))
+
+# Métricas no formato do Prometheus em /metrics (ver doacoes/metricas.py),
+# lidas com "Authorization: Bearer <METRICAS_TOKEN>" ou por um administrador
+# logado. Com vários workers, METRICAS_DIR é a pasta (local, esvaziada antes
+# de iniciar o servidor) onde cada processo grava os seus valores.
+METRICAS_ATIVAS = get_env_value('METRICAS_ATIVAS', 'True') == 'True'
+METRICAS_DIR = get_env_value('METRICAS_DIR', '')
+METRICAS_TOKEN = get_env_value('METRICAS_TOKEN', '')
+
+# Perfil de uma requisição com ?_profile=cpu|sql, só para administradores
+# (ver doacoes/perfil.py); os arquivos ficam em PERFIS_DIR, que guarda os
+# PERFIS_MAXIMO perfis mais recentes. O padrão fica na pasta temporária, a
+# única gravável na Vercel (e só na instância que atendeu a requisição).
+PERFIS_ATIVOS = get_env_value('PERFIS_ATIVOS', 'True') == 'True'
+PERFIS_DIR = get_env_value('PERFIS_DIR', os.path.join(tempfile.gettempdir(), 'plataforma-doacoes-perfis'))
+PERFIS_MAXIMO = int(get_env_value('PERFIS_MAXIMO', 50))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -292,6 +414,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'doacoes.requisicoes': {
+            'handlers': ['console'],
+            'level': get_env_value('LOG_REQUISICOES', 'WARNING'),
+            'propagate': False,
+        },
     },
 }
 
@@ -301,7 +428,20 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = '/'
 
 # Session Configuration
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# SESSION_MODE=db (padrão), cached_db (cache com gravação no banco; use
+# CACHE_BACKEND=file com vários workers) ou cookie (sessão assinada no próprio
+# cookie, sem tabela). Sessões expiradas: manage.py limpar_sessoes.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = get_env_value('SESSION_MODE', 'db')
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"SESSION_MODE inválido: {SESSION_MODE!r}. Use um de: {', '.join(SESSION_ENGINES)}"
+    )
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
 SESSION_COOKIE_AGE = 86400  # 24 horas em segundos
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
@@ -0,0 +1,196 @@
+"""
+Sinais que mantêm os dados derivados (resumo e cache do dashboard, revogação
+de tokens JWT, variantes das fotos, índice de busca, métricas) em dia.
+
+Conectados em DoacoesConfig.ready().
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import busca, imagens, metricas, resumo
+from .autenticacao import revogar_tokens
+from .cache_dashboard import agendar_invalidacao
+from .models import User, Doador, Recebedor, Item, Doacao
+
+
+@receiver(pre_save, sender=Doacao)
+def guardar_estado_doacao(sender, instance, raw=False, **kwargs):
+    """Guarda o estado anterior da doação para desfazê-lo no post_save."""
+    instance._estado_anterior = None
+    if raw or instance.pk is None:
+        return
+    anterior = Doacao.objects.filter(pk=instance.pk).values(
+        'valor', 'item_id', 'doador_id', 'recebedor_id', 'data', tipo=F('item__tipo')
+    ).first()
+    instance._estado_anterior = anterior
+
+
+@receiver(post_save, sender=Doacao)
+def resumo_doacao_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_estado_anterior', None)
+    if anterior is not None:
+        resumo.contabilizar_doacao(anterior, -1)
+    resumo.contabilizar_doacao(resumo.estado_doacao(instance), 1)
+
+
+@receiver(post_delete, sender=Doacao)
+def resumo_doacao_excluida(sender, instance, **kwargs):
+    resumo.contabilizar_doacao(resumo.estado_doacao(instance), -1)
+
+
+@receiver(post_save, sender=Doacao)
+def metricas_doacao_criada(sender, instance, created, raw=False, using=None, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: metricas.contar_doacoes([instance]), using=using)
+
+
+@receiver(pre_save, sender=Item)
+def guardar_tipo_item(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._tipo_anterior = None
+    instance._foto_alterada = bool(instance.foto)
+    if raw or instance.pk is None:
+        return
+    anterior = Item.objects.filter(pk=instance.pk).values_list('tipo', 'foto', 'foto_variantes').first()
+    if anterior is None:
+        return
+    instance._tipo_anterior, foto_anterior, variantes_anteriores = anterior
+    instance._foto_alterada = bool(instance.foto) and (
+        not instance.foto._committed or instance.foto.name != foto_anterior
+    )
+    if (instance.foto.name or '') != (foto_anterior or '') and variantes_anteriores:
+        # As variantes são da foto antiga: saem junto com ela
+        imagens.agendar_remocao(instance.foto.storage, variantes_anteriores, kwargs.get('using'))
+        instance.foto_variantes = {}
+        if update_fields is not None and 'foto_variantes' not in update_fields:
+            Item.objects.filter(pk=instance.pk).update(foto_variantes={})
+
+
+@receiver(post_save, sender=Item)
+def resumo_item_salvo(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        resumo.contabilizar_item(instance.tipo, 1)
+        return
+    anterior = getattr(instance, '_tipo_anterior', None)
+    if anterior != instance.tipo:
+        if anterior:
+            resumo.aplicar_delta(resumo.TIPO, anterior, -1)
+            resumo.mover_tipo_itens({instance.pk: (anterior, instance.tipo)})
+        resumo.aplicar_delta(resumo.TIPO, instance.tipo, 1)
+
+
+@receiver(pre_delete, sender=Item)
+def lembrar_tipo_item_excluido(sender, instance, **kwargs):
+    # As doações do item são excluídas em cascata antes dele; o tipo delas sai daqui
+    resumo.lembrar_tipo_item(instance.pk, instance.tipo)
+
+
+@receiver(post_delete, sender=Item)
+def resumo_item_excluido(sender, instance, **kwargs):
+    resumo.contabilizar_item(instance.tipo, -1)
+
+
+@receiver(post_save, sender=Item)
+def processar_foto_item(sender, instance, raw=False, using=None, **kwargs):
+    if not raw and getattr(instance, '_foto_alterada', False):
+        imagens.agendar_processamento(instance.pk, using)
+
+
+@receiver(post_delete, sender=Item)
+def remover_variantes_item(sender, instance, using=None, **kwargs):
+    imagens.agendar_remocao(instance.foto.storage, instance.foto_variantes, using)
+
+
+@receiver(post_save, sender=Doador)
+def resumo_doador_salvo(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_DOADORES, 1)
+
+
+@receiver(pre_delete, sender=Doador)
+def atualizar_itens_do_doador(sender, instance, using=None, **kwargs):
+    # O SET_NULL de Item.doador é um UPDATE que não passa pelo auto_now
+    Item.objects.using(using).filter(doador=instance).update(ultima_atualizacao=timezone.now())
+
+
+@receiver(post_delete, sender=Doador)
+def resumo_doador_excluido(sender, instance, **kwargs):
+    resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_DOADORES, -1)
+    resumo.remover_contador(resumo.DOADOR, str(instance.pk))
+    resumo.remover_diarios(resumo.DOADOR, str(instance.pk))
+
+
+@receiver(post_save, sender=Recebedor)
+def resumo_recebedor_salvo(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_RECEBEDORES, 1)
+
+
+@receiver(post_delete, sender=Recebedor)
+def resumo_recebedor_excluido(sender, instance, **kwargs):
+    resumo.aplicar_delta(resumo.TOTAL, resumo.TOTAL_RECEBEDORES, -1)
+    resumo.remover_contador(resumo.RECEBEDOR, str(instance.pk))
+    resumo.remover_diarios(resumo.RECEBEDOR, str(instance.pk))
+
+
+def invalidar_cache_dashboard(sender, raw=False, using=None, **kwargs):
+    if not raw:
+        agendar_invalidacao(using)
+
+
+def indexar_busca(sender, instance, using=None, update_fields=None, **kwargs):
+    # save(update_fields=[...]) que não toca nos campos buscáveis não muda o índice
+    if update_fields is not None and not set(update_fields) & set(busca.CAMPOS[busca.TIPO_POR_MODELO[sender]]):
+        return
+    busca.indexar([instance], using)
+
+
+def remover_da_busca(sender, instance, using=None, **kwargs):
+    busca.remover(sender, [instance.pk], using)
+
+
+for modelo in (Doador, Recebedor, Item):
+    post_save.connect(indexar_busca, sender=modelo, dispatch_uid=f'busca_save_{modelo.__name__}')
+    post_delete.connect(remover_da_busca, sender=modelo, dispatch_uid=f'busca_delete_{modelo.__name__}')
+
+
+for modelo in (Doador, Recebedor, Item, Doacao):
+    post_save.connect(invalidar_cache_dashboard, sender=modelo, dispatch_uid=f'cache_dashboard_save_{modelo.__name__}')
+    post_delete.connect(invalidar_cache_dashboard, sender=modelo, dispatch_uid=f'cache_dashboard_delete_{modelo.__name__}')
+
+
+# Campos que, alterados, invalidam os tokens JWT já emitidos (as claims de
+# função ficariam desatualizadas no modo sem estado)
+CAMPOS_REVOGACAO = ('role', 'is_active', 'password')
+
+
+@receiver(pre_save, sender=User)
+def guardar_credenciais_usuario(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._credenciais_anteriores = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_REVOGACAO):
+        # Ex.: login gravando só last_login
+        return
+    instance._credenciais_anteriores = User.objects.filter(pk=instance.pk).values(*CAMPOS_REVOGACAO).first()
+
+
+@receiver(post_save, sender=User)
+def revogar_tokens_usuario_alterado(sender, instance, created, raw=False, **kwargs):
+    anteriores = getattr(instance, '_credenciais_anteriores', None)
+    if raw or created or anteriores is None:
+        return
+    if any(anteriores[campo] != getattr(instance, campo) for campo in CAMPOS_REVOGACAO):
+        transaction.on_commit(lambda: revogar_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def revogar_tokens_usuario_excluido(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: revogar_tokens(pk))
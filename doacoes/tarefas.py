@@ -0,0 +1,243 @@
+"""
+Fila de tarefas em segundo plano sobre a tabela Tarefa, no próprio banco.
+
+Uso::
+
+    from .tarefas import tarefa, enfileirar
+
+    @tarefa
+    def processar_foto(item_id): ...
+
+    enfileirar(processar_foto, args=[item.pk], prioridade=5)
+
+``enfileirar`` só grava uma linha: dentro de uma transação, a tarefa só passa
+a existir se ela for confirmada. Os workers (``manage.py executar_tarefas``,
+quantos processos forem necessários) reservam as tarefas prontas em ordem de
+prioridade:
+
+- no PostgreSQL com ``SELECT ... FOR UPDATE SKIP LOCKED``, de modo que
+  workers concorrentes nunca esperam uns pelos outros nem pegam a mesma linha;
+- no SQLite, que não tem trava de linha, com um UPDATE condicional
+  (``WHERE status = 'PENDENTE'``): as escritas são serializadas pelo banco e
+  só um worker consegue mudar o status de cada tarefa.
+
+Uma tarefa que levanta exceção volta para a fila com espera exponencial
+(``TAREFAS_BACKOFF_BASE`` * 2^(tentativa-1), até ``TAREFAS_BACKOFF_MAXIMO``)
+até ``max_tentativas``; depois fica como FALHOU, com o traceback em
+``ultimo_erro``. Tarefas EXECUTANDO há mais de ``TAREFAS_TEMPO_LIMITE``
+(worker que morreu no meio) voltam para a fila.
+
+Só funções marcadas com ``@tarefa`` podem ser executadas; o nome gravado é o
+caminho de importação da função.
+"""
+import logging
+import math
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metricas
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+LOTE_LIMPEZA = 5000
+
+
+class TarefaDesconhecida(Exception):
+    pass
+
+
+def tarefa(funcao=None, *, max_tentativas=None):
+    """Marca a função como executável pela fila."""
+    def marcar(f):
+        f.nome_tarefa = f'{f.__module__}.{f.__qualname__}'
+        f.max_tentativas = max_tentativas
+        return f
+    return marcar(funcao) if funcao is not None else marcar
+
+
+def carregar(nome):
+    try:
+        funcao = import_string(nome)
+    except ImportError as e:
+        raise TarefaDesconhecida(f'Tarefa {nome} não encontrada: {str(e)}')
+    if getattr(funcao, 'nome_tarefa', None) != nome:
+        raise TarefaDesconhecida(f'{nome} não é uma tarefa (use o decorador @tarefa).')
+    return funcao
+
+
+def enfileirar(funcao, args=(), kwargs=None, prioridade=0, atraso=None, max_tentativas=None):
+    """
+    Grava a tarefa na fila; ``funcao`` é uma função marcada com ``@tarefa``
+    ou o seu caminho de importação. Argumentos devem ser serializáveis em JSON.
+    """
+    if isinstance(funcao, str):
+        funcao = carregar(funcao)
+    elif not getattr(funcao, 'nome_tarefa', None):
+        raise TarefaDesconhecida(f'{funcao!r} não é uma tarefa (use o decorador @tarefa).')
+
+    agora = timezone.now()
+    return Tarefa.objects.create(
+        nome=funcao.nome_tarefa,
+        args=list(args),
+        kwargs=kwargs or {},
+        prioridade=prioridade,
+        max_tentativas=max_tentativas or funcao.max_tentativas or settings.TAREFAS_MAX_TENTATIVAS,
+        criada_em=agora,
+        executar_apos=agora + atraso if atraso else agora,
+    )
+
+
+def espera_nova_tentativa(tentativa):
+    segundos = min(settings.TAREFAS_BACKOFF_BASE * 2 ** (tentativa - 1), settings.TAREFAS_BACKOFF_MAXIMO)
+    # Variação aleatória para que tarefas que falharam juntas não voltem juntas
+    return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def reservar(worker, limite=1):
+    """Marca até ``limite`` tarefas prontas como EXECUTANDO por este worker e as retorna."""
+    agora = timezone.now()
+    fila = (
+        Tarefa.objects.filter(status=Tarefa.PENDENTE, executar_apos__lte=agora)
+        .order_by('-prioridade', 'executar_apos', 'id')
+    )
+    reserva = {
+        'status': Tarefa.EXECUTANDO,
+        'worker': worker,
+        'iniciada_em': agora,
+        'tentativas': F('tentativas') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(fila.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limite])
+            Tarefa.objects.filter(pk__in=ids).update(**reserva)
+    else:
+        ids = []
+        # Tarefas reservadas por outros workers saem da fila; repete até
+        # completar o lote ou a fila esvaziar
+        while len(ids) < limite:
+            candidatas = list(fila.values_list('pk', flat=True)[:limite - len(ids)])
+            if not candidatas:
+                break
+            for pk in candidatas:
+                if Tarefa.objects.filter(pk=pk, status=Tarefa.PENDENTE).update(**reserva):
+                    ids.append(pk)
+
+    return list(Tarefa.objects.filter(pk__in=ids).order_by('-prioridade', 'executar_apos', 'id'))
+
+
+def executar(tarefa_reservada):
+    """Executa uma tarefa já reservada e grava o resultado; retorna True se concluiu."""
+    minha = Tarefa.objects.filter(
+        pk=tarefa_reservada.pk, status=Tarefa.EXECUTANDO, worker=tarefa_reservada.worker
+    )
+    try:
+        funcao = carregar(tarefa_reservada.nome)
+        funcao(*tarefa_reservada.args, **tarefa_reservada.kwargs)
+    except Exception as e:
+        erro = traceback.format_exc()
+        agora = timezone.now()
+        definitiva = (
+            isinstance(e, TarefaDesconhecida)
+            or tarefa_reservada.tentativas >= tarefa_reservada.max_tentativas
+        )
+        if definitiva:
+            logger.error(f"Tarefa {tarefa_reservada.pk} ({tarefa_reservada.nome}) falhou: {str(e)}")
+            minha.update(status=Tarefa.FALHOU, concluida_em=agora, ultimo_erro=erro)
+            metricas.TAREFAS_EXECUTADAS.rotular(tarefa_reservada.nome, 'falhou').incrementar()
+        else:
+            logger.warning(
+                f"Tarefa {tarefa_reservada.pk} ({tarefa_reservada.nome}) falhou na tentativa "
+                f"{tarefa_reservada.tentativas}; nova tentativa agendada: {str(e)}"
+            )
+            minha.update(
+                status=Tarefa.PENDENTE,
+                executar_apos=agora + espera_nova_tentativa(tarefa_reservada.tentativas),
+                worker='',
+                ultimo_erro=erro,
+            )
+            metricas.TAREFAS_EXECUTADAS.rotular(tarefa_reservada.nome, 'nova_tentativa').incrementar()
+        return False
+
+    minha.update(status=Tarefa.CONCLUIDA, concluida_em=timezone.now())
+    metricas.TAREFAS_EXECUTADAS.rotular(tarefa_reservada.nome, 'concluida').incrementar()
+    return True
+
+
+def recuperar_travadas():
+    """Devolve à fila as tarefas de workers que morreram; retorna quantas foram alteradas."""
+    agora = timezone.now()
+    travadas = Tarefa.objects.filter(
+        status=Tarefa.EXECUTANDO,
+        iniciada_em__lt=agora - timedelta(seconds=settings.TAREFAS_TEMPO_LIMITE),
+    )
+    esgotadas = travadas.filter(tentativas__gte=F('max_tentativas')).update(
+        status=Tarefa.FALHOU, concluida_em=agora, ultimo_erro='Tempo limite de execução excedido.'
+    )
+    devolvidas = travadas.update(status=Tarefa.PENDENTE, executar_apos=agora, worker='')
+    return esgotadas + devolvidas
+
+
+def limpar_concluidas():
+    """Exclui, em lotes, as tarefas concluídas há mais de ``TAREFAS_RETENCAO_DIAS``."""
+    limite = timezone.now() - timedelta(days=settings.TAREFAS_RETENCAO_DIAS)
+    excluidas = 0
+    while True:
+        ids = list(
+            Tarefa.objects.filter(status=Tarefa.CONCLUIDA, concluida_em__lt=limite)
+            .values_list('pk', flat=True)[:LOTE_LIMPEZA]
+        )
+        if not ids:
+            return excluidas
+        excluidas += Tarefa.objects.filter(pk__in=ids).delete()[0]
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, math.ceil(p * len(valores)) - 1)]
+
+
+def estatisticas(janela=timedelta(hours=1)):
+    """Profundidade da fila e latências (espera e execução, em segundos) da última ``janela``."""
+    agora = timezone.now()
+    por_status = dict(Tarefa.objects.order_by().values_list('status').annotate(total=Count('id')))
+    prontas = Tarefa.objects.filter(status=Tarefa.PENDENTE, executar_apos__lte=agora)
+    por_prioridade = dict(prontas.order_by().values_list('prioridade').annotate(total=Count('id')))
+    mais_antiga = prontas.aggregate(mais_antiga=Min('executar_apos'))['mais_antiga']
+
+    concluidas = list(
+        Tarefa.objects.filter(status=Tarefa.CONCLUIDA, concluida_em__gte=agora - janela)
+        .values_list('executar_apos', 'iniciada_em', 'concluida_em')[:10000]
+    )
+    # Espera: do momento em que a tarefa ficou pronta até começar a executar
+    espera = [(inicio - pronta).total_seconds() for pronta, inicio, _ in concluidas]
+    execucao = [(fim - inicio).total_seconds() for _, inicio, fim in concluidas]
+
+    def resumir(valores):
+        return {
+            'media': round(sum(valores) / len(valores), 3) if valores else None,
+            'p95': round(_percentil(valores, 0.95), 3) if valores else None,
+            'maximo': round(max(valores), 3) if valores else None,
+        }
+
+    return {
+        'por_status': {codigo: por_status.get(codigo, 0) for codigo, _ in Tarefa.STATUS_CHOICES},
+        'prontas': sum(por_prioridade.values()),
+        'agendadas': por_status.get(Tarefa.PENDENTE, 0) - sum(por_prioridade.values()),
+        'prontas_por_prioridade': {str(p): total for p, total in sorted(por_prioridade.items(), reverse=True)},
+        'idade_mais_antiga': (agora - mais_antiga).total_seconds() if mais_antiga else 0,
+        'janela_segundos': janela.total_seconds(),
+        'concluidas_na_janela': len(concluidas),
+        'espera': resumir(espera),
+        'execucao': resumir(execucao),
+    }
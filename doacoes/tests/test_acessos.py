@@ -0,0 +1,91 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from doacoes.acessos import acessos
+
+User = get_user_model()
+
+
+class BufferAcessosTests(TestCase):
+    def setUp(self):
+        acessos.descarregar()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.outro = User.objects.create_user(
+            email='outro@example.com',
+            password='testpass123',
+            nome_completo='Outro User'
+        )
+
+    def test_descarga_em_lote(self):
+        """Testa se vários acessos viram um único UPDATE só nas colunas de acesso"""
+        agora = timezone.now()
+        acessos.registrar(self.user.pk, quando=agora - timedelta(minutes=5))
+        acessos.registrar(self.user.pk, quando=agora)
+        acessos.registrar(self.outro.pk, quando=agora)
+        # Alteração concorrente em outra coluna não pode ser sobrescrita
+        User.objects.filter(pk=self.user.pk).update(nome_completo='Nome Novo')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(acessos.descarregar(), 2)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ultimo_acesso, agora)
+        self.assertIsNone(self.user.last_login)
+        self.assertEqual(self.user.nome_completo, 'Nome Novo')
+        self.assertEqual(acessos.pendentes(), {})
+
+    def test_nao_volta_no_tempo(self):
+        """Testa se um acesso mais antigo não sobrescreve um mais novo já gravado"""
+        agora = timezone.now()
+        User.objects.filter(pk=self.user.pk).update(ultimo_acesso=agora)
+        acessos.registrar(self.user.pk, quando=agora - timedelta(hours=1))
+        acessos.descarregar()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ultimo_acesso, agora)
+
+    def test_login_pela_sessao_fica_no_buffer(self):
+        """Testa se o login pelo formulário não grava last_login durante a requisição"""
+        response = Client().post(reverse('login'), {'email': 'test@example.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        self.assertIn(self.user.pk, acessos.pendentes())
+
+        acessos.descarregar()
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_requisicao_autenticada_registra_acesso(self):
+        """Testa se o middleware anota o acesso sem consultas extras"""
+        client = Client()
+        client.force_login(self.user)
+        acessos.descarregar()
+        client.get(reverse('doador_list'))
+        ultimo_acesso, ultimo_login = acessos.pendentes()[self.user.pk]
+        self.assertIsNotNone(ultimo_acesso)
+        self.assertIsNone(ultimo_login)
+
+
+class DescargaAposRequisicaoTests(TransactionTestCase):
+    def setUp(self):
+        acessos.descarregar()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+
+    @override_settings(ACESSOS_INTERVALO_DESCARGA=0)
+    def test_descarga_ao_fim_da_requisicao(self):
+        """Testa se os acessos pendentes são gravados quando a requisição termina"""
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('doador_list'))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.ultimo_acesso)
@@ -1,9 +1,25 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from doacoes.models import Doador, Recebedor, Item, Doacao
+from doacoes.models import Doador, Recebedor, Item, Doacao, ResumoDashboard, Tarefa
+from doacoes.imagens import gerar_variantes
+from PIL import Image
 
 User = get_user_model()
 
@@ -43,7 +59,7 @@ class APITestCase(TestCase):
         url = reverse('doacao-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_doacao(self):
         """Testa criação de doação via API"""
@@ -76,7 +92,7 @@ class APITestCase(TestCase):
         url = reverse('doador-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_doador(self):
         """Testa criação de doador via API"""
@@ -95,7 +111,7 @@ class APITestCase(TestCase):
         url = reverse('recebedor-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_recebedor(self):
         """Testa criação de recebedor via API"""
@@ -114,7 +130,7 @@ class APITestCase(TestCase):
         url = reverse('item-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_item(self):
         """Testa criação de item via API"""
@@ -134,4 +150,620 @@ class APITestCase(TestCase):
         self.client.force_authenticate(user=None)
         url = reverse('doacao-list')
         response = self.client.get(url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
+
+
+class PaginacaoAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        # Nomes repetidos para exercitar o desempate por id
+        for i in range(7):
+            Doador.objects.create(nome=f'Doador {i % 3}', email=f'doador{i}@email.com')
+        doador = Doador.objects.first()
+        for i in range(7):
+            Doacao.objects.create(doador=doador, valor=i + 1)
+
+    def percorrer(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [obj['id'] for obj in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_cursor_segue_ordenacao_do_modelo(self):
+        """Testa se o cursor percorre todos os doadores na ordem (nome, id)"""
+        ids = self.percorrer(reverse('doador-list') + '?page_size=2')
+        esperado = list(Doador.objects.order_by('nome', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_cursor_doacoes_mais_recentes_primeiro(self):
+        """Testa se as doações são paginadas por -data com desempate em id"""
+        ids = self.percorrer(reverse('doacao-list') + '?page_size=3')
+        esperado = list(Doacao.objects.order_by('-data', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_pagina_anterior(self):
+        """Testa se o link 'previous' retorna a página anterior"""
+        url = reverse('doador-list') + '?page_size=3'
+        primeira = self.client.get(url).data
+        segunda = self.client.get(primeira['next']).data
+        self.assertIsNone(primeira['previous'])
+        voltando = self.client.get(segunda['previous']).data
+        self.assertEqual(
+            [obj['id'] for obj in voltando['results']],
+            [obj['id'] for obj in primeira['results']]
+        )
+
+    def test_cursor_invalido(self):
+        """Testa se um cursor adulterado retorna 404"""
+        response = self.client.get(reverse('doador-list') + '?cursor=invalido')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LookupAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        Doador.objects.create(nome='Ana Paula', email='ana@email.com')
+        Doador.objects.create(nome='Anabela Souza', telefone='11988887777')
+        Doador.objects.create(nome='Mariana Lima', email='mari@email.com')
+        Recebedor.objects.create(nome='Ana Recebedora', email='rec@email.com')
+
+    def lookup(self, recurso, **params):
+        response = self.client.get(reverse(f'{recurso}-lookup'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [r['nome'] for r in response.data]
+
+    def test_prefixo_do_nome_sem_diferenciar_maiusculas(self):
+        """Testa a busca por prefixo do nome"""
+        self.assertEqual(self.lookup('doador', q='ANA'), ['Ana Paula', 'Anabela Souza', 'Mariana Lima'])
+        self.assertEqual(self.lookup('doador', q='ana', limite=2), ['Ana Paula', 'Anabela Souza'])
+
+    def test_substring_completa_o_resultado(self):
+        """Testa se a busca por substring entra depois dos prefixos"""
+        self.assertEqual(self.lookup('doador', q='lima'), ['Mariana Lima'])
+
+    def test_email_e_telefone(self):
+        """Testa a busca por e-mail e por telefone"""
+        self.assertEqual(self.lookup('doador', q='mari@'), ['Mariana Lima'])
+        self.assertEqual(self.lookup('doador', q='119888'), ['Anabela Souza'])
+
+    def test_telefone_formatado(self):
+        """Testa se a busca por telefone compara só os dígitos do termo e do cadastro"""
+        Doador.objects.create(nome='Bruno Costa', telefone='(11) 915019287')
+        Doador.objects.create(nome='Carla Dias', telefone='+55 11 91501-2222')
+        Recebedor.objects.create(nome='Centro Comunitário', telefone='(11) 3333-4444')
+        self.assertEqual(self.lookup('doador', q='119150'), ['Bruno Costa'])
+        self.assertEqual(self.lookup('doador', q='11 9888'), ['Anabela Souza'])
+        self.assertEqual(self.lookup('doador', q='(11) 98888-7'), ['Anabela Souza'])
+        self.assertEqual(self.lookup('doador', q='55 11 9150'), ['Carla Dias'])
+        self.assertEqual(self.lookup('recebedor', q='113333'), ['Centro Comunitário'])
+
+    def test_lookup_recebedores(self):
+        """Testa o lookup de recebedores"""
+        self.assertEqual(self.lookup('recebedor', q='an'), ['Ana Recebedora'])
+
+    def test_resposta_compacta(self):
+        """Testa se o lookup retorna apenas os campos necessários"""
+        response = self.client.get(reverse('doador-lookup'), {'q': 'ana paula'})
+        self.assertEqual(set(response.data[0]), {'id', 'nome', 'email', 'telefone'})
+
+
+class ExportacaoAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.recebedor = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+        self.item = Item.objects.create(nome='Camiseta', tipo='RO', doador=self.doador)
+        self.doacao_item = Doacao.objects.create(doador=self.doador, recebedor=self.recebedor, item=self.item)
+        self.doacao_dinheiro = Doacao.objects.create(doador=self.doador, valor=Decimal('25.50'))
+        Doacao.objects.filter(pk=self.doacao_item.pk).update(
+            data=timezone.make_aware(datetime(2023, 1, 15, 10, 0))
+        )
+
+    def exportar(self, recurso, **params):
+        response = self.client.get(reverse(f'{recurso}-export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_exporta_doacoes_em_csv(self):
+        """Testa o CSV de doações com os dados relacionados"""
+        response, conteudo = self.exportar('doacao', format='csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="doacoes-', response['Content-Disposition'])
+        linhas = list(csv.DictReader(io.StringIO(conteudo)))
+        self.assertEqual([l['id'] for l in linhas], [str(self.doacao_item.pk), str(self.doacao_dinheiro.pk)])
+        self.assertEqual(linhas[0]['item_tipo'], 'RO')
+        self.assertEqual(linhas[0]['recebedor_nome'], 'Maria Santos')
+        self.assertEqual(linhas[1]['valor'], '25.50')
+
+    def test_exporta_em_ndjson(self):
+        """Testa a exportação em NDJSON, um objeto JSON por linha"""
+        response, conteudo = self.exportar('doador', format='ndjson')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        registros = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual(len(registros), 1)
+        self.assertEqual(registros[0]['email'], 'joao@email.com')
+
+    def test_filtros_de_data_e_tipo(self):
+        """Testa os filtros de intervalo de datas e de tipo"""
+        _, conteudo = self.exportar('doacao', format='ndjson', data_inicio='2023-01-01', data_fim='2023-01-31')
+        self.assertEqual([json.loads(l)['id'] for l in conteudo.splitlines()], [self.doacao_item.pk])
+
+        _, conteudo = self.exportar('doacao', format='ndjson', tipo='dinheiro')
+        self.assertEqual([json.loads(l)['id'] for l in conteudo.splitlines()], [self.doacao_dinheiro.pk])
+
+        _, conteudo = self.exportar('item', format='ndjson', tipo='li')
+        self.assertEqual(conteudo, '')
+
+    def test_data_invalida(self):
+        """Testa se uma data mal formatada retorna 400"""
+        response = self.client.get(reverse('doacao-export'), {'format': 'csv', 'data_inicio': '15/01/2023'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('data_inicio', json.loads(response.content))
+
+
+class LoteAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.recebedor = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+
+    def test_cria_doadores_em_lote(self):
+        """Testa a criação de vários doadores em uma requisição"""
+        response = self.client.post(reverse('doador-bulk'), [
+            {'nome': 'Ana', 'email': 'ana@email.com'},
+            {'nome': 'Bruno', 'telefone': '11999990000'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([d['nome'] for d in response.data], ['Ana', 'Bruno'])
+        self.assertTrue(all(d['id'] for d in response.data))
+        self.assertEqual(Doador.objects.count(), 3)
+        total = ResumoDashboard.objects.get(categoria='TOTAL', chave='doadores')
+        self.assertEqual(total.quantidade, 3)
+
+    def test_lote_invalido_nao_grava_nada(self):
+        """Testa se um elemento inválido cancela o lote e o erro indica a posição"""
+        response = self.client.post(reverse('doacao-bulk'), [
+            {'doador': self.doador.pk, 'valor': '10.00'},
+            {'doador': self.doador.pk},
+            {'doador': 999999, 'valor': '5.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertIn('doador', response.data['errors'][1]['errors'])
+        self.assertEqual(Doacao.objects.count(), 0)
+
+    def test_consultas_nao_crescem_com_o_lote(self):
+        """Testa se a criação em lote usa um número fixo de consultas"""
+        def criar(quantidade):
+            payload = [
+                {'doador': self.doador.pk, 'recebedor': self.recebedor.pk, 'valor': '10.00'}
+                for _ in range(quantidade)
+            ]
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.post(reverse('doacao-bulk'), payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(consultas)
+
+        criar(1)  # cria os contadores do resumo
+        self.assertEqual(criar(3), criar(60))
+        self.assertEqual(Doacao.objects.count(), 64)
+        dinheiro = ResumoDashboard.objects.get(categoria='TOTAL', chave='doacoes_dinheiro')
+        self.assertEqual((dinheiro.quantidade, dinheiro.valor), (64, Decimal('640.00')))
+
+    def test_atualiza_parcialmente_em_lote(self):
+        """Testa a atualização parcial de vários itens"""
+        itens = [Item.objects.create(nome=f'Item {i}', tipo='RO') for i in range(3)]
+        response = self.client.patch(reverse('item-bulk'), [
+            {'id': itens[0].pk, 'nome': 'Casaco', 'tipo': 'RO', 'disponivel': False},
+            {'id': itens[1].pk, 'nome': 'Livro', 'tipo': 'LI'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        itens[0].refresh_from_db()
+        itens[1].refresh_from_db()
+        itens[2].refresh_from_db()
+        self.assertEqual((itens[0].nome, itens[0].disponivel), ('Casaco', False))
+        self.assertEqual(itens[1].tipo, 'LI')
+        self.assertEqual(itens[2].nome, 'Item 2')
+        tipos = dict(ResumoDashboard.objects.filter(categoria='TIPO').values_list('chave', 'quantidade'))
+        self.assertEqual((tipos['RO'], tipos['LI']), (2, 1))
+
+    def test_atualizacao_com_id_inexistente(self):
+        """Testa o erro por elemento quando o id não existe"""
+        response = self.client.patch(reverse('doador-bulk'), [
+            {'id': self.doador.pk, 'nome': 'Outro Nome'},
+            {'id': 999999, 'nome': 'Fantasma'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.doador.refresh_from_db()
+        self.assertEqual(self.doador.nome, 'João Silva')
+
+    def test_exclui_em_lote(self):
+        """Testa a exclusão em lote, com as doações em cascata refletidas no resumo"""
+        outro = Doador.objects.create(nome='Pedro', telefone='11988887777')
+        Doacao.objects.create(doador=outro, valor=Decimal('15.00'))
+        response = self.client.delete(reverse('doador-bulk'), [outro.pk, {'id': self.doador.pk}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertFalse(Doador.objects.exists())
+        totais = dict(ResumoDashboard.objects.filter(categoria='TOTAL').values_list('chave', 'quantidade'))
+        self.assertEqual((totais['doadores'], totais['doacoes']), (0, 0))
+        self.assertFalse(ResumoDashboard.objects.filter(categoria='DOADOR').exists())
+
+    def test_corpo_precisa_ser_lista(self):
+        """Testa se um corpo que não é lista é rejeitado"""
+        response = self.client.post(reverse('doador-bulk'), {'nome': 'Ana'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(IMAGENS_ASSINCRONO=False)
+class FotoItemAPITestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def foto(self, nome='foto.jpg', largura=1200, altura=600):
+        """JPEG com orientação EXIF (girar 90°) e coordenadas GPS."""
+        imagem = Image.new('RGB', (largura, altura), 'red')
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation
+        exif[0x8825] = {1: 'S', 2: (23.0, 33.0, 0.0)}  # GPSInfo
+        buffer = io.BytesIO()
+        imagem.save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile(nome, buffer.getvalue(), content_type='image/jpeg')
+
+    def criar_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('item-list'), {'nome': 'Mesa', 'tipo': 'MO', 'foto': self.foto()}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Item.objects.get(pk=response.data['id'])
+
+    def test_variantes_geradas(self):
+        """Testa se a foto é girada, limpa e reduzida, com as URLs expostas na API"""
+        item = self.criar_item()
+        self.assertEqual(set(item.foto_variantes), {'original', 'thumb', 'medio'})
+
+        with Image.open(item.foto.path) as original:
+            self.assertEqual(original.size, (600, 1200))
+            self.assertEqual(len(original.getexif()), 0)
+        with Image.open(os.path.join(self.media, item.foto_variantes['thumb']['webp'])) as thumb:
+            self.assertEqual(thumb.format, 'WEBP')
+            self.assertEqual(thumb.size, (100, 200))
+        with Image.open(os.path.join(self.media, item.foto_variantes['medio']['jpg'])) as medio:
+            self.assertEqual(medio.size, (400, 800))
+
+        response = self.client.get(reverse('item-detail', args=[item.pk]))
+        self.assertTrue(response.data['foto_variantes']['thumb']['webp'].startswith('http://testserver/media/itens/'))
+
+    def test_original_intacto_se_a_troca_falhar(self):
+        """Testa se uma falha ao gravar a cópia limpa não destrói a foto original"""
+        item = Item.objects.create(nome='Mesa', tipo='MO', foto=self.foto())
+        with open(item.foto.path, 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        with mock.patch('doacoes.imagens.os.replace', side_effect=OSError('disco cheio')):
+            with self.assertRaises(OSError):
+                gerar_variantes(item.foto)
+        with open(item.foto.path, 'rb') as arquivo:
+            self.assertEqual(arquivo.read(), conteudo)
+        self.assertEqual(os.listdir(os.path.dirname(item.foto.path)), [os.path.basename(item.foto.name)])
+
+    def test_foto_truncada_nao_altera_a_resposta(self):
+        """Testa se uma falha no processamento após o commit não vira erro nem duplica o item"""
+        conteudo = self.foto().read()
+        truncada = SimpleUploadedFile('truncada.jpg', conteudo[:len(conteudo) // 2], content_type='image/jpeg')
+        with self.assertLogs('doacoes.imagens', level='ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('item-list'), {'nome': 'Mesa', 'tipo': 'MO', 'foto': truncada}, format='multipart'
+                )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Item.objects.filter(nome='Mesa').count(), 1)
+        self.assertEqual(Item.objects.get(nome='Mesa').foto_variantes, {})
+
+    def test_processamento_registrado_como_robusto(self):
+        """Testa se o processamento após o commit não propaga exceções para o save()"""
+        with self.captureOnCommitCallbacks():
+            item = Item.objects.create(nome='Mesa', tipo='MO', foto=self.foto())
+            processamento = [
+                robusto for _, funcao, robusto in connection.run_on_commit
+                if funcao.__qualname__.startswith('agendar_processamento')
+            ]
+        self.assertEqual(processamento, [True])
+        self.assertTrue(item.pk)
+
+    def test_troca_de_foto_remove_variantes(self):
+        """Testa se as variantes da foto antiga são apagadas quando a foto muda"""
+        item = self.criar_item()
+        antigas = [os.path.join(self.media, c) for f in item.foto_variantes.values() for c in f.values()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('item-detail', args=[item.pk]),
+                {'nome': 'Mesa', 'tipo': 'MO', 'foto': self.foto('nova.jpg')}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(os.path.exists(caminho) for caminho in antigas))
+        item.refresh_from_db()
+        self.assertIn('nova', item.foto_variantes['thumb']['webp'])
+
+    def test_sem_processamento_durante_a_requisicao(self):
+        """Testa se nada é processado antes do commit"""
+        response = self.client.post(
+            reverse('item-list'), {'nome': 'Mesa', 'tipo': 'MO', 'foto': self.foto()}, format='multipart'
+        )
+        self.assertEqual(response.data['foto_variantes'], {})
+
+    @override_settings(IMAGENS_ASSINCRONO=True)
+    def test_processamento_pela_fila(self):
+        """Testa se a foto é processada pelo worker da fila de tarefas"""
+        item = self.criar_item()
+        self.assertEqual(item.foto_variantes, {})
+        self.assertTrue(Tarefa.objects.filter(nome='doacoes.imagens.processar_foto', args=[item.pk]).exists())
+        call_command('executar_tarefas', ate_esvaziar=True, stdout=io.StringIO())
+        item.refresh_from_db()
+        self.assertIn('thumb', item.foto_variantes)
+
+    def test_comando_processar_fotos(self):
+        """Testa se o comando processa as fotos que ficaram sem variantes"""
+        item = self.criar_item()
+        Item.objects.filter(pk=item.pk).update(foto_variantes={})
+        saida = io.StringIO()
+        call_command('processar_fotos', stdout=saida)
+        self.assertIn('1 fotos processadas', saida.getvalue())
+        item.refresh_from_db()
+        self.assertTrue(item.foto_variantes)
+
+
+class CamposAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com', endereco='Rua A, 1')
+        self.recebedor = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+        self.item = Item.objects.create(nome='Camiseta', tipo='RO', doador=self.doador)
+        for _ in range(3):
+            Doacao.objects.create(doador=self.doador, recebedor=self.recebedor, item=self.item)
+
+    def test_fields_reduz_resposta_e_colunas(self):
+        """Testa se ?fields= devolve e consulta só os campos pedidos"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('doador-list'), {'fields': 'id,nome'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': self.doador.pk, 'nome': 'João Silva'}])
+        sql = next(q['sql'] for q in consultas.captured_queries if 'FROM "doacoes_doador"' in q['sql'])
+        self.assertNotIn('"endereco"', sql)
+        self.assertNotIn('"email"', sql)
+
+    def test_fields_no_detalhe(self):
+        """Testa ?fields= no retrieve, incluindo campo calculado"""
+        url = reverse('item-detail', args=[self.item.pk])
+        response = self.client.get(url, {'fields': 'nome,foto_variantes'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'nome': 'Camiseta', 'foto_variantes': {}})
+
+    def test_expand_com_join(self):
+        """Testa se ?expand= embute os objetos relacionados numa única consulta"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('doacao-list'), {'expand': 'doador,recebedor,item'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        doacao = response.data['results'][0]
+        self.assertEqual(doacao['doador']['nome'], 'João Silva')
+        self.assertEqual(doacao['recebedor']['email'], 'maria@email.com')
+        self.assertEqual(doacao['item']['doador'], self.doador.pk)
+        selects = [
+            q['sql'] for q in consultas.captured_queries
+            if 'FROM "doacoes_doacao"' in q['sql'] and not q['sql'].startswith(('SELECT COUNT(', 'SELECT MAX('))
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('JOIN "doacoes_doador"', selects[0])
+        # Só a versão da listagem (ETag) consulta a tabela de itens, pelo índice
+        self.assertFalse(any(
+            'FROM "doacoes_item"' in q['sql'] and not q['sql'].startswith('SELECT MAX(')
+            for q in consultas.captured_queries
+        ))
+
+    def test_fields_com_expand(self):
+        """Testa a combinação de ?fields= e ?expand="""
+        response = self.client.get(reverse('doacao-list'), {'fields': 'id,item', 'expand': 'item'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'item'})
+        self.assertEqual(response.data['results'][0]['item']['nome'], 'Camiseta')
+
+    def test_campo_ou_expansao_invalidos(self):
+        """Testa se campos e expansões desconhecidos são recusados"""
+        response = self.client.get(reverse('doador-list'), {'fields': 'id,senha'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('senha', response.data['error'])
+        response = self.client.get(reverse('doador-list'), {'expand': 'item'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_escrita_ignora_parametros(self):
+        """Testa se ?fields= não afeta a validação nem a resposta das escritas"""
+        response = self.client.post(
+            reverse('doador-list') + '?fields=id',
+            {'nome': 'Ana Souza', 'email': 'ana@email.com'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['nome'], 'Ana Souza')
+
+
+class CondicionalAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.outro = Doador.objects.create(nome='Pedro Alves', email='pedro@email.com')
+        self.item = Item.objects.create(nome='Camiseta', tipo='RO', doador=self.doador)
+        self.url = reverse('doador-detail', args=[self.doador.pk])
+
+    def test_detalhe_com_etag_e_last_modified(self):
+        """Testa o 304 no detalhe com If-None-Match e If-Modified-Since"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(consultas), 1)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.doador.nome = 'João da Silva'
+        self.doador.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depende_da_representacao(self):
+        """Testa se ?fields= gera outro ETag"""
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'fields': 'id,nome'})['ETag'], etag)
+
+    def test_listagem(self):
+        """Testa o 304 na listagem e se uma exclusão muda o ETag"""
+        url = reverse('doador-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.outro.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_listagem_expandida(self):
+        """Testa se o ETag da listagem com ?expand= muda quando um relacionado muda, sem JOIN na versão"""
+        url = reverse('item-list')
+        etag = self.client.get(url, {'expand': 'doador'})['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'expand': 'doador'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(any('JOIN' in q['sql'] for q in consultas.captured_queries))
+
+        self.doador.nome = 'João da Silva'
+        self.doador.save()
+        response = self.client.get(url, {'expand': 'doador'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['doador']['nome'], 'João da Silva')
+
+    def test_item_e_doacao_rastreiam_alteracoes(self):
+        """Testa ultima_atualizacao em Item, inclusive quando o doador é excluído"""
+        url = reverse('item-detail', args=[self.item.pk])
+        etag = self.client.get(url)['ETag']
+        self.doador.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['doador'])
+
+        doacao = Doacao.objects.create(doador=self.outro, valor=Decimal('10.00'))
+        self.assertIsNotNone(doacao.ultima_atualizacao)
+        self.assertIn('ultima_atualizacao', self.client.get(reverse('doacao-detail', args=[doacao.pk])).data)
+
+    def test_if_match_evita_atualizacao_perdida(self):
+        """Testa se PATCH com If-Match desatualizado é recusado com 412"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.patch(self.url, {'nome': 'Primeira edição'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        novo_etag = response['ETag']
+        self.assertNotEqual(novo_etag, etag)
+        self.assertEqual(self.client.get(self.url)['ETag'], novo_etag)
+
+        response = self.client.patch(self.url, {'nome': 'Edição atrasada'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertIn('error', response.data)
+        self.doador.refresh_from_db()
+        self.assertEqual(self.doador.nome, 'Primeira edição')
+
+        response = self.client.put(
+            self.url, {'nome': 'Segunda edição', 'email': 'joao@email.com'}, format='json', HTTP_IF_MATCH=novo_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_match_com_etag_de_outra_representacao(self):
+        """Testa se a ETag lida com ?fields=, ?expand= ou outro formato serve no If-Match"""
+        url = reverse('item-detail', args=[self.item.pk])
+        for parametros in ({'fields': 'id,nome'}, {'expand': 'doador'}, {'format': 'api'}):
+            etag = self.client.get(url, parametros)['ETag']
+            response = self.client.patch(url, {'nome': str(parametros), 'tipo': 'RO'}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, parametros)
+            response = self.client.patch(url, {'nome': 'Atrasada', 'tipo': 'RO'}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED, parametros)
+
+        # Alterar o doador expandido não impede gravar o item
+        etag = self.client.get(url, {'expand': 'doador'})['ETag']
+        self.doador.nome = 'João da Silva'
+        self.doador.save()
+        response = self.client.patch(url, {'nome': 'Camisa', 'tipo': 'RO'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_match_na_exclusao(self):
+        """Testa If-Match no DELETE"""
+        response = self.client.delete(self.url, HTTP_IF_MATCH='"desatualizado"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Doador.objects.filter(pk=self.doador.pk).exists())
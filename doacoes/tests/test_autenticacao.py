@@ -0,0 +1,111 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.models import TokenUser
+from doacoes.acessos import acessos
+from doacoes.autenticacao import JWTStatelessAuthentication
+from doacoes.models import Doador
+from doacoes.viewsets import IsAdminUser, IsGerenteUser
+
+User = get_user_model()
+
+
+class TokenTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='gerente@example.com',
+            password='testpass123',
+            nome_completo='Gerente Teste',
+            role='GERENTE'
+        )
+        self.client = APIClient()
+
+    def obter_tokens(self):
+        response = self.client.post(
+            reverse('token_obtain_pair'), {'email': 'gerente@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_login_nao_grava_durante_a_requisicao(self):
+        """Testa se o endpoint de token só lê o usuário; o acesso é gravado depois, em lote"""
+        with self.assertNumQueries(1):
+            self.obter_tokens()
+        acessos.descarregar()
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.ultimo_acesso)
+        self.assertEqual(self.user.ultimo_acesso, self.user.last_login)
+
+
+@mock.patch.object(APIView, 'authentication_classes', [JWTStatelessAuthentication, SessionAuthentication])
+class JWTStatelessTestCase(TokenTestCase):
+    def autenticar(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_requisicao_nao_consulta_usuario(self):
+        """Testa se a requisição autenticada por JWT não carrega o usuário do banco"""
+        Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.autenticar(self.obter_tokens())
+        # Versão da listagem (ETag) e página; nenhuma consulta ao usuário
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('doador-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_me_carrega_usuario(self):
+        """Testa se /users/me/ ainda retorna os dados completos do usuário"""
+        self.autenticar(self.obter_tokens())
+        response = self.client.get(reverse('user-me'))
+        self.assertEqual(response.data['email'], 'gerente@example.com')
+
+    def test_permissoes_usam_claims(self):
+        """Testa as permissões por função a partir das claims do token"""
+        request = APIRequestFactory().get('/')
+        request.user = JWTStatelessAuthentication().get_user(
+            JWTStatelessAuthentication().get_validated_token(self.obter_tokens()['access'])
+        )
+        self.assertIsInstance(request.user, TokenUser)
+        self.assertTrue(IsGerenteUser().has_permission(request, None))
+        self.assertFalse(IsAdminUser().has_permission(request, None))
+
+    def test_mudanca_de_funcao_revoga_tokens(self):
+        """Testa se alterar a função do usuário invalida os tokens já emitidos"""
+        tokens = self.obter_tokens()
+        self.autenticar(tokens)
+        with mock.patch('doacoes.autenticacao.time.time', return_value=10 ** 10):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.role = 'ADMIN'
+                self.user.save()
+
+        response = self.client.get(reverse('doador-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revogacao_no_mesmo_segundo(self):
+        """Testa se um token emitido no mesmo segundo da revogação também é recusado"""
+        tokens = self.obter_tokens()
+        self.autenticar(tokens)
+        iat = JWTStatelessAuthentication().get_validated_token(tokens['access'])['iat']
+        with mock.patch('doacoes.autenticacao.time.time', return_value=iat + 0.9):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_active = False
+                self.user.save()
+
+        response = self.client.get(reverse('doador-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_nao_revoga_tokens(self):
+        """Testa se gravar apenas o último acesso não revoga os tokens"""
+        self.autenticar(self.obter_tokens())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['last_login'])
+        response = self.client.get(reverse('doador-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,133 @@
+from datetime import date
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Max, Sum
+from django.test import Client, TestCase
+from doacoes import busca, dados_sinteticos
+from doacoes.management.commands.benchmark_views import cenarios, comparar, medir_cenario
+from doacoes.models import Doador, Recebedor, Item, Doacao, ResumoDashboard, ResumoDiario
+from doacoes.resumo import TIPO, TOTAL, TOTAL_DOACOES, TOTAL_DOACOES_DINHEIRO, dia_local
+
+User = get_user_model()
+
+
+def medida(mediana, minimo=None, consultas=4, memoria_kb=100):
+    return {
+        'tempo_ms': {'mediana': mediana, 'p95': mediana, 'minimo': mediana if minimo is None else minimo},
+        'consultas': consultas,
+        'memoria_kb': memoria_kb,
+    }
+
+
+class DadosSinteticosTestCase(TestCase):
+    def limpar(self):
+        for model in (Doacao, Item, Doador, Recebedor):
+            model.objects.all().delete()
+
+    def doacoes(self):
+        return list(Doacao.objects.order_by('data').values_list(
+            'doador__nome', 'recebedor__nome', 'item__nome', 'item__tipo', 'valor', 'data'
+        ))
+
+    def test_geracao_deterministica(self):
+        """Testa se a mesma semente gera os mesmos dados, com resumos e índice de busca prontos"""
+        criados = dados_sinteticos.gerar(300, semente=7)
+        self.assertEqual(criados['doacoes'], Doacao.objects.count())
+        self.assertEqual((Doador.objects.count(), Recebedor.objects.count()), (30, 15))
+        self.assertEqual(Doacao.objects.filter(item__isnull=False).count(), Item.objects.count())
+        self.assertFalse(Doacao.objects.filter(item__isnull=True, valor__isnull=True).exists())
+
+        totais = dict(ResumoDashboard.objects.filter(categoria=TOTAL).values_list('chave', 'valor'))
+        self.assertEqual(
+            ResumoDashboard.objects.get(categoria=TOTAL, chave=TOTAL_DOACOES).quantidade, 300
+        )
+        self.assertEqual(totais[TOTAL_DOACOES_DINHEIRO], Doacao.objects.aggregate(total=Sum('valor'))['total'])
+        nome = Doador.objects.first().nome
+        self.assertTrue(busca.buscar(nome, tipos=['doador']))
+
+        primeira = self.doacoes()
+        self.limpar()
+        dados_sinteticos.gerar(300, semente=7)
+        self.assertEqual(self.doacoes(), primeira)
+        self.limpar()
+        dados_sinteticos.gerar(300, semente=8)
+        self.assertNotEqual(self.doacoes(), primeira)
+
+
+class SeedDataTestCase(TestCase):
+    def test_parametros(self):
+        """Testa as proporções, o período e os tipos de item do comando seed_data"""
+        saida = StringIO()
+        call_command(
+            'seed_data', '400', '--semente', '3', '--proporcao-itens', '1', '--proporcao-com-recebedor', '0',
+            '--doacoes-por-doador', '40', '--dias', '31', '--ate', '2026-01-31', stdout=saida
+        )
+        self.assertIn('Doações: 400', saida.getvalue())
+        self.assertEqual(Doador.objects.count(), 10)
+        self.assertFalse(Doacao.objects.filter(item__isnull=True).exists())
+        self.assertFalse(Doacao.objects.filter(recebedor__isnull=False).exists())
+        self.assertFalse(Item.objects.filter(disponivel=False).exists())
+        self.assertEqual(set(Item.objects.values_list('tipo', flat=True)), {tipo for tipo, _ in Item.TIPO_CHOICES})
+        dias = {dia_local(data) for data in Doacao.objects.values_list('data', flat=True)}
+        self.assertEqual((min(dias), max(dias)), (date(2026, 1, 1), date(2026, 1, 31)))
+        self.assertEqual(
+            ResumoDiario.objects.filter(dimensao=TIPO).aggregate(total=Sum('quantidade'))['total'], 400
+        )
+
+        # Os pks foram reservados à mão: novos registros continuam depois deles
+        maior = Doacao.objects.aggregate(maior=Max('pk'))['maior']
+        doacao = Doacao.objects.create(doador=Doador.objects.first(), valor=1)
+        self.assertGreater(doacao.pk, maior)
+
+    def test_parametros_invalidos(self):
+        """Testa a validação das opções"""
+        for argumentos in (
+            ['0'], ['10', '--proporcao-itens', '2'], ['10', '--concentracao', '0.5'], ['10', '--ate', 'ontem'],
+        ):
+            with self.assertRaises(CommandError):
+                call_command('seed_data', *argumentos, stdout=StringIO())
+
+
+class BenchmarkViewsTestCase(TestCase):
+    def test_cenarios_respondem(self):
+        """Testa se todas as páginas e endpoints do benchmark respondem com sucesso"""
+        dados_sinteticos.gerar(100)
+        user = User.objects.create_user(
+            email='test@example.com', password='testpass123', nome_completo='Test User', role='ADMIN'
+        )
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        ids = {'doador': Doador.objects.first().pk, 'doacao': Doacao.objects.first().pk}
+        total = Doacao.objects.count()
+        for nome, (metodo, url, corpo, preparo) in cenarios(ids).items():
+            with self.subTest(nome):
+                resultado = medir_cenario(client, metodo, url, corpo, preparo, repeticoes=1)
+                self.assertGreater(resultado['consultas'], 0)
+                self.assertGreater(resultado['memoria_kb'], 0)
+        # As escritas do wizard são desfeitas
+        self.assertEqual(Doacao.objects.count(), total)
+
+    def test_comparacao(self):
+        """Testa a detecção de regressões de tempo, consultas e memória em relação à referência"""
+        base = {'resultados': {'1k': {
+            'dashboard': medida(10), 'doacao_list': medida(10), 'api doacoes': medida(0.5),
+        }}}
+        atual = {'resultados': {
+            '1k': {
+                'dashboard': medida(20, consultas=5),
+                # Só a mediana piorou: ruído
+                'doacao_list': medida(20, minimo=10, memoria_kb=400),
+                # Mais que a tolerância, mas abaixo da folga absoluta
+                'api doacoes': medida(1.2),
+                'novo': medida(50),
+            },
+            '1M': {'dashboard': medida(500)},
+        }}
+        self.assertEqual(comparar(base, atual, tolerancia=0.25), [
+            ('1k', 'dashboard', 'tempo_ms', 10, 20),
+            ('1k', 'dashboard', 'consultas', 4, 5),
+            ('1k', 'doacao_list', 'memoria_kb', 100, 400),
+        ])
+        self.assertEqual(comparar(base, base, tolerancia=0.25), [])
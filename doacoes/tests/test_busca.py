@@ -0,0 +1,107 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from doacoes import busca
+from doacoes.models import Doador, Recebedor, Item
+
+User = get_user_model()
+
+
+class BuscaAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.joao = Doador.objects.create(
+            nome='João Conceição', email='joao@email.com', telefone='(11) 98765-4321'
+        )
+        self.maria = Recebedor.objects.create(
+            nome='Maria Silva', email='maria@email.com', endereco='Rua São João, 10'
+        )
+        self.item = Item.objects.create(nome='Cadeira de madeira', tipo='MO', descricao='Usada, em bom estado')
+
+    def buscar(self, q, **params):
+        response = self.client.get(reverse('busca_api'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(r['tipo'], r['id']) for r in response.data['results']]
+
+    def test_sem_acentos_e_por_prefixo(self):
+        """Testa a busca sem acentos, sem diferenciar maiúsculas e por prefixo"""
+        self.assertEqual(self.buscar('joao conceicao'), [('doador', self.joao.pk)])
+        self.assertEqual(self.buscar('CONCEIÇÃO'), [('doador', self.joao.pk)])
+        self.assertEqual(self.buscar('mari'), [('recebedor', self.maria.pk)])
+        self.assertEqual(self.buscar('cadeira madeira'), [('item', self.item.pk)])
+
+    def test_email_e_telefone(self):
+        """Testa a busca pelo email e pelo telefone com ou sem pontuação"""
+        self.assertEqual(self.buscar('joao@email.com')[0], ('doador', self.joao.pk))
+        self.assertEqual(self.buscar('11987654321'), [('doador', self.joao.pk)])
+        self.assertEqual(self.buscar('98765-4321'), [('doador', self.joao.pk)])
+
+    def test_nome_pesa_mais(self):
+        """Testa se o registro com o termo no nome vem antes do que o tem só no endereço"""
+        self.assertEqual(self.buscar('joao'), [('doador', self.joao.pk), ('recebedor', self.maria.pk)])
+
+    def test_filtro_por_tipo(self):
+        """Testa o filtro ?tipo="""
+        self.assertEqual(self.buscar('joao', tipo='recebedor'), [('recebedor', self.maria.pk)])
+        response = self.client.get(reverse('busca_api'), {'q': 'joao', 'tipo': 'usuario'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resultado(self):
+        """Testa os campos de cada resultado"""
+        response = self.client.get(reverse('busca_api'), {'q': 'cadeira'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0], {
+            'tipo': 'item',
+            'id': self.item.pk,
+            'nome': 'Cadeira de madeira',
+            'detalhe': 'Móveis',
+            'url': f'http://testserver/api/itens/{self.item.pk}/',
+        })
+
+    def test_termo_obrigatorio(self):
+        """Testa se a busca sem termos é recusada"""
+        response = self.client.get(reverse('busca_api'), {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.buscar('!!!'), [])
+
+    def test_indice_acompanha_alteracoes(self):
+        """Testa se o índice é atualizado ao editar e ao excluir"""
+        self.joao.nome = 'Pedro Alves'
+        self.joao.save()
+        self.assertEqual(self.buscar('conceicao'), [])
+        self.assertEqual(self.buscar('pedro'), [('doador', self.joao.pk)])
+
+        self.item.delete()
+        self.assertEqual(self.buscar('cadeira'), [])
+
+    def test_indexacao_em_lote(self):
+        """Testa se os registros criados pela API em lote entram no índice"""
+        response = self.client.post(
+            reverse('doador-bulk'), [{'nome': 'Ana Beatriz', 'email': 'ana@email.com'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.buscar('beatriz'), [('doador', response.data[0]['id'])])
+
+    def test_reconstruir(self):
+        """Testa se o comando refaz o índice a partir das tabelas"""
+        if busca.backend(connection).coluna_chave:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {busca.TABELA}')
+        self.assertEqual(self.buscar('maria'), [])
+
+        saida = StringIO()
+        call_command('reconstruir_busca', stdout=saida)
+        self.assertIn('3 registros', saida.getvalue())
+        self.assertEqual(self.buscar('maria'), [('recebedor', self.maria.pk)])
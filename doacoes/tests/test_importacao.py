@@ -0,0 +1,132 @@
+import csv
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.test import TestCase
+from django.core.management import call_command
+from django.utils import timezone
+from doacoes.models import Doador, Recebedor, Item, Doacao, ResumoDashboard
+
+
+class ImportCsvTests(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+
+    def escrever_csv(self, nome, linhas):
+        caminho = os.path.join(self.diretorio.name, nome)
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=list(linhas[0]))
+            escritor.writeheader()
+            escritor.writerows(linhas)
+        return caminho
+
+    def importar(self, modelo, caminho, *args):
+        saida = StringIO()
+        call_command('import_csv', modelo, caminho, *args, stdout=saida)
+        return saida.getvalue()
+
+    def ler_rejeitados(self, caminho):
+        with open(f'{caminho}.rejeitados.csv', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def test_importa_doadores_reaproveitando_existentes(self):
+        """Testa se doadores já cadastrados são reconhecidos pelas chaves naturais"""
+        Doador.objects.create(nome='João Silva', email='joao@email.com', telefone='11999999999')
+        caminho = self.escrever_csv('doadores.csv', [
+            {'nome': 'João S.', 'email': 'joao@email.com', 'telefone': '11999999999', 'endereco': ''},
+            {'nome': 'Maria', 'email': 'maria@email.com', 'telefone': '', 'endereco': 'Rua A, 1'},
+            {'nome': 'Maria', 'email': '', 'telefone': '11888888888', 'endereco': 'Rua A, 1'},
+            {'nome': 'Sem Contato', 'email': '', 'telefone': '', 'endereco': ''},
+        ])
+        saida = self.importar('doadores', caminho, '--lote', '2')
+
+        self.assertEqual(Doador.objects.count(), 2)
+        self.assertIn('linhas/s', saida)
+        rejeitados = self.ler_rejeitados(caminho)
+        self.assertEqual([r['nome'] for r in rejeitados], ['Sem Contato'])
+        self.assertIn('contato', rejeitados[0]['erro'])
+
+    def test_importa_doacoes_criando_pessoas_e_itens(self):
+        """Testa a importação de doações em dinheiro e em itens com datas históricas"""
+        recebedor = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+        caminho = self.escrever_csv('doacoes.csv', [
+            {
+                'doador_nome': 'Pedro', 'doador_email': 'pedro@email.com', 'doador_telefone': '1190000',
+                'recebedor_id': '', 'valor': '1.234,50', 'item_nome': '', 'item_tipo': '',
+                'data': '2023-05-10T12:00:00',
+            },
+            {
+                'doador_nome': 'Pedro', 'doador_email': 'pedro@email.com', 'doador_telefone': '1190000',
+                'recebedor_id': str(recebedor.pk), 'valor': '', 'item_nome': 'Cobertor', 'item_tipo': 'cb',
+                'data': '2023-06-01',
+            },
+            {
+                'doador_nome': 'Pedro', 'doador_email': 'pedro@email.com', 'doador_telefone': '1190000',
+                'recebedor_id': '999999', 'valor': '10', 'item_nome': '', 'item_tipo': '', 'data': '',
+            },
+            {
+                'doador_nome': 'Pedro', 'doador_email': 'pedro@email.com', 'doador_telefone': '1190000',
+                'recebedor_id': '', 'valor': '-5', 'item_nome': '', 'item_tipo': '', 'data': '',
+            },
+        ])
+        self.importar('doacoes', caminho)
+
+        self.assertEqual(Doador.objects.count(), 1)
+        self.assertEqual(Doacao.objects.count(), 2)
+        dinheiro = Doacao.objects.get(valor__isnull=False)
+        self.assertEqual(dinheiro.valor, Decimal('1234.50'))
+        self.assertEqual(dinheiro.data.year, 2023)
+        item = Item.objects.get()
+        self.assertEqual(item.tipo, 'CB')
+        self.assertFalse(item.disponivel)
+        self.assertEqual(item.doador, dinheiro.doador)
+
+        rejeitados = sorted(self.ler_rejeitados(caminho), key=lambda r: int(r['linha']))
+        erros = [r['erro'] for r in rejeitados]
+        self.assertEqual(len(erros), 2)
+        self.assertIn('não encontrado', erros[0])
+        self.assertIn('maior que zero', erros[1])
+
+        # O resumo do dashboard é reconstruído ao final
+        total = ResumoDashboard.objects.get(categoria='TOTAL', chave='doacoes')
+        self.assertEqual(total.quantidade, 2)
+
+    def test_datas_historicas_sem_alterar_o_modelo(self):
+        """Testa se as datas do arquivo são gravadas sem desligar o auto_now dos campos do modelo"""
+        doador = Doador.objects.create(nome='Ana', email='ana@email.com')
+        caminho = self.escrever_csv('doacoes.csv', [
+            {'doador_id': str(doador.pk), 'valor': '10', 'data': '2023-05-10T12:00:00'},
+            {'doador_id': str(doador.pk), 'valor': '20', 'data': ''},
+        ])
+        campos = [Doacao._meta.get_field('data'), Doacao._meta.get_field('ultima_atualizacao')]
+        gerenciador = type(Doacao.objects)
+        original = gerenciador.bulk_create
+        durante = []
+
+        def bulk_create(manager, objs, *args, **kwargs):
+            # O que uma gravação de outra requisição do processo receberia
+            durante.extend(campo.pre_save(Doacao(), add=True) for campo in campos)
+            return original(manager, objs, *args, **kwargs)
+
+        with mock.patch.object(gerenciador, 'bulk_create', bulk_create):
+            self.importar('doacoes', caminho)
+
+        self.assertTrue(durante)
+        self.assertNotIn(None, durante)
+        self.assertEqual(
+            sorted(data.year for data in Doacao.objects.values_list('data', flat=True)),
+            [2023, timezone.now().year],
+        )
+
+    def test_importa_itens(self):
+        """Testa a importação de itens com tipo inválido rejeitado"""
+        caminho = self.escrever_csv('itens.csv', [
+            {'nome': 'Livro', 'tipo': 'LI', 'descricao': '', 'disponivel': 'sim', 'doador_id': ''},
+            {'nome': 'Coisa', 'tipo': 'XX', 'descricao': '', 'disponivel': '', 'doador_id': ''},
+        ])
+        self.importar('itens', caminho)
+        self.assertEqual(list(Item.objects.values_list('nome', flat=True)), ['Livro'])
+        self.assertEqual(len(self.ler_rejeitados(caminho)), 1)
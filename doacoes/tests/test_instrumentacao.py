@@ -0,0 +1,87 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from doacoes.instrumentacao import Medicao, medicao_atual, medir
+from doacoes.models import Doador, Doacao
+
+User = get_user_model()
+
+
+class InstrumentacaoMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User',
+            role='ADMIN'
+        )
+        doador = Doador.objects.create(nome='Doador Teste', email='doador@example.com')
+        Doacao.objects.create(doador=doador, valor=10)
+
+    def get(self, url):
+        client = Client()
+        client.force_login(self.user)
+        return client.get(url)
+
+    def metricas(self, response):
+        metricas = {}
+        for metrica in response['Server-Timing'].split(', '):
+            nome, *partes = metrica.split(';')
+            metricas[nome] = dict(parte.split('=', 1) for parte in partes)
+        return metricas
+
+    def test_server_timing_pagina(self):
+        """Testa se a página HTML traz o tempo total, do banco e dos templates"""
+        response = self.get(reverse('doacao_list'))
+        self.assertEqual(response.status_code, 200)
+        metricas = self.metricas(response)
+        self.assertEqual(set(metricas), {'total', 'banco', 'template'})
+        self.assertGreater(float(metricas['total']['dur']), 0)
+        self.assertRegex(metricas['banco']['desc'], r'^"[1-9]\d* consultas"$')
+
+    def test_server_timing_api(self):
+        """Testa se a listagem da API traz o tempo de serialização"""
+        response = self.get('/api/doacoes/')
+        self.assertEqual(response.status_code, 200)
+        metricas = self.metricas(response)
+        self.assertIn('serializacao', metricas)
+        self.assertNotIn('template', metricas)
+
+    @override_settings(REQUISICAO_LENTA_MS=0)
+    def test_log_requisicao_lenta(self):
+        """Testa se a requisição acima do limite vira um WARNING com as medidas em JSON"""
+        with self.assertLogs('doacoes.requisicoes', 'WARNING') as logs:
+            self.get('/api/doacoes/')
+        dados = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(logs.records[-1].requisicao, dados)
+        self.assertEqual(dados['metodo'], 'GET')
+        self.assertEqual(dados['rota'], 'doacao-list')
+        self.assertEqual(dados['status'], 200)
+        self.assertTrue(dados['lenta'])
+        self.assertGreater(dados['consultas'], 0)
+        self.assertIn('serializacao_ms', dados)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_sem_server_timing(self):
+        """Testa se o cabeçalho pode ser desligado"""
+        response = self.get(reverse('doacao_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_fora_de_requisicao(self):
+        """Testa se nada é medido fora de uma requisição e se blocos aninhados contam uma vez"""
+        self.assertIsNone(medicao_atual())
+        with medir('template'):
+            pass
+
+        medicao = Medicao()
+        token = medicao.ativar()
+        try:
+            with medir('serializacao'):
+                with medir('serializacao'):
+                    self.assertEqual(medicao.abertas, {'serializacao'})
+                self.assertEqual(medicao.tempos['serializacao'], 0)
+            self.assertGreater(medicao.tempos['serializacao'], 0)
+        finally:
+            Medicao.desativar(token)
+        self.assertIsNone(medicao_atual())
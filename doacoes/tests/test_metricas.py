@@ -0,0 +1,148 @@
+import os
+import tempfile
+from decimal import Decimal
+from unittest import skipUnless
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from doacoes import metricas
+from doacoes.models import Doador, Doacao, Item
+
+User = get_user_model()
+
+
+def valor(nome, *rotulos, parte=''):
+    return metricas.coletar().get(nome, {}).get(tuple(rotulos), {}).get(parte, 0.0)
+
+
+def observacoes(rota, metodo):
+    # Cada faixa guarda só as suas observações
+    partes = metricas.coletar().get('doacoes_http_requisicao_duracao_segundos', {}).get((rota, metodo), {})
+    return sum(valor for parte, valor in partes.items() if parte != 'soma')
+
+
+class MetricasViewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='testpass123', nome_completo='Admin User', role='ADMIN'
+        )
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123', nome_completo='Test User'
+        )
+        self.client = Client()
+
+    def test_acesso_protegido(self):
+        """Testa se /metrics só responde ao token do coletor ou a administradores"""
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metricas.CONTENT_TYPE)
+
+        with override_settings(METRICAS_TOKEN='segredo'):
+            client = Client()
+            self.assertEqual(client.get(url, HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+            self.assertEqual(client.get(url, HTTP_AUTHORIZATION='Bearer errado').status_code, 401)
+
+    def test_requisicoes_por_rota(self):
+        """Testa a contagem e a duração das requisições por nome de rota, método e status"""
+        self.client.force_login(self.user)
+        antes = valor('doacoes_http_requisicoes_total', 'doacao_list', 'GET', '200')
+        observadas = observacoes('doacao_list', 'GET')
+        self.client.get(reverse('doacao_list'))
+        self.client.get(reverse('doacao_list'))
+        self.assertEqual(valor('doacoes_http_requisicoes_total', 'doacao_list', 'GET', '200'), antes + 2)
+        self.assertEqual(observacoes('doacao_list', 'GET'), observadas + 2)
+
+        # URLs que não existem não criam uma série por caminho
+        antes = valor('doacoes_http_requisicoes_total', metricas.ROTA_NAO_ENCONTRADA, 'GET', '404')
+        self.client.get('/nao-existe/123/')
+        self.assertEqual(
+            valor('doacoes_http_requisicoes_total', metricas.ROTA_NAO_ENCONTRADA, 'GET', '404'), antes + 1
+        )
+
+        self.client.force_login(self.admin)
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('# TYPE doacoes_http_requisicao_duracao_segundos histogram', texto)
+        self.assertIn('doacoes_http_requisicoes_total{rota="doacao_list",metodo="GET",status="200"}', texto)
+
+    def test_doacoes_criadas(self):
+        """Testa se as doações criadas são contadas por tipo depois do commit"""
+        doador = Doador.objects.create(nome='Doador Teste', email='doador@example.com')
+        dinheiro = valor('doacoes_criadas_total', 'dinheiro')
+        itens = valor('doacoes_criadas_total', 'item')
+        reais = valor('doacoes_valor_doado_reais_total')
+        with self.captureOnCommitCallbacks(execute=True):
+            Doacao.objects.create(doador=doador, valor=Decimal('12.50'))
+            item = Item.objects.create(nome='Livro', tipo='LI', descricao='Livro infantil', doador=doador)
+            Doacao.objects.create(doador=doador, item=item)
+        self.assertEqual(valor('doacoes_criadas_total', 'dinheiro'), dinheiro + 1)
+        self.assertEqual(valor('doacoes_criadas_total', 'item'), itens + 1)
+        self.assertEqual(valor('doacoes_valor_doado_reais_total'), reais + 12.5)
+
+
+class MetricasRegistroTests(TestCase):
+    def test_histograma(self):
+        """Testa as faixas acumuladas, a soma e a contagem na exposição"""
+        serie = metricas.DURACAO_REQUISICOES.rotular('teste_histograma', 'GET')
+        for duracao in (0.003, 0.04, 0.04, 20):
+            serie.observar(duracao)
+        linhas = {
+            linha.rsplit(' ', 1)[0]: float(linha.rsplit(' ', 1)[1])
+            for linha in metricas.exposicao().splitlines() if 'teste_histograma' in linha
+        }
+        prefixo = 'doacoes_http_requisicao_duracao_segundos'
+        rotulos = 'rota="teste_histograma",metodo="GET"'
+        self.assertEqual(linhas[f'{prefixo}_bucket{{{rotulos},le="0.005"}}'], 1)
+        self.assertEqual(linhas[f'{prefixo}_bucket{{{rotulos},le="0.05"}}'], 3)
+        self.assertEqual(linhas[f'{prefixo}_bucket{{{rotulos},le="10.0"}}'], 3)
+        self.assertEqual(linhas[f'{prefixo}_bucket{{{rotulos},le="+Inf"}}'], 4)
+        self.assertEqual(linhas[f'{prefixo}_count{{{rotulos}}}'], 4)
+        self.assertAlmostEqual(linhas[f'{prefixo}_sum{{{rotulos}}}'], 20.083)
+
+    def test_rotulos_invalidos(self):
+        """Testa se a quantidade de rótulos é validada"""
+        with self.assertRaises(ValueError):
+            metricas.REQUISICOES.rotular('dashboard', 'GET')
+
+    def test_arquivo_cresce_e_reabre(self):
+        """Testa o crescimento do mapa e a retomada de um arquivo existente (pid reaproveitado)"""
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'metricas_1.db')
+            mapa = metricas.MapaValores(caminho)
+            for i in range(5000):
+                mapa.somar(f'["teste", ["{i}"], ""]', i)
+            mapa.fechar()
+            self.assertGreater(os.path.getsize(caminho), metricas.TAMANHO_INICIAL)
+
+            mapa = metricas.MapaValores(caminho)
+            mapa.somar('["teste", ["4999"], ""]', 1)
+            valores = {chave: valor for chave, _, valor in metricas._entradas(mapa.mapa)}
+            mapa.fechar()
+            self.assertEqual(len(valores), 5000)
+            self.assertEqual(valores['["teste", ["4999"], ""]'], 5000)
+
+    @skipUnless(hasattr(os, 'fork'), 'Requer fork()')
+    def test_soma_entre_processos(self):
+        """Testa se /metrics soma os valores gravados por vários processos em METRICAS_DIR"""
+        with tempfile.TemporaryDirectory() as pasta, override_settings(METRICAS_DIR=pasta):
+            serie = metricas.REQUISICOES.rotular('teste_processos', 'GET', '200')
+            serie.incrementar()
+            filhos = []
+            for _ in range(3):
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        for _ in range(100):
+                            serie.incrementar()
+                    finally:
+                        os._exit(0)
+                filhos.append(pid)
+            for pid in filhos:
+                os.waitpid(pid, 0)
+
+            self.assertEqual(len(os.listdir(pasta)), 4)
+            self.assertEqual(valor('doacoes_http_requisicoes_total', 'teste_processos', 'GET', '200'), 301)
@@ -0,0 +1,149 @@
+import json
+import os
+import pstats
+import re
+import shutil
+import tempfile
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from doacoes import perfil
+from doacoes.models import Doador, Doacao
+
+User = get_user_model()
+
+
+def ler(response):
+    return b''.join(response.streaming_content)
+
+
+class PerfilTests(TestCase):
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+        ajuste = override_settings(PERFIS_DIR=self.pasta)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='testpass123', nome_completo='Admin User', role='ADMIN'
+        )
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123', nome_completo='Test User'
+        )
+        for i in range(3):
+            doador = Doador.objects.create(nome=f'Doador {i}', email=f'doador{i}@example.com')
+            Doacao.objects.create(doador=doador, valor=10 + i)
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def perfilar(self, modo, url=None):
+        response = self.client.get(url or reverse('doacao_list'), {'_profile': modo})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Perfil', response)
+        indice = self.client.get(response['X-Perfil'])
+        self.assertEqual(indice.status_code, 200)
+        return indice.json()['arquivos']
+
+    def test_modo_sql(self):
+        """Testa se o modo sql grava as consultas com duração e a linha do projeto que as disparou"""
+        arquivos = self.perfilar('sql')
+        self.assertEqual(list(arquivos), ['consultas.json'])
+        resumo = json.loads(ler(self.client.get(arquivos['consultas.json'])))
+        self.assertEqual(resumo['rota'], 'doacao_list')
+        self.assertEqual(resumo['usuario'], 'admin@example.com')
+        self.assertEqual(resumo['total_consultas'], len(resumo['consultas']))
+        self.assertGreater(resumo['total_consultas'], 0)
+        for consulta in resumo['consultas']:
+            self.assertIn('ms', consulta)
+            self.assertTrue(consulta['sql'])
+        origens = [consulta['origem'] for consulta in resumo['consultas'] if consulta['origem']]
+        self.assertTrue(any(origem.startswith(os.path.join('doacoes', 'views.py')) for origem in origens), origens)
+        self.assertFalse(any('instrumentacao.py' in origem or 'perfil.py' in origem for origem in origens))
+
+    def test_modo_cpu(self):
+        """Testa se o modo cpu grava o pstats, o relatório e as pilhas colapsadas"""
+        arquivos = self.perfilar('cpu')
+        self.assertEqual(set(arquivos), set(perfil.ARQUIVOS))
+
+        response = self.client.get(arquivos['perfil.pstats'])
+        self.assertIn('attachment', response['Content-Disposition'])
+        caminho = os.path.join(self.pasta, 'perfil.pstats')
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(ler(response))
+        funcoes = {nome for _, _, nome in pstats.Stats(caminho).stats}
+        self.assertIn('doacao_list', funcoes)
+
+        self.assertIn(b'cumulative', ler(self.client.get(arquivos['perfil.txt'])))
+        for linha in ler(self.client.get(arquivos['perfil.folded'])).decode().splitlines():
+            self.assertRegex(linha, r'^[^;\s][^\n]* \d+$')
+
+    def test_amostrador(self):
+        """Testa se o amostrador soma o tempo das pilhas abaixo do quadro raiz"""
+        def raiz():
+            return trabalho()
+
+        def trabalho():
+            time.sleep(0.05)
+
+        amostrador = perfil.Amostrador(threading.get_ident(), raiz.__code__)
+        amostrador.start()
+        try:
+            raiz()
+        finally:
+            amostrador.parar()
+        linhas = amostrador.colapsadas()
+        self.assertTrue(linhas)
+        pilha, microssegundos = max((linha.rsplit(' ', 1) for linha in linhas), key=lambda par: int(par[1]))
+        self.assertTrue(pilha.startswith('trabalho ('), pilha)
+        self.assertNotIn('raiz', pilha)
+        self.assertGreater(int(microssegundos), 20000)
+
+    def test_somente_administradores(self):
+        """Testa se o parâmetro é ignorado para quem não é administrador"""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('doacao_list'), {'_profile': 'cpu'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfil', response)
+        self.assertEqual(os.listdir(self.pasta), [])
+
+        # Nem os arquivos de um perfil existente
+        indice = self.perfilar('sql')
+        self.assertEqual(client.get(indice['consultas.json']).status_code, 302)
+
+    def test_modo_invalido_e_perfil_inexistente(self):
+        """Testa o modo desconhecido e os nomes de perfil e arquivo inexistentes"""
+        response = self.client.get(reverse('doacao_list'), {'_profile': 'memoria'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+        self.assertEqual(self.client.get(reverse('perfil', args=['nao-existe'])).status_code, 404)
+        nome = re.search(r'/perfis/([^/]+)/', list(self.perfilar('sql').values())[0]).group(1)
+        self.assertEqual(
+            self.client.get(reverse('perfil_arquivo', args=[nome, 'perfil.pstats'])).status_code, 404
+        )
+
+    @override_settings(PERFIS_MAXIMO=2)
+    def test_guarda_os_mais_recentes(self):
+        """Testa se só os PERFIS_MAXIMO perfis mais recentes são mantidos"""
+        for _ in range(3):
+            self.perfilar('sql')
+        self.assertEqual(len(os.listdir(self.pasta)), 2)
+
+    def test_falha_ao_gravar_devolve_a_resposta(self):
+        """Testa se um PERFIS_DIR sem escrita não transforma a requisição perfilada em erro"""
+        arquivo = os.path.join(self.pasta, 'arquivo')
+        open(arquivo, 'w').close()
+        with override_settings(PERFIS_DIR=os.path.join(arquivo, 'perfis')), \
+                self.assertLogs('doacoes.perfil', 'ERROR'):
+            response = self.client.post(
+                reverse('doador-list') + '?_profile=sql',
+                {'nome': 'Doador Perfilado', 'email': 'perfilado@example.com'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('X-Perfil', response)
+        self.assertIn('X-Perfil-Erro', response)
+        self.assertTrue(Doador.objects.filter(nome='Doador Perfilado').exists())
@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from doacoes.models import Doador, Recebedor, Item, Doacao
+from doacoes.resumo import reconstruir_resumo
+
+User = get_user_model()
+
+
+class NumeroDeConsultasTestCase(TestCase):
+    """
+    Fixa o número de consultas SQL por view.
+
+    O mesmo número deve valer com 10 e com 1000 registros; se alguma view
+    voltar a acessar relacionamentos linha a linha (N+1), estes testes falham.
+    """
+
+    # view -> consultas esperadas (sessão e usuário incluídos nas views HTML)
+    CONSULTAS_HTML = {
+        'dashboard': 10,
+        'doador_list': 4,
+        'recebedor_list': 4,
+        'item_list': 6,
+        'doacao_list': 4,
+    }
+    # API: versão da listagem (ETag: contagem e maior timestamp) + página
+    CONSULTAS_API = {
+        'doador-list': 3,
+        'recebedor-list': 3,
+        'item-list': 3,
+        'doacao-list': 3,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.user)
+
+    def popular(self, quantidade):
+        doadores = Doador.objects.bulk_create([
+            Doador(nome=f'Doador {i}', email=f'doador{i}@email.com') for i in range(quantidade)
+        ])
+        recebedores = Recebedor.objects.bulk_create([
+            Recebedor(nome=f'Recebedor {i}', telefone=f'1190000{i:04d}') for i in range(quantidade)
+        ])
+        itens = Item.objects.bulk_create([
+            Item(nome=f'Item {i}', tipo='RO', doador=doadores[i]) for i in range(quantidade)
+        ])
+        doacoes = []
+        for i in range(quantidade):
+            if i % 2:
+                doacoes.append(Doacao(doador=doadores[i], recebedor=recebedores[i], item=itens[i]))
+            else:
+                doacoes.append(Doacao(doador=doadores[i], recebedor=recebedores[i], valor=Decimal('10.00')))
+        Doacao.objects.bulk_create(doacoes)
+        reconstruir_resumo()
+        return doacoes
+
+    def assertConsultasFixas(self, quantidade):
+        doacoes = self.popular(quantidade)
+        for nome, esperado in self.CONSULTAS_HTML.items():
+            with self.subTest(view=nome, registros=quantidade):
+                with self.assertNumQueries(esperado):
+                    response = self.client.get(reverse(nome))
+                self.assertEqual(response.status_code, 200)
+
+        for nome, esperado in self.CONSULTAS_API.items():
+            with self.subTest(view=nome, registros=quantidade):
+                with self.assertNumQueries(esperado):
+                    response = self.api_client.get(reverse(nome))
+                self.assertEqual(response.status_code, 200)
+
+        with self.subTest(view='doacao_detail', registros=quantidade):
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('doacao_detail', args=[doacoes[1].pk]))
+            self.assertEqual(response.status_code, 200)
+
+    def test_consultas_com_10_registros(self):
+        self.assertConsultasFixas(10)
+
+    def test_consultas_com_1000_registros(self):
+        self.assertConsultasFixas(1000)
@@ -0,0 +1,153 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from doacoes.models import Doador, Recebedor, Item, Doacao, ResumoDiario
+
+User = get_user_model()
+
+
+def em(ano, mes, dia):
+    return mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(datetime(ano, mes, dia, 12)))
+
+
+class SerieAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.joao = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.ana = Doador.objects.create(nome='Ana Souza', email='ana@email.com')
+        self.maria = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+        self.camiseta = Item.objects.create(nome='Camiseta', tipo='RO', doador=self.joao)
+        self.livro = Item.objects.create(nome='Livro', tipo='LI', doador=self.ana)
+
+        with em(2026, 1, 5):
+            Doacao.objects.create(doador=self.joao, valor=Decimal('0.10'))
+            Doacao.objects.create(doador=self.joao, valor=Decimal('0.20'), recebedor=self.maria)
+        with em(2026, 1, 20):
+            Doacao.objects.create(doador=self.ana, item=self.camiseta, recebedor=self.maria)
+        with em(2026, 3, 2):
+            self.doacao_livro = Doacao.objects.create(doador=self.ana, item=self.livro)
+            Doacao.objects.create(doador=self.joao, valor=Decimal('99999999.99'))
+
+    def serie(self, **params):
+        response = self.client.get(reverse('relatorio_serie_api'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def pontos(self, serie):
+        return [(p['inicio'], p['quantidade'], p['valor']) for p in serie['pontos']]
+
+    def test_serie_mensal_com_valores_exatos(self):
+        """Testa a série por mês, com meses vazios zerados e valores exatos"""
+        dados = self.serie(periodo='mes', de='2026-01-15', ate='2026-03-31')
+        self.assertEqual(dados['de'], date(2026, 1, 1))
+        total, = dados['series']
+        self.assertEqual(self.pontos(total), [
+            (date(2026, 1, 1), 3, '0.30'),
+            (date(2026, 2, 1), 0, '0.00'),
+            (date(2026, 3, 1), 2, '99999999.99'),
+        ])
+        self.assertEqual(total['valor'], '100000000.29')
+
+    def test_serie_semanal_e_diaria(self):
+        """Testa os períodos por semana (a partir de segunda-feira) e por dia"""
+        semanas = self.serie(periodo='semana', de='2026-01-01', ate='2026-01-25')['series'][0]
+        self.assertEqual(
+            [(p['inicio'], p['quantidade']) for p in semanas['pontos'] if p['quantidade']],
+            [(date(2026, 1, 5), 2), (date(2026, 1, 19), 1)]
+        )
+        dias = self.serie(periodo='dia', de='2026-01-05', ate='2026-01-06')['series'][0]
+        self.assertEqual(self.pontos(dias), [
+            (date(2026, 1, 5), 2, '0.30'), (date(2026, 1, 6), 0, '0.00')
+        ])
+
+    def test_divisao_por_tipo_doador_e_recebedor(self):
+        """Testa as séries por tipo de item (dinheiro à parte), doador e recebedor"""
+        intervalo = {'de': '2026-01-01', 'ate': '2026-03-31'}
+        por_tipo = {s['chave']: (s['nome'], s['quantidade']) for s in self.serie(por='tipo', **intervalo)['series']}
+        self.assertEqual(por_tipo, {None: ('Dinheiro', 3), 'RO': ('Roupas', 1), 'LI': ('Livros', 1)})
+
+        por_doador = self.serie(por='doador', **intervalo)['series']
+        self.assertEqual([(s['chave'], s['nome'], s['quantidade']) for s in por_doador], [
+            (self.joao.pk, 'João Silva', 3), (self.ana.pk, 'Ana Souza', 2)
+        ])
+        self.assertEqual(len(self.serie(por='doador', limite=1, **intervalo)['series']), 1)
+        escolhidas = self.serie(por='tipo', chaves='dinheiro,li', **intervalo)['series']
+        self.assertEqual([(s['chave'], s['quantidade']) for s in escolhidas], [(None, 3), ('LI', 1)])
+
+        por_recebedor, = self.serie(por='recebedor', **intervalo)['series']
+        self.assertEqual((por_recebedor['quantidade'], por_recebedor['valor']), (2, '0.20'))
+
+    def test_resumo_acompanha_alteracoes(self):
+        """Testa a manutenção incremental ao alterar e excluir doações, itens e doadores"""
+        intervalo = {'por': 'tipo', 'de': '2026-03-01', 'ate': '2026-03-31'}
+        self.livro.tipo = 'BR'
+        self.livro.save()
+        por_tipo = {s['chave']: s['quantidade'] for s in self.serie(**intervalo)['series']}
+        self.assertEqual(por_tipo, {None: 1, 'BR': 1})
+
+        self.doacao_livro.item = None
+        self.doacao_livro.valor = Decimal('5.00')
+        self.doacao_livro.save()
+        por_tipo = {s['chave']: (s['quantidade'], s['valor']) for s in self.serie(**intervalo)['series']}
+        self.assertEqual(por_tipo, {None: (2, '100000004.99')})
+
+        self.ana.delete()
+        self.assertFalse(ResumoDiario.objects.filter(dimensao='DOADOR', chave=str(self.ana.pk)).exists())
+        total = self.serie(de='2026-01-01', ate='2026-03-31')['series'][0]
+        self.assertEqual(total['quantidade'], 3)
+
+    def test_exclusao_em_lote_de_itens(self):
+        """Testa se a exclusão em lote de itens tira as doações deles das séries por tipo"""
+        response = self.client.delete(reverse('item-bulk'), [self.camiseta.pk, self.livro.pk], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        por_tipo = {s['chave']: s['quantidade'] for s in self.serie(por='tipo', de='2026-01-01')['series']}
+        self.assertEqual(por_tipo, {None: 3})
+
+    def test_reconstruir_series(self):
+        """Testa se o comando de backfill chega às mesmas linhas da manutenção incremental"""
+        def linhas():
+            return set(ResumoDiario.objects.filter(quantidade__gt=0).values_list(
+                'dimensao', 'chave', 'dia', 'quantidade', 'valor_centavos'
+            ))
+        esperadas = linhas()
+        ResumoDiario.objects.all().delete()
+
+        saida = StringIO()
+        call_command('reconstruir_series', stdout=saida)
+        self.assertIn(f'{len(esperadas)} linhas', saida.getvalue())
+        self.assertEqual(linhas(), esperadas)
+
+        ResumoDiario.objects.filter(dia__gte=date(2026, 3, 1)).delete()
+        call_command('reconstruir_series', '--de', '2026-03-01', stdout=saida)
+        self.assertEqual(linhas(), esperadas)
+
+    def test_parametros_invalidos(self):
+        """Testa a validação dos parâmetros"""
+        url = reverse('relatorio_serie_api')
+        for params in (
+            {'periodo': 'ano'},
+            {'por': 'usuario'},
+            {'de': '05/01/2026'},
+            {'de': '2026-02-01', 'ate': '2026-01-01'},
+            {'periodo': 'dia', 'de': '2000-01-01', 'ate': '2026-01-01'},
+            {'por': 'tipo', 'chaves': 'XX'},
+            {'por': 'doador', 'chaves': 'joao'},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
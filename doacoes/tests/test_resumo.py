@@ -0,0 +1,196 @@
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from doacoes.models import Doador, Recebedor, Item, Doacao, ResumoDashboard
+from doacoes.resumo import obter_resumo, reconstruir_resumo
+from doacoes.cache_dashboard import obter_contexto, invalidar_dashboard, versao_atual
+from doacoes.views import contexto_dashboard
+
+User = get_user_model()
+
+
+class ResumoDashboardTests(TestCase):
+    def setUp(self):
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        self.recebedor = Recebedor.objects.create(nome='Maria Santos', email='maria@email.com')
+        self.item = Item.objects.create(nome='Camiseta', tipo='RO', doador=self.doador)
+        self.doacao_item = Doacao.objects.create(doador=self.doador, recebedor=self.recebedor, item=self.item)
+        self.doacao_valor = Doacao.objects.create(doador=self.doador, valor=Decimal('150.50'))
+
+    def resumo(self):
+        return obter_resumo(timezone.now() - timedelta(days=180))
+
+    def contadores(self):
+        return sorted(
+            ResumoDashboard.objects.exclude(quantidade=0, valor=0)
+            .values_list('categoria', 'chave', 'quantidade', 'valor')
+        )
+
+    def test_contadores_apos_criacao(self):
+        """Testa se os contadores acompanham as criações"""
+        dados = self.resumo()
+        self.assertEqual(dados['total_doacoes'], 2)
+        self.assertEqual(dados['total_doadores'], 1)
+        self.assertEqual(dados['total_recebedores'], 1)
+        self.assertEqual(dados['total_itens'], 1)
+        self.assertEqual(dados['total_dinheiro'], Decimal('150.50'))
+        self.assertEqual(dados['total_doacoes_dinheiro'], 1)
+        self.assertEqual(dados['total_doacoes_item'], 1)
+        self.assertEqual(dados['itens_por_tipo'], [('RO', 1)])
+        self.assertEqual(len(dados['meses']), 1)
+        self.assertEqual(dados['top_doadores'][0].total_doacoes, 2)
+        self.assertEqual(dados['top_recebedores'][0].total_recebimentos, 1)
+
+    def test_contadores_apos_atualizacao(self):
+        """Testa se alterações de valor e tipo movem os contadores"""
+        self.doacao_valor.valor = Decimal('50.00')
+        self.doacao_valor.save()
+        self.item.tipo = 'LI'
+        self.item.save()
+
+        dados = self.resumo()
+        self.assertEqual(dados['total_dinheiro'], Decimal('50.00'))
+        self.assertEqual(dados['total_doacoes'], 2)
+        self.assertEqual(dados['itens_por_tipo'], [('LI', 1)])
+
+    def test_contadores_apos_exclusao(self):
+        """Testa se exclusões (inclusive em cascata) decrementam os contadores"""
+        self.doador.delete()
+
+        dados = self.resumo()
+        self.assertEqual(dados['total_doacoes'], 0)
+        self.assertEqual(dados['total_doadores'], 0)
+        self.assertEqual(dados['total_dinheiro'], Decimal('0'))
+        self.assertFalse(ResumoDashboard.objects.filter(categoria='DOADOR').exists())
+
+    def test_reconstrucao_igual_incremental(self):
+        """Testa se a reconstrução completa gera os mesmos contadores que os sinais"""
+        Doacao.objects.create(doador=self.doador, valor=Decimal('10.00'))
+        self.doacao_item.delete()
+        incremental = self.contadores()
+
+        reconstruir_resumo()
+        self.assertEqual(self.contadores(), incremental)
+
+    def test_meses_cortam_no_instante(self):
+        """Testa se o mês do corte só conta as doações a partir do instante, como a consulta original"""
+        corte = timezone.make_aware(timezone.datetime(2024, 3, 15, 12))
+        antes = Doacao.objects.create(doador=self.doador, valor=Decimal('5.00'))
+        depois = Doacao.objects.create(doador=self.doador, valor=Decimal('7.00'))
+        abril = Doacao.objects.create(doador=self.doador, valor=Decimal('11.00'))
+        Doacao.objects.filter(pk=antes.pk).update(data=corte - timedelta(days=1))
+        Doacao.objects.filter(pk=depois.pk).update(data=corte + timedelta(hours=1))
+        Doacao.objects.filter(pk=abril.pk).update(data=corte + timedelta(days=20))
+        reconstruir_resumo()
+
+        meses = obter_resumo(corte)['meses']
+        self.assertEqual(meses[0], ('2024-03', 1, Decimal('7.00')))
+        self.assertEqual(meses[1], ('2024-04', 1, Decimal('11.00')))
+
+    def test_comando_rebuild_dashboard(self):
+        """Testa o comando que reconstrói o resumo após escritas em massa"""
+        Doacao.objects.bulk_create([Doacao(doador=self.doador, valor=Decimal('1.00')) for _ in range(3)])
+        self.assertEqual(self.resumo()['total_doacoes'], 2)
+
+        call_command('rebuild_dashboard', stdout=StringIO())
+        self.assertEqual(self.resumo()['total_doacoes'], 5)
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=300)
+class CacheDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+        Doacao.objects.create(doador=self.doador, valor=Decimal('10.00'))
+
+    def test_segunda_requisicao_vem_do_cache(self):
+        """Testa se o contexto do dashboard não é recalculado a cada requisição"""
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(2):  # sessão e usuário
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_doacoes'], 1)
+
+    def test_recalculo_em_andamento_serve_contexto_anterior(self):
+        """Testa se, com outro processo recalculando, o último contexto é servido"""
+        calculos = []
+
+        def calcular():
+            calculos.append(1)
+            return {'total_doacoes': len(calculos)}
+
+        self.assertEqual(obter_contexto(calcular), {'total_doacoes': 1})
+        invalidar_dashboard()
+        cache.add(f'dashboard:recalculo:{versao_atual()}', 1)
+        self.assertEqual(obter_contexto(calcular), {'total_doacoes': 1})
+        self.assertEqual(len(calculos), 1)
+
+        cache.delete(f'dashboard:recalculo:{versao_atual()}')
+        self.assertEqual(obter_contexto(calcular), {'total_doacoes': 2})
+
+    @override_settings(DASHBOARD_CACHE_TIMEOUT=0)
+    def test_cache_desligado(self):
+        """Testa se, com o timeout 0 (padrão com locmem), o contexto é calculado a cada requisição"""
+        self.assertEqual(obter_contexto(lambda: {'total_doacoes': 1}), {'total_doacoes': 1})
+        self.assertEqual(obter_contexto(lambda: {'total_doacoes': 2}), {'total_doacoes': 2})
+        self.assertIsNone(cache.get(f'dashboard:contexto:{versao_atual()}'))
+
+    def test_backend_em_arquivo(self):
+        """Testa o cache com o backend file-based"""
+        with tempfile.TemporaryDirectory() as diretorio:
+            backend = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': diretorio,
+            }}
+            with self.settings(CACHES=backend):
+                self.client.get(reverse('dashboard'))
+                self.assertEqual(obter_contexto(lambda: {})['total_doacoes'], 1)
+                invalidar_dashboard()
+                self.assertEqual(versao_atual(), 2)
+                self.assertEqual(obter_contexto(lambda: {'total_doacoes': 0}), {'total_doacoes': 0})
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=300)
+class InvalidacaoCacheDashboardTests(TransactionTestCase):
+    """Usa transações reais: a invalidação só acontece no commit."""
+
+    def setUp(self):
+        cache.clear()
+        self.doador = Doador.objects.create(nome='João Silva', email='joao@email.com')
+
+    def test_escrita_invalida_apos_commit(self):
+        """Testa se várias escritas em uma transação geram uma única invalidação, no commit"""
+        versao = versao_atual()
+        with transaction.atomic():
+            Doacao.objects.create(doador=self.doador, valor=Decimal('5.00'))
+            Doacao.objects.create(doador=self.doador, valor=Decimal('5.00'))
+            self.assertEqual(versao_atual(), versao)
+        self.assertEqual(versao_atual(), versao + 1)
+
+    def test_rollback_nao_invalida(self):
+        """Testa se uma transação desfeita não invalida o cache"""
+        versao = versao_atual()
+        with transaction.atomic():
+            Doacao.objects.create(doador=self.doador, valor=Decimal('5.00'))
+            transaction.set_rollback(True)
+        self.assertEqual(versao_atual(), versao)
+
+    def test_dashboard_reflete_escrita(self):
+        """Testa se o dashboard mostra os novos totais depois de uma escrita"""
+        self.assertEqual(obter_contexto(contexto_dashboard)['total_doacoes'], 0)
+        Doacao.objects.create(doador=self.doador, valor=Decimal('5.00'))
+        self.assertEqual(obter_contexto(contexto_dashboard)['total_doacoes'], 1)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class ModosSessaoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+
+    def login_e_acesso(self):
+        client = Client()
+        response = client.post(reverse('login'), {'email': 'test@example.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 302)
+        response = client.get(reverse('doador_list'))
+        self.assertEqual(response.status_code, 200)
+        return client
+
+    def test_modos_configurados(self):
+        """Testa se todos os modos apontam para backends de sessão existentes"""
+        self.assertEqual(set(settings.SESSION_ENGINES), {'db', 'cached_db', 'cookie'})
+        self.assertEqual(settings.SESSION_ENGINE, settings.SESSION_ENGINES[settings.SESSION_MODE])
+
+    def test_login_em_todos_os_modos(self):
+        """Testa o login e uma página autenticada em cada modo de sessão"""
+        for modo, engine in settings.SESSION_ENGINES.items():
+            with self.subTest(modo=modo), override_settings(SESSION_ENGINE=engine):
+                self.login_e_acesso()
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_le_do_cache(self):
+        """Testa se o modo cached_db não consulta a tabela de sessões a cada requisição"""
+        client = self.login_e_acesso()
+        self.assertEqual(Session.objects.count(), 1)
+        Session.objects.all().delete()
+        response = client.get(reverse('doador_list'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_cookie_nao_usa_tabela(self):
+        """Testa se o modo cookie não grava nada na tabela de sessões"""
+        self.login_e_acesso()
+        self.assertFalse(Session.objects.exists())
+
+
+class LimparSessoesTests(TestCase):
+    def criar_sessoes(self, quantidade, expire_date, prefixo):
+        Session.objects.bulk_create([
+            Session(session_key=f'{prefixo}{i:036d}', session_data='', expire_date=expire_date)
+            for i in range(quantidade)
+        ])
+
+    def test_exclui_expiradas_em_lotes(self):
+        """Testa se só as sessões expiradas são excluídas, lote a lote"""
+        agora = timezone.now()
+        self.criar_sessoes(7, agora - timedelta(days=1), 'exp')
+        self.criar_sessoes(2, agora + timedelta(days=1), 'val')
+
+        saida = StringIO()
+        # 3 lotes com exclusões + 1 consulta vazia, cada lote com SELECT e DELETE
+        with self.assertNumQueries(7):
+            call_command('limpar_sessoes', lote=3, stdout=saida)
+
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertFalse(Session.objects.filter(expire_date__lt=agora).exists())
+        self.assertIn('7 sessões expiradas excluídas', saida.getvalue())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_modo_cookie(self):
+        """Testa se o comando não mexe no banco no modo cookie"""
+        saida = StringIO()
+        with self.assertNumQueries(0):
+            call_command('limpar_sessoes', stdout=saida)
+        self.assertIn('nada a limpar', saida.getvalue())
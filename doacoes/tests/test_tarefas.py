@@ -0,0 +1,157 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from doacoes import tarefas
+from doacoes.models import Tarefa
+from doacoes.tarefas import tarefa, enfileirar, reservar, executar, recuperar_travadas
+
+User = get_user_model()
+
+executadas = []
+
+
+@tarefa
+def registrar(valor, sufixo=''):
+    executadas.append(f'{valor}{sufixo}')
+
+
+@tarefa(max_tentativas=2)
+def falhar():
+    raise RuntimeError('erro proposital')
+
+
+def nao_marcada():
+    pass
+
+
+class FilaTarefasTests(TestCase):
+    def setUp(self):
+        executadas.clear()
+
+    def executar_worker(self, **opcoes):
+        saida = StringIO()
+        call_command('executar_tarefas', ate_esvaziar=True, stdout=saida, **opcoes)
+        return saida.getvalue()
+
+    def test_enfileirar_e_executar(self):
+        """Testa se o worker executa a tarefa com os argumentos gravados"""
+        t = enfileirar(registrar, args=['a'], kwargs={'sufixo': '!'})
+        self.assertEqual(t.nome, 'doacoes.tests.test_tarefas.registrar')
+        saida = self.executar_worker()
+        self.assertEqual(executadas, ['a!'])
+        t.refresh_from_db()
+        self.assertEqual(t.status, Tarefa.CONCLUIDA)
+        self.assertEqual(t.tentativas, 1)
+        self.assertIn('1 tarefas concluídas', saida)
+
+    def test_prioridade_e_agendamento(self):
+        """Testa a ordem por prioridade e se tarefas agendadas esperam a sua vez"""
+        enfileirar(registrar, args=['baixa'])
+        enfileirar(registrar, args=['alta'], prioridade=10)
+        enfileirar(registrar, args=['futura'], prioridade=20, atraso=timedelta(hours=1))
+        self.executar_worker()
+        self.assertEqual(executadas, ['alta', 'baixa'])
+        self.assertEqual(Tarefa.objects.filter(status=Tarefa.PENDENTE).count(), 1)
+
+    def test_reserva_exclusiva(self):
+        """Testa se dois workers nunca reservam a mesma tarefa"""
+        for i in range(3):
+            enfileirar(registrar, args=[i])
+        primeiro = reservar('worker-1', limite=2)
+        segundo = reservar('worker-2', limite=2)
+        self.assertEqual(len(primeiro), 2)
+        self.assertEqual(len(segundo), 1)
+        self.assertFalse({t.pk for t in primeiro} & {t.pk for t in segundo})
+        self.assertEqual(reservar('worker-3'), [])
+
+    def test_nova_tentativa_com_espera(self):
+        """Testa se a falha volta para a fila com espera e depois fica como FALHOU"""
+        t = enfileirar(falhar)
+        self.assertFalse(executar(reservar('w')[0]))
+        t.refresh_from_db()
+        self.assertEqual(t.status, Tarefa.PENDENTE)
+        self.assertGreater(t.executar_apos, timezone.now() + timedelta(seconds=5))
+        self.assertIn('erro proposital', t.ultimo_erro)
+        # Ainda em espera: nada a reservar
+        self.assertEqual(reservar('w'), [])
+
+        Tarefa.objects.filter(pk=t.pk).update(executar_apos=timezone.now())
+        self.assertFalse(executar(reservar('w')[0]))
+        t.refresh_from_db()
+        self.assertEqual(t.status, Tarefa.FALHOU)
+        self.assertEqual(t.tentativas, 2)
+
+    def test_somente_funcoes_marcadas(self):
+        """Testa se apenas funções com @tarefa podem ser enfileiradas"""
+        with self.assertRaises(tarefas.TarefaDesconhecida):
+            enfileirar(nao_marcada)
+        with self.assertRaises(tarefas.TarefaDesconhecida):
+            enfileirar('doacoes.tests.test_tarefas.nao_marcada')
+
+    @override_settings(TAREFAS_TEMPO_LIMITE=60)
+    def test_recuperar_travadas(self):
+        """Testa se a tarefa de um worker que morreu volta para a fila"""
+        t = enfileirar(registrar, args=['x'])
+        reservar('morto')
+        Tarefa.objects.filter(pk=t.pk).update(iniciada_em=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(recuperar_travadas(), 1)
+        self.executar_worker()
+        self.assertEqual(executadas, ['x'])
+
+    def test_estatisticas(self):
+        """Testa a profundidade da fila e as latências calculadas"""
+        enfileirar(registrar, args=['a'], prioridade=5)
+        enfileirar(registrar, args=['b'])
+        enfileirar(registrar, args=['c'], atraso=timedelta(hours=1))
+        executar(reservar('w')[0])
+
+        dados = tarefas.estatisticas()
+        self.assertEqual(dados['por_status'][Tarefa.PENDENTE], 2)
+        self.assertEqual(dados['por_status'][Tarefa.CONCLUIDA], 1)
+        self.assertEqual(dados['prontas'], 1)
+        self.assertEqual(dados['agendadas'], 1)
+        self.assertEqual(dados['prontas_por_prioridade'], {'0': 1})
+        self.assertEqual(dados['concluidas_na_janela'], 1)
+        self.assertIsNotNone(dados['execucao']['p95'])
+
+
+class TarefaAPITests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='testpass123', nome_completo='Admin', role='ADMIN'
+        )
+        self.gerente = User.objects.create_user(
+            email='gerente@example.com', password='testpass123', nome_completo='Gerente', role='GERENTE'
+        )
+        self.client = APIClient()
+
+    def test_apenas_administradores(self):
+        """Testa se gerentes não têm acesso à fila"""
+        self.client.force_authenticate(user=self.gerente)
+        response = self.client.get(reverse('tarefa-estatisticas'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_estatisticas_e_reexecucao(self):
+        """Testa as estatísticas e a reexecução de uma tarefa com falha"""
+        self.client.force_authenticate(user=self.admin)
+        t = enfileirar(falhar, max_tentativas=1)
+        executar(reservar('w')[0])
+
+        response = self.client.get(reverse('tarefa-estatisticas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['por_status'][Tarefa.FALHOU], 1)
+
+        response = self.client.get(reverse('tarefa-list'), {'status': 'falhou'})
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.post(reverse('tarefa-reexecutar', args=[t.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Tarefa.PENDENTE)
+        response = self.client.post(reverse('tarefa-reexecutar', args=[t.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
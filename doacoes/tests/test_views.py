@@ -3,8 +3,14 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
-from doacoes.models import Doador, Recebedor, Item, Doacao
+from doacoes.models import Doador, Recebedor, Item, Doacao, ChaveIdempotencia
 from rest_framework.test import APIClient
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 import json
 
 User = get_user_model()
@@ -163,4 +169,164 @@ class ViewsTestCase(TestCase):
         self.client.logout()
         response = self.client.get(reverse('dashboard'))
         self.assertEqual(response.status_code, 302)  # Redireciona para login
-        self.assertRedirects(response, f"{reverse('login')}?next={reverse('dashboard')}") 
\ No newline at end of file
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('dashboard')}") 
+
+class ListagemPaginadaTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+        Doador.objects.bulk_create([
+            Doador(nome=f'Doador {i:03d}', email=f'doador{i}@email.com') for i in range(60)
+        ])
+        Doador.objects.create(nome='Zélia Busca', telefone='11912345678')
+
+    def test_pagina_limitada(self):
+        """Testa se a lista renderiza apenas uma página de registros"""
+        response = self.client.get(reverse('doador_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['doadores']), 25)
+        self.assertEqual(response.context['page_obj'].paginator.count, 61)
+
+    def test_tamanho_maximo_da_pagina(self):
+        """Testa se por_pagina não permite renderizar a tabela inteira"""
+        response = self.client.get(reverse('doador_list'), {'por_pagina': 100000})
+        self.assertEqual(len(response.context['doadores']), 61)
+        self.assertEqual(response.context['por_pagina'], 100)
+
+    def test_busca(self):
+        """Testa a busca por nome e telefone"""
+        response = self.client.get(reverse('doador_list'), {'q': '1912345'})
+        self.assertEqual([d.nome for d in response.context['doadores']], ['Zélia Busca'])
+
+    def test_ordenacao(self):
+        """Testa a ordenação decrescente pela coluna nome"""
+        response = self.client.get(reverse('doador_list'), {'ordem': '-nome'})
+        self.assertEqual(response.context['doadores'][0].nome, 'Zélia Busca')
+
+    def test_ordenacao_invalida_usa_padrao(self):
+        """Testa se uma coluna desconhecida volta para a ordenação padrão"""
+        response = self.client.get(reverse('doador_list'), {'ordem': 'observacoes'})
+        self.assertEqual(response.context['ordem'], 'nome')
+        self.assertEqual(response.context['doadores'][0].nome, 'Doador 000')
+
+    def test_ordenacao_por_tipo_desempata_pelo_nome(self):
+        """Testa se a ordenação de itens por tipo usa o nome como segundo critério"""
+        Item.objects.bulk_create([
+            Item(nome='Casaco', tipo='RO'), Item(nome='Atlas', tipo='LI'), Item(nome='Blusa', tipo='RO'),
+        ])
+        response = self.client.get(reverse('item_list'), {'ordem': 'tipo'})
+        self.assertEqual([i.nome for i in response.context['itens']], ['Atlas', 'Blusa', 'Casaco'])
+
+    def test_item_list_paginas_das_duas_listas(self):
+        """Testa se a navegação dos itens cobre a lista mais longa sem repetir a última página da outra"""
+        doador = Doador.objects.first()
+        Item.objects.bulk_create([Item(nome=f'Item {i}', tipo='RO') for i in range(3)])
+        Doacao.objects.bulk_create([Doacao(doador=doador, valor=i + 1) for i in range(5)])
+        response = self.client.get(reverse('item_list'), {'por_pagina': 2, 'pagina': 3})
+        self.assertEqual(response.context['page_obj'].number, 3)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertEqual(list(response.context['itens']), [])
+        self.assertEqual(len(response.context['doacoes']), 1)
+
+        response = self.client.get(reverse('item_list'), {'por_pagina': 2, 'pagina': 99})
+        self.assertEqual(response.context['page_obj'].number, 3)
+
+
+class DoacaoWizardAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            nome_completo='Test User'
+        )
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.user)
+        self.dados = {
+            'item_nome': 'Calça',
+            'item_tipo': 'RO',
+            'item_descricao': 'Calça jeans',
+            'doador_tipo': 'novo',
+            'doador_nome': 'Pedro Silva',
+            'doador_email': 'pedro@email.com',
+            'recebedor_tipo': 'novo',
+            'recebedor_nome': 'Ana Santos',
+            'recebedor_email': 'ana@email.com',
+        }
+
+    def enviar(self, dados=None, chave=None):
+        headers = {'Idempotency-Key': chave} if chave else {}
+        return self.api_client.post(
+            reverse('doacao_wizard_api'), data=dados or self.dados, format='json', headers=headers
+        )
+
+    def test_item_com_recebedor_nasce_indisponivel(self):
+        """Testa se o item é gravado uma única vez, já com a disponibilidade final"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.enviar()
+        self.assertEqual(response.status_code, 201)
+        escritas_item = [q['sql'] for q in consultas if '"doacoes_item"' in q['sql'].split(' WHERE ')[0]]
+        self.assertEqual(len(escritas_item), 1)
+        self.assertTrue(escritas_item[0].startswith('INSERT'))
+        item = Doacao.objects.get(pk=response.data['id']).item
+        self.assertFalse(item.disponivel)
+
+    def test_valor_em_dinheiro_exato(self):
+        """Testa se o valor da doação em dinheiro é gravado sem arredondamento de float"""
+        dados = {'tipo_doacao': 'dinheiro', 'valor': '1.234,56', 'doador_tipo': 'novo',
+                 'doador_nome': 'Pedro Silva', 'doador_email': 'pedro@email.com'}
+        response = self.enviar(dados)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Doacao.objects.get(pk=response.data['id']).valor, Decimal('1234.56'))
+
+    def test_falha_desfaz_tudo(self):
+        """Testa se um erro no item desfaz o doador e o recebedor já criados"""
+        response = self.enviar(dict(self.dados, item_tipo='XX'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Doador.objects.exists())
+        self.assertFalse(Recebedor.objects.exists())
+        self.assertFalse(Item.objects.exists())
+
+    def test_repeticao_com_a_mesma_chave(self):
+        """Testa se a repetição devolve a resposta original sem criar nada de novo"""
+        primeira = self.enviar(chave='wizard-1')
+        with self.assertNumQueries(1):
+            segunda = self.enviar(chave='wizard-1')
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Doacao.objects.count(), 1)
+        self.assertEqual(Doador.objects.count(), 1)
+
+    def test_chave_com_outra_requisicao(self):
+        """Testa se reutilizar a chave com outro corpo é recusado"""
+        self.enviar(chave='wizard-1')
+        response = self.enviar(dict(self.dados, item_nome='Camisa'), chave='wizard-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Doacao.objects.count(), 1)
+
+    def test_chave_vencida_executa_de_novo(self):
+        """Testa se a chave deixa de valer depois da validade configurada"""
+        self.enviar(chave='wizard-1')
+        ChaveIdempotencia.objects.update(criada_em=timezone.now() - timedelta(days=2))
+        response = self.enviar(chave='wizard-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Doacao.objects.count(), 2)
+        self.assertEqual(ChaveIdempotencia.objects.count(), 1)
+
+    def test_requisicoes_simultaneas(self):
+        """Testa se a requisição que perde a corrida é desfeita e devolve o resultado da outra"""
+        primeira = self.enviar(chave='wizard-1')
+        # Simula a corrida: a segunda não encontra a chave na leitura inicial
+        with mock.patch('doacoes.idempotencia.resposta_armazenada', return_value=None):
+            segunda = self.enviar(chave='wizard-1')
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(Doacao.objects.count(), 1)
+        self.assertEqual(Doador.objects.count(), 1)
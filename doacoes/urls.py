@@ -11,9 +11,10 @@ from .viewsets import (
     ItemViewSet, 
     DoacaoViewSet, 
     UserViewSet,
+    TarefaViewSet,
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
 )
-from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth.views import LogoutView
 from django.views.decorators.csrf import ensure_csrf_cookie
 from doacoes import views
@@ -25,6 +26,7 @@ router.register(r'doadores', DoadorViewSet)
 router.register(r'recebedores', RecebedorViewSet)
 router.register(r'itens', ItemViewSet)
 router.register(r'doacoes', DoacaoViewSet)
+router.register(r'tarefas', TarefaViewSet)
 
 
 urlpatterns = [
@@ -46,12 +48,21 @@ urlpatterns = [
 
     # API URLs
     path('api/wizard/doacoes/', views.doacao_wizard_api, name='doacao_wizard_api'),
+    path('api/search/', views.busca_api, name='busca_api'),
+    path('api/relatorios/serie/', views.relatorio_serie_api, name='relatorio_serie_api'),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('api/', include(router.urls)),
 
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+
+    # Métricas (Prometheus)
+    path('metrics', views.metricas_view, name='metricas'),
+
+    # Perfis de requisições (?_profile=)
+    path('perfis/<slug:nome>/', views.perfil_view, name='perfil'),
+    path('perfis/<slug:nome>/<str:arquivo>', views.perfil_view, name='perfil_arquivo'),
 ]
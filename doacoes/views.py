@@ -1,23 +1,32 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required, user_passes_test, permission_required
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from .models import User, Doador, Recebedor, Item, Doacao
+from .resumo import obter_resumo
+from . import busca, idempotencia, metricas, perfil, relatorios, resumo
+from .cache_dashboard import obter_contexto
+from .listagem import PaginaCombinada, paginar_listagem, filtrar_busca, numero_pagina
 import logging
+import os
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, BasePermission
 from rest_framework.response import Response
+from rest_framework.reverse import reverse as api_reverse
 from rest_framework import status
 from django.utils.decorators import method_decorator
 from rest_framework.views import APIView
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
 from datetime import datetime, timedelta
 from django.utils import timezone
 import json
+from decimal import Decimal, InvalidOperation
 
 logger = logging.getLogger(__name__)
 
@@ -60,87 +69,52 @@ def user_list(request):
     users = User.objects.all().order_by('-role', 'nome_completo')
     return render(request, 'user_list.html', {'users': users})
 
-@login_required
-def dashboard(request):
-    try:
-        # --- Totais gerais ---
-        total_doacoes = Doacao.objects.count()
-        total_doadores = Doador.objects.count()
-        total_recebedores = Recebedor.objects.count()
-        total_itens = Item.objects.count()
-
-        # --- Financeiro ---
-        total_dinheiro = Doacao.objects.filter(valor__isnull=False).aggregate(
-            total=Sum('valor')
-        )['total'] or 0
-
-        total_doacoes_dinheiro = Doacao.objects.filter(valor__isnull=False).count()
-        total_doacoes_item = Doacao.objects.filter(item__isnull=False).count()
-
-        # --- Doações dos últimos 6 meses (para gráfico de linha) ---
-        seis_meses_atras = timezone.now() - timedelta(days=180)
-        doacoes_por_mes = (
-            Doacao.objects
-            .filter(data__gte=seis_meses_atras)
-            .annotate(mes=TruncMonth('data'))
-            .values('mes')
-            .annotate(total=Count('id'), valor_total=Sum('valor'))
-            .order_by('mes')
-        )
+def contexto_dashboard():
+    """Monta o contexto do dashboard; o resultado é cacheado por obter_contexto()."""
+    # --- Totais, séries e rankings pré-agregados (ver resumo.py) ---
+    seis_meses_atras = timezone.now() - timedelta(days=180)
+    dados = obter_resumo(seis_meses_atras)
 
-        meses_labels = []
-        meses_contagem = []
-        meses_valores = []
-        for d in doacoes_por_mes:
-            meses_labels.append(d['mes'].strftime('%b/%Y'))
-            meses_contagem.append(d['total'])
-            meses_valores.append(float(d['valor_total'] or 0))
-
-        # --- Top 5 doadores ---
-        top_doadores = (
-            Doador.objects
-            .annotate(total_doacoes=Count('doacoes'))
-            .order_by('-total_doacoes')[:5]
-        )
+    # --- Doações dos últimos 6 meses (para gráfico de linha) ---
+    meses_labels = []
+    meses_contagem = []
+    meses_valores = []
+    for chave, total, valor_total in dados['meses']:
+        meses_labels.append(datetime.strptime(chave, '%Y-%m').strftime('%b/%Y'))
+        meses_contagem.append(total)
+        meses_valores.append(float(valor_total or 0))
 
-        # --- Top 5 recebedores ---
-        top_recebedores = (
-            Recebedor.objects
-            .annotate(total_recebimentos=Count('recebimentos'))
-            .order_by('-total_recebimentos')[:5]
-        )
+    # --- Itens por tipo (para gráfico de pizza) ---
+    itens_por_tipo = dados['itens_por_tipo'][:6]
+    tipo_dict = dict(Item.TIPO_CHOICES)
+    itens_tipos_labels = [tipo_dict.get(tipo, tipo) for tipo, _ in itens_por_tipo]
+    itens_tipos_valores = [total for _, total in itens_por_tipo]
 
-        # --- Itens por tipo (para gráfico de pizza) ---
-        itens_por_tipo = (
-            Item.objects
-            .values('tipo')
-            .annotate(total=Count('id'))
-            .order_by('-total')[:6]
-        )
-        tipo_dict = dict(Item.TIPO_CHOICES)
-        itens_tipos_labels = [tipo_dict.get(i['tipo'], i['tipo']) for i in itens_por_tipo]
-        itens_tipos_valores = [i['total'] for i in itens_por_tipo]
+    # --- Doações recentes ---
+    doacoes_recentes = list(Doacao.objects.select_related('doador', 'recebedor', 'item').order_by('-data')[:5])
 
-        # --- Doações recentes ---
-        doacoes_recentes = Doacao.objects.select_related('doador', 'recebedor', 'item').order_by('-data')[:5]
+    return {
+        'total_doacoes': dados['total_doacoes'],
+        'total_doadores': dados['total_doadores'],
+        'total_recebedores': dados['total_recebedores'],
+        'total_itens': dados['total_itens'],
+        'total_dinheiro': dados['total_dinheiro'],
+        'total_doacoes_dinheiro': dados['total_doacoes_dinheiro'],
+        'total_doacoes_item': dados['total_doacoes_item'],
+        'meses_labels': json.dumps(meses_labels),
+        'meses_contagem': json.dumps(meses_contagem),
+        'meses_valores': json.dumps(meses_valores),
+        'top_doadores': dados['top_doadores'],
+        'top_recebedores': dados['top_recebedores'],
+        'itens_tipos_labels': json.dumps(itens_tipos_labels),
+        'itens_tipos_valores': json.dumps(itens_tipos_valores),
+        'doacoes_recentes': doacoes_recentes,
+    }
 
-        context = {
-            'total_doacoes': total_doacoes,
-            'total_doadores': total_doadores,
-            'total_recebedores': total_recebedores,
-            'total_itens': total_itens,
-            'total_dinheiro': total_dinheiro,
-            'total_doacoes_dinheiro': total_doacoes_dinheiro,
-            'total_doacoes_item': total_doacoes_item,
-            'meses_labels': json.dumps(meses_labels),
-            'meses_contagem': json.dumps(meses_contagem),
-            'meses_valores': json.dumps(meses_valores),
-            'top_doadores': top_doadores,
-            'top_recebedores': top_recebedores,
-            'itens_tipos_labels': json.dumps(itens_tipos_labels),
-            'itens_tipos_valores': json.dumps(itens_tipos_valores),
-            'doacoes_recentes': doacoes_recentes,
-        }
+@login_required
+def dashboard(request):
+    try:
+        context = obter_contexto(contexto_dashboard)
         return render(request, 'dashboard.html', context)
     except Exception as e:
         logger.error(f"Erro no dashboard: {str(e)}")
@@ -150,8 +124,15 @@ def dashboard(request):
 @login_required
 def doador_list(request):
     try:
-        doadores = Doador.objects.all().order_by('nome')
-        return render(request, 'doador_list.html', {'doadores': doadores})
+        context = paginar_listagem(
+            request,
+            Doador.objects.all(),
+            campos_busca=['nome', 'email', 'telefone', 'endereco'],
+            ordenacoes={'nome': 'nome', 'endereco': 'endereco', 'data_cadastro': 'data_cadastro'},
+            ordenacao_padrao='nome',
+        )
+        context['doadores'] = context['page_obj'].object_list
+        return render(request, 'doador_list.html', context)
     except Exception as e:
         logger.error(f"Erro na lista de doadores: {str(e)}")
         messages.error(request, 'Erro ao carregar a lista de doadores.')
@@ -160,8 +141,15 @@ def doador_list(request):
 @login_required
 def recebedor_list(request):
     try:
-        recebedores = Recebedor.objects.all().order_by('nome')
-        return render(request, 'recebedor_list.html', {'recebedores': recebedores})
+        context = paginar_listagem(
+            request,
+            Recebedor.objects.all(),
+            campos_busca=['nome', 'email', 'telefone', 'endereco'],
+            ordenacoes={'nome': 'nome', 'endereco': 'endereco', 'data_cadastro': 'data_cadastro'},
+            ordenacao_padrao='nome',
+        )
+        context['recebedores'] = context['page_obj'].object_list
+        return render(request, 'recebedor_list.html', context)
     except Exception as e:
         logger.error(f"Erro na lista de recebedores: {str(e)}")
         messages.error(request, 'Erro ao carregar a lista de recebedores.')
@@ -170,20 +158,33 @@ def recebedor_list(request):
 @login_required
 def item_list(request):
     try:
-        itens = Item.objects.all().order_by('nome')
-        doacoes = Doacao.objects.filter(valor__isnull=False).order_by('-data')
-        doadores = Doador.objects.all().order_by('nome')
-        recebedores = Recebedor.objects.all().order_by('nome')
-        
-        logger.info(f"Listando {itens.count()} itens e {doacoes.count()} doações em dinheiro")
-        
-        return render(request, 'item_list.html', {
-            'itens': itens,
-            'doacoes': doacoes,
-            'doadores': doadores,
-            'recebedores': recebedores,
+        context = paginar_listagem(
+            request,
+            Item.objects.select_related('doador'),
+            campos_busca=['nome', 'descricao', 'doador__nome'],
+            ordenacoes={'nome': 'nome', 'tipo': ('tipo', 'nome'), 'disponivel': ('disponivel', 'nome')},
+            ordenacao_padrao='nome',
+        )
+        # As doações em dinheiro dividem a mesma tabela e o mesmo número de página
+        doacoes_qs = filtrar_busca(
+            Doacao.objects.filter(valor__isnull=False).select_related('doador', 'recebedor'),
+            context['busca'],
+            ['doador__nome', 'recebedor__nome'],
+        ).order_by('-data', '-id')
+        itens_paginator = context['page_obj'].paginator
+        doacoes_paginator = Paginator(doacoes_qs, context['por_pagina'])
+        pagina = PaginaCombinada([itens_paginator, doacoes_paginator], numero_pagina(request))
+        itens_page, doacoes_page = pagina.paginas
+        context['page_obj'] = pagina
+
+        logger.info(f"Listando {itens_paginator.count} itens e {doacoes_paginator.count} doações em dinheiro")
+
+        context.update({
+            'itens': itens_page.object_list if itens_page else [],
+            'doacoes': doacoes_page.object_list if doacoes_page else [],
             'tipos_item': Item.TIPO_CHOICES
         })
+        return render(request, 'item_list.html', context)
     except Exception as e:
         logger.error(f"Erro na lista de itens: {str(e)}", exc_info=True)
         messages.error(request, 'Erro ao carregar a lista de itens.')
@@ -192,17 +193,19 @@ def item_list(request):
 @login_required
 def doacao_list(request):
     try:
-        doacoes = Doacao.objects.all().order_by('-data')
-        doadores = Doador.objects.all().order_by('nome')
-        recebedores = Recebedor.objects.all().order_by('nome')
-        itens_disponiveis = Item.objects.filter(disponivel=True).order_by('nome')
-        
-        context = {
-            'doacoes': doacoes,
-            'doadores': doadores,
-            'recebedores': recebedores,
-            'itens_disponiveis': itens_disponiveis,
-        }
+        context = paginar_listagem(
+            request,
+            Doacao.objects.select_related('doador', 'recebedor', 'item'),
+            campos_busca=['doador__nome', 'recebedor__nome', 'item__nome'],
+            ordenacoes={
+                'data': 'data',
+                'item': 'item__nome',
+                'doador': 'doador__nome',
+                'recebedor': 'recebedor__nome',
+            },
+            ordenacao_padrao='-data',
+        )
+        context['doacoes'] = context['page_obj'].object_list
         return render(request, 'doacao_list.html', context)
     except Exception as e:
         logger.error(f"Erro na lista de doações: {str(e)}")
@@ -215,8 +218,6 @@ def doacao_wizard(request):
     try:
         context = {
             'tipos_item': Item.TIPO_CHOICES,
-            'doadores': Doador.objects.all().order_by('nome'),
-            'recebedores': Recebedor.objects.all().order_by('nome'),
         }
         return render(request, 'doacao_wizard.html', context)
     except Exception as e:
@@ -235,94 +236,195 @@ def doacao_wizard_api(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
+    try:
+        chave = idempotencia.ler_chave(request)
+    except idempotencia.ChaveInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if chave is not None:
+        hash_atual = idempotencia.hash_requisicao(request)
+        anterior = idempotencia.resposta_armazenada(request.user.pk, 'doacao_wizard', chave, hash_atual)
+        if anterior is not None:
+            return anterior
+
     try:
         data = request.data
         tipo_doacao = data.get('tipo_doacao')
-        
-        # Processa o doador
-        if data.get('doador_tipo') == 'existente':
-            doador = Doador.objects.get(id=data.get('doador_id'))
-        else:
-            doador = Doador.objects.create(
-                nome=data.get('doador_nome'),
-                email=data.get('doador_email'),
-                telefone=data.get('doador_telefone'),
-                endereco=data.get('doador_endereco')
-            )
-        
-        # Processa o recebedor
-        recebedor = None
-        if data.get('recebedor_tipo') == 'existente' and data.get('recebedor_id'):
-            recebedor = Recebedor.objects.get(id=data.get('recebedor_id'))
-        elif data.get('recebedor_tipo') == 'novo' and data.get('recebedor_nome'):
-            recebedor = Recebedor.objects.create(
-                nome=data.get('recebedor_nome'),
-                email=data.get('recebedor_email'),
-                telefone=data.get('recebedor_telefone'),
-                endereco=data.get('recebedor_endereco')
-            )
-
-        # Cria a doação baseada no tipo
+
+        # Valida o valor antes de qualquer escrita
+        valor = None
         if tipo_doacao == 'dinheiro':
-            valor = data.get('valor')
             try:
-                valor_str = str(valor).replace('.', '').replace(',', '.')
-                valor_float = float(valor_str)
-                if valor_float <= 0:
-                    return Response(
-                        {'error': 'O valor da doação deve ser maior que zero'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except (TypeError, ValueError):
+                valor_str = str(data.get('valor')).replace('.', '').replace(',', '.')
+                valor = Decimal(valor_str)
+            except (TypeError, ValueError, InvalidOperation):
                 return Response(
                     {'error': 'Valor inválido. Use o formato: 1000.00'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            doacao = Doacao.objects.create(
-                doador=doador,
-                recebedor=recebedor,
-                valor=valor_float
-            )
-        else:  # tipo_doacao == 'item'
-            item_data = {
-                'nome': data.get('item_nome'),
-                'tipo': data.get('item_tipo'),
-                'descricao': data.get('item_descricao'),
-                'disponivel': True,
-                'doador': doador
-            }
-            
-            if request.FILES and 'item_foto' in request.FILES:
-                item_data['foto'] = request.FILES['item_foto']
-            
-            item = Item.objects.create(**item_data)
-            
-            doacao = Doacao.objects.create(
-                item=item,
-                doador=doador,
-                recebedor=recebedor
-            )
-            
-            if recebedor:
-                item.disponivel = False
-                item.save()
-        
-        return Response({'id': doacao.id}, status=status.HTTP_201_CREATED)
-        
+            if not valor.is_finite():
+                return Response(
+                    {'error': 'Valor inválido. Use o formato: 1000.00'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if valor <= 0:
+                return Response(
+                    {'error': 'O valor da doação deve ser maior que zero'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Tudo ou nada: cada linha é gravada uma única vez e os contadores do
+        # resumo recebem um UPDATE cada ao final
+        with transaction.atomic(), resumo.deltas_agrupados():
+            # Processa o doador
+            if data.get('doador_tipo') == 'existente':
+                doador = Doador.objects.get(id=data.get('doador_id'))
+            else:
+                doador = Doador.objects.create(
+                    nome=data.get('doador_nome'),
+                    email=data.get('doador_email'),
+                    telefone=data.get('doador_telefone'),
+                    endereco=data.get('doador_endereco')
+                )
+
+            # Processa o recebedor
+            recebedor = None
+            if data.get('recebedor_tipo') == 'existente' and data.get('recebedor_id'):
+                recebedor = Recebedor.objects.get(id=data.get('recebedor_id'))
+            elif data.get('recebedor_tipo') == 'novo' and data.get('recebedor_nome'):
+                recebedor = Recebedor.objects.create(
+                    nome=data.get('recebedor_nome'),
+                    email=data.get('recebedor_email'),
+                    telefone=data.get('recebedor_telefone'),
+                    endereco=data.get('recebedor_endereco')
+                )
+
+            # Cria a doação baseada no tipo
+            if tipo_doacao == 'dinheiro':
+                doacao = Doacao.objects.create(
+                    doador=doador,
+                    recebedor=recebedor,
+                    valor=valor
+                )
+            else:  # tipo_doacao == 'item'
+                item_data = {
+                    'nome': data.get('item_nome'),
+                    'tipo': data.get('item_tipo'),
+                    'descricao': data.get('item_descricao'),
+                    # Com recebedor definido, o item já nasce entregue
+                    'disponivel': recebedor is None,
+                    'doador': doador
+                }
+
+                if request.FILES and 'item_foto' in request.FILES:
+                    item_data['foto'] = request.FILES['item_foto']
+
+                item = Item.objects.create(**item_data)
+
+                doacao = Doacao.objects.create(
+                    item=item,
+                    doador=doador,
+                    recebedor=recebedor
+                )
+
+            resposta = {'id': doacao.id}
+            if chave is not None:
+                idempotencia.guardar_resposta(
+                    request.user.pk, 'doacao_wizard', chave, hash_atual, status.HTTP_201_CREATED, resposta
+                )
+
+        return Response(resposta, status=status.HTTP_201_CREATED)
+
     except Doador.DoesNotExist:
         return Response({'error': 'Doador não encontrado'}, status=status.HTTP_400_BAD_REQUEST)
     except Recebedor.DoesNotExist:
         return Response({'error': 'Recebedor não encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError as e:
+        # Outra requisição com a mesma chave foi efetivada primeiro: devolve o resultado dela
+        if chave is not None:
+            concorrente = idempotencia.resposta_concorrente(request.user.pk, 'doacao_wizard', chave, hash_atual)
+            if concorrente is not None:
+                return concorrente
+        logger.error(f"Erro ao processar wizard de doação: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Erro ao processar wizard de doação: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def busca_api(request):
+    """
+    Busca textual em doadores, recebedores e itens (ver busca.py).
+
+    ``?q=`` termos da busca, ``?tipo=doador,recebedor,item`` restringe os
+    tipos e ``?limite=`` (até 100) o número de resultados, em ordem de relevância.
+    """
+    consulta = request.query_params.get('q', '').strip()
+    if not consulta:
+        return Response({'error': 'Informe o termo de busca em ?q='}, status=status.HTTP_400_BAD_REQUEST)
+
+    tipos = [tipo.strip().lower() for tipo in request.query_params.get('tipo', '').split(',') if tipo.strip()]
+    invalidos = [tipo for tipo in tipos if tipo not in busca.TIPOS]
+    if invalidos:
+        return Response(
+            {'error': f"Tipo inválido: {', '.join(invalidos)}. Use: {', '.join(busca.TIPOS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limite = int(request.query_params.get('limite', busca.LIMITE_PADRAO))
+    except ValueError:
+        return Response({'error': 'O limite deve ser um número inteiro'}, status=status.HTTP_400_BAD_REQUEST)
+    limite = min(max(limite, 1), busca.LIMITE_MAXIMO)
+
+    resultados = []
+    for tipo, obj in busca.buscar(consulta, tipos or None, limite):
+        if tipo == 'item':
+            detalhe = obj.get_tipo_display()
+        else:
+            detalhe = obj.email or obj.telefone or ''
+        resultados.append({
+            'tipo': tipo,
+            'id': obj.pk,
+            'nome': obj.nome,
+            'detalhe': detalhe,
+            'url': api_reverse(f'{tipo}-detail', args=[obj.pk], request=request),
+        })
+    return Response({'count': len(resultados), 'results': resultados})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def relatorio_serie_api(request):
+    """
+    Série temporal de doações (ver relatorios.py).
+
+    ``?periodo=dia|semana|mes``, ``?por=tipo|doador|recebedor`` divide a série,
+    ``?de=``/``?ate=`` (AAAA-MM-DD) limitam o intervalo; quando dividida,
+    ``?chaves=`` escolhe as séries (códigos de tipo, "dinheiro" ou ids) ou
+    ``?limite=`` (até 50) quantas das com mais doações.
+    """
+    params = request.query_params
+    try:
+        limite = int(params.get('limite', relatorios.LIMITE_PADRAO))
+    except ValueError:
+        return Response({'error': 'O limite deve ser um número inteiro'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        dados = relatorios.serie(
+            periodo=params.get('periodo', relatorios.PERIODO_PADRAO),
+            por=params.get('por') or None,
+            de=relatorios.ler_data(params.get('de'), '?de='),
+            ate=relatorios.ler_data(params.get('ate'), '?ate='),
+            limite=min(max(limite, 1), relatorios.LIMITE_MAXIMO),
+            chaves=[chave for chave in params.get('chaves', '').split(',') if chave.strip()],
+        )
+    except relatorios.ParametroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(dados)
+
 @login_required
 def doacao_detail(request, pk):
     """View para exibir os detalhes de uma doação específica."""
     try:
-        doacao = Doacao.objects.get(pk=pk)
+        doacao = Doacao.objects.select_related('doador', 'recebedor', 'item').get(pk=pk)
         return render(request, 'doacao_detail.html', {'doacao': doacao})
     except Doacao.DoesNotExist:
         messages.error(request, 'Doação não encontrada.')
@@ -330,4 +432,39 @@ def doacao_detail(request, pk):
     except Exception as e:
         logger.error(f"Erro ao exibir detalhes da doação: {str(e)}")
         messages.error(request, 'Erro ao carregar os detalhes da doação.')
-        return redirect('doacao_list')
\ No newline at end of file
+        return redirect('doacao_list')
+
+@require_http_methods(["GET"])
+def metricas_view(request):
+    """Métricas no formato texto do Prometheus (ver metricas.py)."""
+    if not metricas.autorizado(request):
+        return JsonResponse({'error': 'Não autorizado'}, status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(metricas.exposicao(), content_type=metricas.CONTENT_TYPE)
+
+TIPOS_ARQUIVO_PERFIL = {
+    'consultas.json': 'application/json',
+    'perfil.pstats': 'application/octet-stream',
+    'perfil.txt': 'text/plain; charset=utf-8',
+    'perfil.folded': 'text/plain; charset=utf-8',
+}
+
+@login_required
+@user_passes_test(is_admin)
+def perfil_view(request, nome, arquivo=None):
+    """Arquivos de um perfil gravado com ?_profile= (ver perfil.py)."""
+    disponiveis = perfil.arquivos(nome)
+    if not disponiveis:
+        raise Http404('Perfil não encontrado')
+    if arquivo is None:
+        return JsonResponse({
+            'nome': nome,
+            'arquivos': {disponivel: reverse('perfil_arquivo', args=[nome, disponivel]) for disponivel in disponiveis},
+        })
+    if arquivo not in disponiveis:
+        raise Http404('Arquivo não encontrado')
+    return FileResponse(
+        open(os.path.join(settings.PERFIS_DIR, nome, arquivo), 'rb'),
+        content_type=TIPOS_ARQUIVO_PERFIL[arquivo],
+        as_attachment=arquivo == 'perfil.pstats',
+        filename=f'{nome}-{arquivo}',
+    )
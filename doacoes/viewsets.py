@@ -1,15 +1,23 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
-from .models import Doador, Recebedor, Item, Doacao
+from .models import Doador, Recebedor, Item, Doacao, Tarefa
+from . import tarefas
+from .campos import CamposMixin
+from .condicional import CondicionalMixin
+from .exportacao import ExportMixin
+from .lote import BulkMixin
+from .autenticacao import TokenRefreshRevogavelSerializer
 from .serializers import (
     DoadorSerializer, RecebedorSerializer, ItemSerializer, DoacaoSerializer,
-    UserSerializer, CustomTokenObtainPairSerializer
+    UserSerializer, CustomTokenObtainPairSerializer, TarefaSerializer
 )
 
 User = get_user_model()
@@ -25,18 +33,14 @@ class IsGerenteUser(permissions.BasePermission):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            user = User.objects.get(email=request.data['email'])
-            user.ultimo_acesso = timezone.now()
-            user.save()
-        return response
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = TokenRefreshRevogavelSerializer
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = 'nome_completo'
 
     def get_permissions(self):
         if self.action == 'create':
@@ -45,7 +49,11 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        usuario = request.user
+        if not isinstance(usuario, User):
+            # Modo JWT sem estado: request.user vem das claims do token
+            usuario = User.objects.get(pk=usuario.pk)
+        serializer = self.get_serializer(usuario)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
@@ -117,22 +125,142 @@ class BaseModelViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class DoadorViewSet(BaseModelViewSet):
+class LookupMixin:
+    """
+    Ação ``GET /api/<recurso>/lookup/?q=&limite=`` usada pelos campos de busca
+    do wizard e dos modais no lugar de <select> com todos os registros.
+
+    Prefixos de nome e e-mail usam comparações de intervalo sobre
+    ``LOWER(campo)``, atendidas pelos índices de expressão dos modelos, e
+    termos só com dígitos, sobre a coluna indexada ``telefone_digitos``; só
+    quando faltam resultados é feita uma busca por substring no nome.
+    """
+    lookup_limite_padrao = 10
+    lookup_limite_maximo = 50
+    lookup_campos = ('id', 'nome', 'email', 'telefone')
+
+    def _prefixo(self, queryset, chave, termo):
+        return queryset.annotate(chave_busca=chave).filter(
+            chave_busca__gte=termo, chave_busca__lt=termo + '\uffff'
+        ).order_by('chave_busca', 'id')
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        termo = request.query_params.get('q', '').strip().lower()
+        try:
+            limite = int(request.query_params.get('limite', self.lookup_limite_padrao))
+        except ValueError:
+            limite = self.lookup_limite_padrao
+        limite = min(max(limite, 1), self.lookup_limite_maximo)
+
+        queryset = self.get_queryset()
+        if not termo:
+            resultados = list(queryset.order_by('nome', 'id').values(*self.lookup_campos)[:limite])
+            return Response(resultados)
+
+        digitos = ''.join(c for c in termo if c.isdigit())
+        if '@' in termo:
+            base = self._prefixo(queryset, Lower('email'), termo)
+        elif digitos and not any(c.isalpha() for c in termo):
+            # Compara só os dígitos dos dois lados: "11 9888" acha "(11) 98888-7777"
+            base = self._prefixo(queryset, F('telefone_digitos'), digitos)
+        else:
+            base = self._prefixo(queryset, Lower('nome'), termo)
+
+        resultados = list(base.values(*self.lookup_campos)[:limite])
+        if len(resultados) < limite and len(termo) >= 3:
+            encontrados = [r['id'] for r in resultados]
+            resultados += list(
+                queryset.filter(nome__icontains=termo)
+                .exclude(id__in=encontrados)
+                .order_by('nome', 'id')
+                .values(*self.lookup_campos)[:limite - len(resultados)]
+            )
+        return Response(resultados)
+
+class DoadorViewSet(CondicionalMixin, CamposMixin, LookupMixin, ExportMixin, BulkMixin, BaseModelViewSet):
     queryset = Doador.objects.all()
     serializer_class = DoadorSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_campos = (
+        ('id', 'id'), ('nome', 'nome'), ('email', 'email'), ('telefone', 'telefone'),
+        ('endereco', 'endereco'), ('observacoes', 'observacoes'), ('data_cadastro', 'data_cadastro'),
+    )
+    export_campo_data = 'data_cadastro'
+    export_nome = 'doadores'
 
-class RecebedorViewSet(BaseModelViewSet):
+class RecebedorViewSet(CondicionalMixin, CamposMixin, LookupMixin, ExportMixin, BulkMixin, BaseModelViewSet):
     queryset = Recebedor.objects.all()
     serializer_class = RecebedorSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_campos = (
+        ('id', 'id'), ('nome', 'nome'), ('email', 'email'), ('telefone', 'telefone'),
+        ('endereco', 'endereco'), ('observacoes', 'observacoes'), ('data_cadastro', 'data_cadastro'),
+    )
+    export_campo_data = 'data_cadastro'
+    export_nome = 'recebedores'
 
-class ItemViewSet(BaseModelViewSet):
+class ItemViewSet(CondicionalMixin, CamposMixin, ExportMixin, BulkMixin, BaseModelViewSet):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_campos = (
+        ('id', 'id'), ('nome', 'nome'), ('tipo', 'tipo'), ('descricao', 'descricao'),
+        ('disponivel', 'disponivel'), ('doador_id', 'doador_id'), ('doador_nome', 'doador__nome'),
+    )
+    export_campo_tipo = 'tipo'
+    export_nome = 'itens'
 
-class DoacaoViewSet(BaseModelViewSet):
+class DoacaoViewSet(CondicionalMixin, CamposMixin, ExportMixin, BulkMixin, BaseModelViewSet):
     queryset = Doacao.objects.all()
     serializer_class = DoacaoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_campos = (
+        ('id', 'id'), ('data', 'data'), ('valor', 'valor'),
+        ('doador_id', 'doador_id'), ('doador_nome', 'doador__nome'), ('doador_email', 'doador__email'),
+        ('recebedor_id', 'recebedor_id'), ('recebedor_nome', 'recebedor__nome'),
+        ('item_id', 'item_id'), ('item_nome', 'item__nome'), ('item_tipo', 'item__tipo'),
+        ('observacoes', 'observacoes'),
+    )
+    export_campo_data = 'data'
+    export_campo_tipo = 'item__tipo'
+    export_nome = 'doacoes'
+
+    def filtrar_exportacao(self, queryset, params):
+        # ``tipo=dinheiro`` seleciona as doações em dinheiro
+        if params.get('tipo', '').upper() == 'DINHEIRO':
+            params = params.copy()
+            params.pop('tipo')
+            queryset = queryset.filter(valor__isnull=False)
+        return super().filtrar_exportacao(queryset, params)
+
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Acompanhamento da fila de tarefas em segundo plano (apenas administradores)."""
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'].upper())
+        if self.request.query_params.get('nome'):
+            queryset = queryset.filter(nome=self.request.query_params['nome'])
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def estatisticas(self, request):
+        """Profundidade da fila por status/prioridade e latências da última hora."""
+        return Response(tarefas.estatisticas())
+
+    @action(detail=True, methods=['post'])
+    def reexecutar(self, request, pk=None):
+        """Devolve à fila uma tarefa que falhou, com as tentativas zeradas."""
+        alteradas = Tarefa.objects.filter(pk=pk, status=Tarefa.FALHOU).update(
+            status=Tarefa.PENDENTE, tentativas=0, executar_apos=timezone.now(), worker='', concluida_em=None
+        )
+        if not alteradas:
+            return Response(
+                {'error': 'Apenas tarefas com falha podem ser reexecutadas.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(self.get_serializer(Tarefa.objects.get(pk=pk)).data)